@@ -1,90 +1,616 @@
-from PIL import Image
+"""
+Favicon Generator for DuBuBu.com
+Renders every favicon/app icon size from one decode of the source logo
+
+Usage:
+    python convert_favicon.py [path_to_image]
+    python convert_favicon.py logo.png --output public/icon-192.png=192 --output public/favicon.ico=16,32,48
+    python convert_favicon.py --batch logos/ --out-dir brand_icons --jobs 8 --trace favicon_trace.jsonl
+    python convert_favicon.py print-logo.tif --memory-budget 128          # reduced decode for huge sources
+"""
+
+from PIL import Image, ImageColor
+import argparse
+import hashlib
+import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-# Accept command line argument or search for common names
-if len(sys.argv) > 1:
-    source_image = sys.argv[1]
-else:
-    # The source image path - update this to the actual path of the uploaded image
-    source_paths = [
-        "dububu-logo.png",
-        "logo.png", 
-        "favicon-source.png",
-        "icon.png",
-    ]
-    
-    source_image = None
-    for path in source_paths:
+from media_tools.telemetry import get_telemetry, print_summary, summarize_trace
+
+
+# Searched in order when no source image is given
+SOURCE_PATHS = [
+    "dububu-logo.png",
+    "logo.png",
+    "favicon-source.png",
+    "icon.png",
+]
+
+# Default outputs for the storefront (Next.js public/ and App Router app/)
+DEFAULT_OUTPUTS = [
+    {"path": "public/favicon.ico", "sizes": [16, 32, 48, 64, 128, 256]},
+    {"path": "public/apple-touch-icon.png", "sizes": [180]},
+    {"path": "public/favicon-32x32.png", "sizes": [32]},
+    {"path": "public/favicon-16x16.png", "sizes": [16]},
+    {"path": "app/favicon.ico", "sizes": [32]},
+]
+
+# Full icon set rendered per brand in batch mode, relative to the brand folder
+BRAND_OUTPUTS = [
+    {"path": "favicon.ico", "sizes": [16, 32, 48, 64, 128, 256]},
+    {"path": "apple-touch-icon.png", "sizes": [180]},
+    {"path": "favicon-32x32.png", "sizes": [32]},
+    {"path": "favicon-16x16.png", "sizes": [16]},
+    {"path": "icon-192.png", "sizes": [192]},
+    {"path": "icon-512.png", "sizes": [512]},
+    {"path": "icon-maskable-192.png", "sizes": [192], "maskable": True},
+    {"path": "icon-maskable-512.png", "sizes": [512], "maskable": True},
+]
+
+# Maskable icons keep the logo inside the central safe zone (80% diameter)
+MASKABLE_SAFE_ZONE = 0.8
+DEFAULT_BACKGROUND = "#ffffff"
+
+SOURCE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+FORMATS = {
+    ".ico": "ICO",
+    ".png": "PNG",
+    ".webp": "WEBP",
+}
+
+STATE_FILE = ".favicon_state.json"
+
+# Low-memory mode: the source is reduced (box filter, premultiplied alpha)
+# to a working image of at least REDUCING_GAP x the largest icon, exactly as
+# resize(reducing_gap=2.0) does internally, but one band of rows at a time
+REDUCING_GAP = 2.0
+BAND_BYTES = 16 * 1024 * 1024
+
+# Bits per pixel of uncompressed rawmodes that can be decoded a band at a time
+RAW_PIXEL_BITS = {
+    "1": 1, "L": 8, "P": 8, "LA": 16, "I;16": 16, "I;16B": 16,
+    "RGB": 24, "BGR": 24, "RGBA": 32, "BGRA": 32, "RGBX": 32, "BGRX": 32, "CMYK": 32,
+}
+
+
+def find_source_image() -> Optional[str]:
+    """Return the first default source image that exists"""
+    for path in SOURCE_PATHS:
         if os.path.exists(path):
-            source_image = path
-            break
-
-if source_image is None or not os.path.exists(source_image):
-    print("Usage: python convert_favicon.py <path_to_image>")
-    print("Or save the image as 'dububu-logo.png' in the project root")
-    sys.exit(1)
-
-print(f"Using source image: {source_image}")
-
-# Open the source image
-img = Image.open(source_image)
-
-# Convert to RGBA if necessary
-if img.mode != 'RGBA':
-    img = img.convert('RGBA')
-
-# Create various sizes for the ICO file
-sizes = [(16, 16), (32, 32), (48, 48), (64, 64), (128, 128), (256, 256)]
-icons = []
-
-for size in sizes:
-    resized = img.copy()
-    resized.thumbnail(size, Image.Resampling.LANCZOS)
-    # Create a new image with exact size and paste the resized image centered
-    icon = Image.new('RGBA', size, (0, 0, 0, 0))
-    offset = ((size[0] - resized.width) // 2, (size[1] - resized.height) // 2)
-    icon.paste(resized, offset)
-    icons.append(icon)
-
-# Save as ICO file with multiple sizes
-icons[0].save(
-    'public/favicon.ico',
-    format='ICO',
-    sizes=[(i.width, i.height) for i in icons],
-    append_images=icons[1:]
-)
-
-# Also save as PNG for apple-touch-icon
-apple_icon = img.copy()
-apple_icon.thumbnail((180, 180), Image.Resampling.LANCZOS)
-final_apple = Image.new('RGBA', (180, 180), (0, 0, 0, 0))
-offset = ((180 - apple_icon.width) // 2, (180 - apple_icon.height) // 2)
-final_apple.paste(apple_icon, offset)
-final_apple.save('public/apple-touch-icon.png', format='PNG')
-
-# Save as favicon-32x32.png
-favicon_32 = img.copy()
-favicon_32.thumbnail((32, 32), Image.Resampling.LANCZOS)
-final_32 = Image.new('RGBA', (32, 32), (0, 0, 0, 0))
-offset = ((32 - favicon_32.width) // 2, (32 - favicon_32.height) // 2)
-final_32.paste(favicon_32, offset)
-final_32.save('public/favicon-32x32.png', format='PNG')
-
-# Save as favicon-16x16.png  
-favicon_16 = img.copy()
-favicon_16.thumbnail((16, 16), Image.Resampling.LANCZOS)
-final_16 = Image.new('RGBA', (16, 16), (0, 0, 0, 0))
-offset = ((16 - favicon_16.width) // 2, (16 - favicon_16.height) // 2)
-final_16.paste(favicon_16, offset)
-final_16.save('public/favicon-16x16.png', format='PNG')
-
-# Also save in app directory for Next.js App Router
-icons[1].save('app/favicon.ico', format='ICO')  # 32x32 single size for app dir
-
-print("✅ Favicon files created successfully!")
-print("   - public/favicon.ico (multi-size)")
-print("   - public/apple-touch-icon.png (180x180)")
-print("   - public/favicon-32x32.png")
-print("   - public/favicon-16x16.png")
-print("   - app/favicon.ico (32x32)")
+            return path
+    return None
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def output_format(output: Dict) -> str:
+    """Explicit 'format' or one inferred from the file extension"""
+    if output.get("format"):
+        return output["format"].upper()
+    suffix = Path(output["path"]).suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f"Cannot infer image format for {output['path']}")
+    return FORMATS[suffix]
+
+
+class ResizeChain:
+    """
+    Produces square, centered RGBA icons from one decoded source.
+
+    Sizes are rendered largest first and each one is resampled from the
+    smallest already-computed image that is still at least as large, so the
+    full-resolution source is only resampled once per run.
+    """
+
+    def __init__(
+        self,
+        source: Image.Image,
+        full_size: Optional[Tuple[int, int]] = None,
+        reduced_by: int = 1
+    ):
+        source.load()
+        if source.mode != "RGBA":
+            source = source.convert("RGBA")
+        self.source = source
+        # Original logo size and box-reduce factor when source is a reduced
+        # working copy (see load_working_image)
+        self.full_size = full_size or source.size
+        self.reduced_by = reduced_by
+        self._fitted: Dict[int, Image.Image] = {}
+        self._icons: Dict[int, Image.Image] = {}
+
+    def _fit(self, size: int) -> Image.Image:
+        """Source scaled to fit inside size x size, aspect ratio kept"""
+        if size in self._fitted:
+            return self._fitted[size]
+
+        # Target dimensions come from the source so chained resizes don't drift
+        width, height = self.full_size
+        scale = min(size / width, size / height, 1.0)
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+        # A reduced source's last row/column of boxes may be partial; the box
+        # keeps the sampling grid identical to resizing the original
+        base, box = self.source, (0, 0, width / self.reduced_by, height / self.reduced_by)
+        for cached_size in sorted(self._fitted):
+            if cached_size >= size:
+                base, box = self._fitted[cached_size], None
+                break
+
+        fitted = base.resize(target, Image.Resampling.LANCZOS, box=box, reducing_gap=2.0)
+        self._fitted[size] = fitted
+        return fitted
+
+    def icon(self, size: int) -> Image.Image:
+        """Exact size x size icon with the fitted image pasted centered"""
+        if size not in self._icons:
+            fitted = self._fit(size)
+            icon = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+            offset = ((size - fitted.width) // 2, (size - fitted.height) // 2)
+            icon.paste(fitted, offset)
+            self._icons[size] = icon
+        return self._icons[size]
+
+    def maskable(self, size: int, background: str = DEFAULT_BACKGROUND) -> Image.Image:
+        """Opaque PWA maskable icon with the logo inside the safe zone"""
+        fitted = self._fit(max(1, round(size * MASKABLE_SAFE_ZONE)))
+        icon = Image.new("RGBA", (size, size), ImageColor.getrgb(background))
+        offset = ((size - fitted.width) // 2, (size - fitted.height) // 2)
+        icon.alpha_composite(fitted, offset)
+        return icon
+
+    def render(self, sizes: List[int]) -> Dict[int, Image.Image]:
+        """Render a set of sizes, largest first so smaller ones reuse them"""
+        for size in sorted(set(sizes), reverse=True):
+            self.icon(size)
+        return {size: self._icons[size] for size in sizes}
+
+
+# ==========================================
+# LOW-MEMORY DECODE
+# ==========================================
+
+def _pixel_bytes(mode: str) -> int:
+    """Bytes per pixel Pillow allocates for an image mode"""
+    if mode in ("1", "L", "P"):
+        return 1
+    if mode.startswith("I;16"):
+        return 2
+    return 4
+
+
+class _BandReducer:
+    """
+    Box-reduces an image fed as consecutive full-width bands of rows into a
+    premultiplied working image. Rows are carried over between bands so
+    every reduction box lines up with the one a single reduce() would use.
+    """
+
+    def __init__(self, size: Tuple[int, int], factor: int):
+        self.width, self.height = size
+        self.factor = factor
+        self.working = Image.new("RGBa", (-(-self.width // factor), -(-self.height // factor)))
+        self._carry: Optional[Image.Image] = None
+        self._y = 0
+
+    def feed(self, band: Image.Image, last: bool = False) -> None:
+        band = band.convert("RGBA").convert("RGBa")
+        if self._carry is not None:
+            joined = Image.new("RGBa", (self.width, self._carry.height + band.height))
+            joined.paste(self._carry, (0, 0))
+            joined.paste(band, (0, self._carry.height))
+            band = joined
+
+        usable = band.height if last else band.height - band.height % self.factor
+        if usable:
+            self.working.paste(band.crop((0, 0, self.width, usable)).reduce(self.factor), (0, self._y))
+            self._y += -(-usable // self.factor)
+        self._carry = band.crop((0, usable, self.width, band.height)) if usable < band.height else None
+
+    def result(self) -> Image.Image:
+        return self.working.convert("RGBA")
+
+
+def _raw_bands(img: Image.Image, rows: int):
+    """
+    (offset, rows) tiles for decoding an uncompressed single-tile source
+    (BMP, PPM, raw TIFF...) a band at a time, or None if it is not one.
+    """
+    if len(img.tile) != 1 or img.tile[0][0] != "raw":
+        return None
+    codec, extents, offset, args = img.tile[0]
+    args = (args,) if isinstance(args, str) else tuple(args)
+    rawmode, stride, orientation = (args + (0, 1))[:3]
+    if rawmode not in RAW_PIXEL_BITS or extents != (0, 0) + img.size:
+        return None
+
+    width, height = img.size
+    stride = stride or -(-width * RAW_PIXEL_BITS[rawmode] // 8)
+    bands = []
+    for y in range(0, height, rows):
+        n = min(rows, height - y)
+        # Bottom-up files (BMP) store the band's last row first
+        first_row = y if orientation > 0 else height - y - n
+        bands.append((codec, (0, 0, width, n), offset + first_row * stride, (rawmode, stride, orientation)))
+    return bands
+
+
+def _decode_band(source_image: str, tile: tuple) -> Image.Image:
+    with Image.open(source_image) as band:
+        band._size = tile[1][2:]
+        band.tile = [tile]
+        band.load()
+        return band
+
+
+def load_working_image(
+    source_image: str,
+    max_size: int,
+    memory_budget_mb: float
+) -> Tuple[Image.Image, Tuple[int, int], int, Dict]:
+    """
+    Decode source_image into an RGBA working image just large enough for
+    icons up to max_size, keeping image buffers within memory_budget_mb.
+
+    JPEGs are reduced while decoding (draft); uncompressed sources are read a
+    band of rows at a time; anything else is decoded once in its native mode
+    and reduced band by band, never converted to full-resolution RGBA.
+
+    Returns:
+        (working image, original size, reduce factor, decode info for telemetry)
+    """
+    budget = memory_budget_mb * 1024 * 1024
+    target = max(1, round(max_size * REDUCING_GAP))
+
+    with Image.open(source_image) as img:
+        full_size = img.size
+        img.draft(img.mode, (target, target))
+        width, height = img.size
+        factor = max(1, int(max(width, height) / target))
+        info = {"mode": "draft" if img.size != full_size else "full", "factor": factor,
+                "decoded": [width, height]}
+
+        rows = max(factor, BAND_BYTES // (width * 4 * 3) // factor * factor)
+        reducer = _BandReducer((width, height), factor)
+        working_bytes = reducer.working.width * reducer.working.height * 4 * 2
+        bands = _raw_bands(img, rows)
+
+        if bands:
+            info["mode"] = "bands"
+            peak = working_bytes + BAND_BYTES + rows * width * _pixel_bytes(img.mode)
+        else:
+            peak = working_bytes + BAND_BYTES + width * height * _pixel_bytes(img.mode)
+        info["estimated_mb"] = round(peak / (1024 * 1024), 1)
+        if peak > budget:
+            raise ValueError(
+                f"{source_image} ({full_size[0]}x{full_size[1]} {img.mode}) needs ~{info['estimated_mb']} MB "
+                f"to decode, over the {memory_budget_mb:g} MB budget; save it as JPEG or uncompressed "
+                f"TIFF/BMP so it can be decoded in bands, or raise --memory-budget"
+            )
+
+        if bands:
+            for i, tile in enumerate(bands):
+                reducer.feed(_decode_band(source_image, tile), last=i == len(bands) - 1)
+        else:
+            img.load()
+            for y in range(0, height, rows):
+                reducer.feed(img.crop((0, y, width, min(height, y + rows))), last=y + rows >= height)
+
+    return reducer.result(), full_size, factor * round(full_size[0] / width), info
+
+
+def save_icon(icons: List[Image.Image], path: str, fmt: str) -> None:
+    """Write one output file; ICO files bundle every size, largest as base"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    if fmt == "ICO":
+        ordered = sorted(icons, key=lambda i: i.width, reverse=True)
+        ordered[0].save(
+            path,
+            format="ICO",
+            sizes=[(i.width, i.height) for i in ordered],
+            append_images=ordered[1:]
+        )
+    else:
+        icons[0].save(path, format=fmt)
+
+
+def _spec_fingerprint(source_hash: str, outputs: List[Dict]) -> str:
+    spec = [
+        (o["path"], output_format(o), sorted(o["sizes"]), bool(o.get("maskable")), o.get("background"))
+        for o in outputs
+    ]
+    payload = json.dumps([source_hash, spec], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_state(state_file: str) -> Dict:
+    try:
+        with open(state_file, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def generate_icons(
+    source_image: str,
+    outputs: Optional[List[Dict]] = None,
+    state_file: Optional[str] = STATE_FILE,
+    force: bool = False,
+    memory_budget: Optional[float] = None
+) -> Tuple[List[str], bool]:
+    """
+    Render every requested output from a single decode of source_image.
+
+    Args:
+        source_image: Path to the source logo
+        outputs: List of {"path": ..., "sizes": [...]} with optional "format",
+                 "maskable" and "background" keys
+        state_file: Where to remember the last build (None disables skipping)
+        force: Rebuild even if the source and outputs are unchanged
+        memory_budget: MB of image buffers the decode may use; when set, a
+                       reduced working image is decoded instead of the full
+                       source (see load_working_image)
+
+    Returns:
+        (written paths, whether work was skipped as up to date)
+    """
+    outputs = outputs or DEFAULT_OUTPUTS
+    paths = [o["path"] for o in outputs]
+    telemetry = get_telemetry()
+
+    with telemetry.span("favicon.fingerprint"):
+        fingerprint = _spec_fingerprint(file_sha256(source_image), outputs)
+    if state_file and not force:
+        state = _load_state(state_file)
+        if state.get("fingerprint") == fingerprint and all(os.path.exists(p) for p in paths):
+            telemetry.count("favicon.skipped")
+            return paths, True
+
+    with telemetry.span("favicon.decode") as span:
+        if memory_budget:
+            max_size = max(max(o["sizes"]) for o in outputs)
+            working, full_size, factor, info = load_working_image(source_image, max_size, memory_budget)
+            chain = ResizeChain(working, full_size, factor)
+            span.update(info)
+        else:
+            with Image.open(source_image) as img:
+                chain = ResizeChain(img)
+        span["size"] = list(chain.source.size)
+
+    with telemetry.span("favicon.render"):
+        all_sizes = sorted({size for o in outputs for size in o["sizes"]})
+        rendered = chain.render(all_sizes)
+
+    for output in outputs:
+        with telemetry.span("favicon.save", path=output["path"]) as span:
+            if output.get("maskable"):
+                background = output.get("background", DEFAULT_BACKGROUND)
+                icons = [chain.maskable(size, background) for size in output["sizes"]]
+            else:
+                icons = [rendered[size] for size in output["sizes"]]
+            save_icon(icons, output["path"], output_format(output))
+            span["bytes"] = os.path.getsize(output["path"])
+        telemetry.count("favicon.bytes", span["bytes"])
+
+    if state_file:
+        with open(state_file, "w") as f:
+            json.dump({"source": source_image, "fingerprint": fingerprint, "outputs": paths}, f, indent=2)
+
+    return paths, False
+
+
+# ==========================================
+# BATCH MODE (one icon set per brand logo)
+# ==========================================
+
+def discover_brands(source: str) -> List[Dict]:
+    """
+    Load brands from a folder of logos (brand name = file stem) or from a
+    JSON manifest: [{"name": ..., "source": ..., "background": ..., "theme_color": ...}]
+    Manifest sources are resolved relative to the manifest file.
+    """
+    path = Path(source)
+
+    if path.is_dir():
+        brands = [
+            {"name": p.stem, "source": str(p)}
+            for p in path.iterdir()
+            if p.is_file() and p.suffix.lower() in SOURCE_EXTENSIONS
+        ]
+    else:
+        with open(path, "r") as f:
+            data = json.load(f)
+        entries = data.get("brands", []) if isinstance(data, dict) else data
+        brands = []
+        for entry in entries:
+            brand = dict(entry)
+            brand.setdefault("name", Path(brand["source"]).stem)
+            brand["source"] = str(path.parent / brand["source"])
+            brands.append(brand)
+
+    return sorted(brands, key=lambda b: b["name"])
+
+
+def _webmanifest(brand: Dict) -> Dict:
+    """PWA web app manifest pointing at the brand's icons"""
+    icons = []
+    for output in BRAND_OUTPUTS:
+        if not output["path"].startswith("icon-"):
+            continue
+        size = output["sizes"][0]
+        icon = {"src": f"/{output['path']}", "sizes": f"{size}x{size}", "type": "image/png"}
+        if output.get("maskable"):
+            icon["purpose"] = "maskable"
+        icons.append(icon)
+
+    background = brand.get("background", DEFAULT_BACKGROUND)
+    return {
+        "name": brand.get("title", brand["name"]),
+        "short_name": brand.get("short_name", brand["name"]),
+        "icons": icons,
+        "theme_color": brand.get("theme_color", background),
+        "background_color": background,
+        "display": "standalone",
+    }
+
+
+def render_brand(brand: Dict, out_dir: str, force: bool = False, memory_budget: Optional[float] = None) -> Dict:
+    """
+    Render the full icon set for one brand into out_dir/<name>/.
+    Runs in a worker process; errors are returned in the report, not raised.
+    """
+    brand_dir = Path(out_dir) / brand["name"]
+    report = {"brand": brand["name"], "source": brand["source"], "outputs": [], "error": None}
+
+    with get_telemetry().task(brand["name"]):
+        return _render_brand(brand, brand_dir, report, force, memory_budget)
+
+
+def _render_brand(brand: Dict, brand_dir: Path, report: Dict, force: bool, memory_budget: Optional[float]) -> Dict:
+    try:
+        background = brand.get("background", DEFAULT_BACKGROUND)
+        outputs = []
+        for output in BRAND_OUTPUTS:
+            output = dict(output, path=str(brand_dir / output["path"]))
+            if output.get("maskable"):
+                output["background"] = background
+            outputs.append(output)
+
+        paths, skipped = generate_icons(
+            brand["source"],
+            outputs,
+            state_file=str(brand_dir / STATE_FILE),
+            force=force,
+            memory_budget=memory_budget
+        )
+
+        manifest_path = brand_dir / "site.webmanifest"
+        with open(manifest_path, "w") as f:
+            json.dump(_webmanifest(brand), f, indent=2)
+
+        report["outputs"] = paths + [str(manifest_path)]
+        report["status"] = "skipped" if skipped else "built"
+    except Exception as e:
+        report["status"] = "failed"
+        report["error"] = f"{type(e).__name__}: {e}"
+
+    return report
+
+
+def generate_brand_icons(
+    source: str,
+    out_dir: str = "brand_icons",
+    jobs: Optional[int] = None,
+    force: bool = False,
+    memory_budget: Optional[float] = None
+) -> List[Dict]:
+    """
+    Render icon sets for every brand in a folder or manifest across a process
+    pool. Reports come back sorted by brand name and are also written to
+    <out_dir>/icon_report.json. memory_budget applies to each worker.
+    """
+    brands = discover_brands(source)
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(render_brand, brand, out_dir, force, memory_budget) for brand in brands]
+        reports = [future.result() for future in futures]
+
+    with open(Path(out_dir) / "icon_report.json", "w") as f:
+        json.dump(reports, f, indent=2)
+
+    return reports
+
+
+def parse_output(spec: str) -> Dict:
+    """Parse a PATH=SIZE[,SIZE...] command line output spec"""
+    path, _, sizes = spec.partition("=")
+    if not path or not sizes:
+        raise argparse.ArgumentTypeError(f"Expected PATH=SIZE[,SIZE...], got '{spec}'")
+    try:
+        return {"path": path, "sizes": [int(s) for s in sizes.split(",")]}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid sizes in '{spec}'")
+
+
+def main():
+    """Command-line interface for favicon generation"""
+    parser = argparse.ArgumentParser(description="DuBuBu.com favicon generator")
+    parser.add_argument("source", nargs="?", help="Source logo (defaults to dububu-logo.png, logo.png, ...)")
+    parser.add_argument("--output", "-o", action="append", type=parse_output, metavar="PATH=SIZES",
+                        help="Output file and sizes, e.g. public/favicon.ico=16,32,48 (repeatable)")
+    parser.add_argument("--force", "-f", action="store_true", help="Rebuild even if the source is unchanged")
+    parser.add_argument("--batch", metavar="DIR_OR_MANIFEST",
+                        help="Render full icon sets for a folder of logos or a JSON brand manifest")
+    parser.add_argument("--out-dir", default="brand_icons", help="Output folder for --batch")
+    parser.add_argument("--jobs", "-j", type=int, help="Worker processes for --batch (default: CPU count)")
+    parser.add_argument("--memory-budget", type=float, metavar="MB",
+                        help="Decode a reduced working image within this many MB instead of the full source "
+                             "(for very large logos)")
+    parser.add_argument("--trace", metavar="JSONL",
+                        help="Write per-stage timings to a JSON Lines trace and print a latency summary")
+    args = parser.parse_args()
+
+    if args.trace:
+        # Truncate, then share the file with worker processes via the environment
+        open(args.trace, "w").close()
+        os.environ["DUBUBU_TRACE"] = args.trace
+        get_telemetry().open_trace(args.trace)
+
+    if args.batch:
+        reports = generate_brand_icons(args.batch, args.out_dir, jobs=args.jobs, force=args.force,
+                                       memory_budget=args.memory_budget)
+        failed = [r for r in reports if r["status"] == "failed"]
+        for report in reports:
+            icon = "❌" if report["status"] == "failed" else "✅"
+            detail = report["error"] or f"{report['status']}, {len(report['outputs'])} files"
+            print(f"{icon} {report['brand']}: {detail}")
+        print(f"📄 Report saved: {Path(args.out_dir) / 'icon_report.json'}")
+        if args.trace:
+            get_telemetry().close()
+            print_summary(summarize_trace([args.trace]))
+        sys.exit(1 if failed else 0)
+
+    source_image = args.source or find_source_image()
+    if source_image is None or not os.path.exists(source_image):
+        print("Usage: python convert_favicon.py <path_to_image>")
+        print("Or save the image as 'dububu-logo.png' in the project root")
+        sys.exit(1)
+
+    print(f"Using source image: {source_image}")
+
+    outputs = args.output or DEFAULT_OUTPUTS
+    try:
+        paths, skipped = generate_icons(source_image, outputs, force=args.force,
+                                        memory_budget=args.memory_budget)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if skipped:
+        print("✅ Favicons already up to date (source unchanged), use --force to rebuild")
+    else:
+        print("✅ Favicon files created successfully!")
+    for output in outputs:
+        sizes = ", ".join(f"{s}x{s}" for s in output["sizes"])
+        print(f"   - {output['path']} ({sizes})")
+
+    if args.trace:
+        print_summary(get_telemetry().write_summary())
+
+
+if __name__ == "__main__":
+    main()
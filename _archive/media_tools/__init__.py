@@ -0,0 +1,58 @@
+"""
+DuBuBu.com media tools
+Image generation (fal.ai), Tenor GIFs, caching, mirroring and transcoding
+
+Public names are loaded on first access, so `import media_tools` (or
+`from media_tools import STYLE_PRESETS`) does not pull in fal_client,
+requests, aiohttp or Pillow. Command line: `python -m media_tools --help`.
+"""
+
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "DuBuBuImageGenerator": "fal_generator",
+    "DEFAULT_MODEL": "fal_generator",
+    "TenorFetcher": "tenor_fetcher",
+    "AsyncTenorFetcher": "tenor_async",
+    "STYLE_PRESETS": "presets",
+    "CHARACTERS": "presets",
+    "CATALOG_CATEGORIES": "presets",
+    "PRESET_GIFS": "presets",
+    "get_preset_gif": "presets",
+    "preset_request": "presets",
+    "FalQueueRunner": "fal_queue",
+    "GenerationWorker": "worker",
+    "JobQueue": "worker",
+    "ImageDownloader": "downloader",
+    "MediaMirror": "gif_mirror",
+    "PromptCache": "prompt_cache",
+    "SearchCache": "search_cache",
+    "BatchJournal": "batch_journal",
+    "CatalogStore": "catalog_store",
+    "BuildGraph": "build_graph",
+    "Node": "build_graph",
+    "find_duplicates": "dedup",
+    "build_contact_sheet": "contact_sheet",
+    "build_atlas": "contact_sheet",
+    "generate_launch_media": "batch_media",
+    "run_campaign": "batch_media",
+    "load_manifest": "campaign",
+    "iter_tasks": "campaign",
+    "get_scheduler": "scheduler",
+    "get_telemetry": "telemetry",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,61 @@
+"""
+DuBuBu.com media tools command line
+
+    python -m media_tools <command> [options]
+
+Only the module behind the chosen command is imported, so `--help` and
+preset lookups start without loading any client library.
+"""
+
+import importlib
+import sys
+
+# command -> (module, summary)
+COMMANDS = {
+    "generate": ("fal_generator", "Generate images with fal.ai"),
+    "batch": ("batch_media", "Generate a campaign's assets (default: launch)"),
+    "queue": ("fal_queue", "Collect fal.ai jobs left in flight"),
+    "worker": ("worker", "Run the generation worker and its local job API"),
+    "presets": ("presets", "List styles, characters and preset GIFs"),
+    "tenor": ("tenor_fetcher", "Search Tenor for Bubu Dudu GIFs"),
+    "catalog": ("tenor_async", "Build the GIF catalog concurrently"),
+    "mirror": ("gif_mirror", "Mirror preset and catalog GIFs locally"),
+    "transcode": ("transcode", "Transcode GIFs to WebP/MP4/WebM"),
+    "derivatives": ("derivatives", "Build responsive image derivatives"),
+    "build": ("pipeline", "Rebuild only stale assets, icons and catalogs"),
+    "dedup": ("dedup", "Set aside near-duplicate and blank images"),
+    "sheet": ("contact_sheet", "Build a review contact sheet or sprite atlas"),
+    "query": ("catalog_store", "Query the persistent media catalog"),
+    "trace": ("telemetry", "Summarize trace files"),
+    "bench": ("benchmark", "Run the offline benchmarks"),
+    "stub": ("stub_server", "Run the local fal.ai/Tenor stand-in"),
+}
+
+
+def usage() -> str:
+    lines = ["usage: python -m media_tools <command> [options]", "", "commands:"]
+    lines += [f"  {name:<13}{summary}" for name, (_, summary) in COMMANDS.items()]
+    lines += ["", "Run `python -m media_tools <command> --help` for a command's options."]
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return
+
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"Unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+
+    module = importlib.import_module(f"media_tools.{COMMANDS[command][0]}")
+    # argparse derives prog from argv[0]
+    sys.argv[0] = f"python -m media_tools {command}"
+    module.main(rest)
+
+
+if __name__ == "__main__":
+    main()
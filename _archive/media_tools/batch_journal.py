@@ -0,0 +1,106 @@
+"""
+Batch Journal for DuBuBu.com
+Append-only JSON Lines checkpoint of batch task results, so an interrupted
+run can be resumed without regenerating finished assets
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+def task_id(task: Dict) -> str:
+    """Stable identifier for a task, derived from its type and parameters"""
+    payload = json.dumps(
+        [task.get("type"), task.get("params", {})],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+    return f"{task.get('type')}:{digest}"
+
+
+def iter_task_ids(tasks: Iterable[Dict]) -> Iterator[Tuple[str, Dict]]:
+    """(task_id, task) pairs as tasks stream past, with a #n suffix on repeated identical tasks"""
+    seen: Dict[str, int] = {}
+    for task in tasks:
+        base = task_id(task)
+        count = seen.get(base, 0)
+        seen[base] = count + 1
+        yield (base if count == 0 else f"{base}#{count}"), task
+
+
+def assign_task_ids(tasks: List[Dict]) -> List[str]:
+    """Task IDs for a batch, with a #n suffix on repeated identical tasks"""
+    return [tid for tid, _ in iter_task_ids(tasks)]
+
+
+class BatchJournal:
+    """
+    One JSON object per line, written and fsynced as each task finishes:
+
+        {"task_id": ..., "status": "done" | "failed", "task": {...},
+         "images": [...], "error": ..., "finished_at": ...}
+
+    Later lines for the same task_id supersede earlier ones.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict]:
+        """Latest record per task_id. A torn final line is ignored."""
+        records: Dict[str, Dict] = {}
+        if not self.path.exists():
+            return records
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "task_id" in record:
+                    records[record["task_id"]] = record
+
+        return records
+
+    def completed_ids(self) -> set:
+        """IDs of tasks that finished with at least one image"""
+        return {tid for tid, record in self.load().items() if record.get("status") == "done"}
+
+    def record(
+        self,
+        tid: str,
+        task: Dict,
+        images: List[Dict],
+        error: Optional[str] = None
+    ) -> Dict:
+        """Append the outcome of one task and flush it to disk"""
+        entry = {
+            "task_id": tid,
+            "status": "done" if images and not error else "failed",
+            "task": task,
+            "images": images,
+            "error": error or (None if images else "no images returned"),
+            "finished_at": datetime.now().isoformat(),
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+        return entry
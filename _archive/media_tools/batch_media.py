@@ -1,109 +1,263 @@
 """
 Batch Media Generator for DuBuBu.com
-Generate all needed images in one run
+Generate all needed images in one run, from a campaign manifest
+(see campaign.py and campaigns/)
 """
 
-from fal_generator import DuBuBuImageGenerator
+from .fal_generator import DuBuBuImageGenerator
+from .batch_journal import BatchJournal, iter_task_ids
+from .catalog_store import DEFAULT_STORE, CatalogStore
+from .campaign import ManifestError, count_tasks, iter_tasks, list_campaigns, load_manifest
+from .fal_queue import FalQueueRunner
+from .scheduler import BATCH
+from .telemetry import get_telemetry, print_summary
+import argparse
 import json
+import os
 from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Union
 
-def generate_launch_media():
-    """Generate all media needed for store launch"""
+
+LAUNCH_CAMPAIGN = "launch"
+
+
+def build_launch_tasks() -> list:
+    """The launch task list (campaigns/launch.json), each task tagged with its catalog fields"""
+    return list(iter_tasks(load_manifest(LAUNCH_CAMPAIGN)))
+
+
+def run_campaign(
+    campaign: Union[str, Dict] = LAUNCH_CAMPAIGN,
+    workers: int = 4,
+    use_cache: bool = True,
+    resume: Optional[str] = None,
+    derivatives: bool = False,
+    queue: bool = False,
+    coalesce: bool = True,
+    trace: Optional[str] = None,
+    dedup: bool = False,
+    store: Optional[str] = DEFAULT_STORE,
+    sheet: bool = False
+):
+    """
+    Generate every asset in a campaign manifest (a path, the name of a
+    bundled campaign such as 'launch', or an already loaded manifest)
     
-    gen = DuBuBuImageGenerator()
-    results = {"generated_at": datetime.now().isoformat(), "images": []}
+    Tasks are expanded from the manifest as the executor asks for them and
+    results are checkpointed as they finish, so only a window of tasks is
+    ever held in memory. Every finished task is appended to a
+    media_manifest_<timestamp>.jsonl journal; passing that journal as
+    resume skips the tasks it already records as done and retries only
+    failed or missing ones.
+    With derivatives, every image also gets WebP/AVIF responsive renditions
+    and a placeholder, listed in the catalog. With queue, every task is
+    submitted to fal's queue up front and collected as it completes;
+    resuming reattaches to jobs still in flight instead of resubmitting.
+    With coalesce, duplicate tasks share one request and tasks sharing a
+    prompt are packed into multi-image requests. With dedup, near-duplicate
+    and blank images are moved to generated_images/duplicates/ and left out
+    of the catalog (and so out of derivatives and uploads). With sheet, a
+    contact_sheet_<timestamp>.jpg of the kept images is written for review.
     
-    # ========================================
-    # WEBSITE BANNERS
-    # ========================================
-    print("\n📸 Generating Website Banners...")
-    
-    banners = [
-        {"banner_type": "hero", "headline": "Where Every Day is a Love Story"},
-        {"banner_type": "collection", "headline": "Matching Couple Sets"},
-        {"banner_type": "collection", "headline": "Cozy Home Collection"},
-        {"banner_type": "sale", "headline": "Valentine's Day Sale"},
-    ]
-    
-    for banner in banners:
-        imgs = gen.generate_banner(**banner)
-        for img in imgs:
-            img["category"] = "banner"
-            img["subcategory"] = banner["banner_type"]
-            results["images"].append(img)
+    Each finished image is also written to the persistent catalog store
+    (catalog_store.py, unless store is None) as it completes; the JSON
+    catalog written at the end is a snapshot of this run only.
     
-    # ========================================
-    # PRODUCT MOCKUPS
-    # ========================================
-    print("\n📸 Generating Product Mockups...")
-    
-    products = [
-        {"product_type": "plush", "description": "couple set bear and panda"},
-        {"product_type": "tshirt", "description": "matching his and hers"},
-        {"product_type": "hoodie", "description": "oversized cozy"},
-        {"product_type": "mug", "description": "couple mug set"},
-        {"product_type": "blanket", "description": "soft throw"},
-        {"product_type": "pillow", "description": "decorative cushion"},
-        {"product_type": "keychain", "description": "matching set"},
-        {"product_type": "phone_case", "description": "cute design"},
-    ]
-    
-    for product in products:
-        imgs = gen.generate_product_mockup(**product)
-        for img in imgs:
-            img["category"] = "product"
-            img["subcategory"] = product["product_type"]
-            results["images"].append(img)
+    Per-stage spans and counters go to a media_trace_<timestamp>.jsonl
+    trace (or trace), and a p50/p95 latency summary is printed at the end.
+    """
     
-    # ========================================
-    # SOCIAL MEDIA CONTENT
-    # ========================================
-    print("\n📸 Generating Social Media Content...")
-    
-    social_posts = [
-        {"theme": "couple_goals", "platform": "instagram"},
-        {"theme": "cozy_vibes", "platform": "instagram"},
-        {"theme": "valentines", "platform": "instagram"},
-        {"theme": "new_arrival", "platform": "instagram"},
-        {"theme": "couple_goals", "platform": "pinterest"},
-        {"theme": "cozy_vibes", "platform": "facebook"},
-    ]
-    
-    for post in social_posts:
-        imgs = gen.generate_social_post(**post)
-        for img in imgs:
-            img["category"] = "social"
-            img["subcategory"] = post["platform"]
-            img["theme"] = post["theme"]
-            results["images"].append(img)
+    manifest = campaign if isinstance(campaign, dict) else load_manifest(campaign)
+    name = manifest["name"]
     
-    # ========================================
-    # EMAIL HEADERS
-    # ========================================
-    print("\n📸 Generating Email Headers...")
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    journal = BatchJournal(resume or f"media_manifest_{timestamp}.jsonl")
+    
+    telemetry = get_telemetry()
+    telemetry.open_trace(trace or f"media_trace_{timestamp}.jsonl")
+    
+    done = journal.completed_ids() if resume else set()
+    total = count_tasks(manifest)
+    remaining = sum(1 for tid, _ in iter_task_ids(iter_tasks(manifest)) if tid not in done)
     
-    email_types = ["welcome", "abandoned_cart", "promotion", "newsletter", "thank_you"]
+    if resume:
+        print(f"\n🔁 Resuming from {journal.path}: {total - remaining}/{total} tasks already done")
     
-    for email_type in email_types:
-        imgs = gen.generate_email_header(email_type)
-        for img in imgs:
-            img["category"] = "email"
-            img["subcategory"] = email_type
-            results["images"].append(img)
+    catalog = CatalogStore(store) if store else None
+    
+    if remaining:
+        gen = DuBuBuImageGenerator(
+            use_cache=use_cache,
+            download_workers=max(4, workers),
+            priority=BATCH
+        )
+        
+        # IDs of the tasks handed to the executor, by executor index
+        pending_ids: List[str] = []
+        
+        def pending_tasks() -> Iterator[dict]:
+            for tid, task in iter_task_ids(iter_tasks(manifest)):
+                if tid not in done:
+                    pending_ids.append(tid)
+                    yield task
+        
+        if queue:
+            print(f"\n📸 Queueing {remaining} '{name}' assets...")
+            results = FalQueueRunner(gen).run_tasks(pending_tasks())
+        else:
+            print(f"\n📸 Generating {remaining} '{name}' assets ({workers} at a time)...")
+            results = gen.iter_batch(pending_tasks(), max_workers=workers, coalesce=coalesce)
+        
+        finished = failures = 0
+        for index, task, imgs, error in results:
+            finished += 1
+            tid = pending_ids[index]
+            for img in imgs:
+                img.update(task.get("tags", {}), campaign=name, task_id=tid)
+            journal.record(tid, task, imgs, error)
+            if catalog and imgs and not error:
+                catalog.add_images(imgs, campaign=name, task_id=tid)
+            if error or not imgs:
+                failures += 1
+                print(f"[{finished}/{remaining}] Task {task.get('type')} failed: {error or 'no images returned'}")
+        
+        if failures:
+            print(f"\n⚠️  {failures}/{remaining} tasks failed")
     
     # ========================================
     # SAVE RESULTS
     # ========================================
-    output_file = f"media_catalog_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    records = journal.load()
+    results = {"campaign": name, "generated_at": datetime.now().isoformat(), "images": []}
+    failed = []
+    
+    for tid, _ in iter_task_ids(iter_tasks(manifest)):
+        record = records.get(tid)
+        if record and record.get("status") == "done":
+            results["images"].extend(record["images"])
+        else:
+            failed.append(tid)
+    
+    if dedup:
+        paths = [img["local_path"] for img in results["images"] if os.path.exists(img.get("local_path", ""))]
+        # NumPy/Pillow are only needed (and loaded) for this step
+        from .dedup import DUPLICATES_DIR, INDEX_FILE, filter_catalog, find_duplicates, set_aside
+        print(f"\n🔍 Checking {len(paths)} images for near-duplicates...")
+        with telemetry.span("dedup", images=len(paths)):
+            report = find_duplicates(paths, index_path=f"generated_images/{INDEX_FILE}")
+        set_aside(report["remove"], f"generated_images/{DUPLICATES_DIR}")
+        results["images"] = filter_catalog(results["images"], report)
+        results["duplicates"] = report["clusters"]
+        if catalog:
+            catalog.remove(report["remove"])
+        print(f"   {len(report['remove'])} set aside ({len(report['clusters'])} duplicate groups, "
+              f"{len(report['low_quality'])} blank)")
+    
+    if derivatives:
+        paths = [img["local_path"] for img in results["images"] if os.path.exists(img.get("local_path", ""))]
+        # Pillow is only needed (and loaded) for this step
+        from .derivatives import attach_to_catalog, process_images
+        print(f"\n🖼️  Building responsive derivatives for {len(paths)} images...")
+        with telemetry.span("derivatives", images=len(paths)):
+            attach_to_catalog(results["images"], process_images(paths))
+    
+    if catalog:
+        # Resumed images and derivative info land in the store too
+        catalog.add_images(results["images"], campaign=name)
+        catalog.close()
+    
+    output_file = f"media_catalog_{timestamp}.json"
     with open(output_file, 'w') as f:
         json.dump(results, f, indent=2)
     
+    sheet_file = None
+    if sheet:
+        paths = [img["local_path"] for img in results["images"] if os.path.exists(img.get("local_path", ""))]
+        # NumPy/Pillow are only needed (and loaded) for this step
+        from .contact_sheet import build_contact_sheet
+        sheet_file = f"contact_sheet_{timestamp}.jpg"
+        with telemetry.span("contact_sheet", images=len(paths)):
+            build_contact_sheet(paths, sheet_file)
+    
     print(f"\n✅ Generation complete!")
     print(f"📁 Total images: {len(results['images'])}")
     print(f"📄 Catalog saved: {output_file}")
+    print(f"🧾 Manifest: {journal.path}")
+    if sheet_file:
+        print(f"🗂️  Contact sheet: {sheet_file}")
+    if store:
+        print(f"📚 Catalog store: {store}")
+    print(f"⏱️  Trace: {telemetry.trace_path}")
+    if failed:
+        print(f"⚠️  {len(failed)} tasks still missing; rerun with --resume {journal.path}")
+    
+    print_summary(telemetry.write_summary())
     
     return results
 
 
+def generate_launch_media(**kwargs):
+    """Generate all media needed for store launch (see run_campaign)"""
+    return run_campaign(LAUNCH_CAMPAIGN, **kwargs)
+
+
+def main(argv=None):
+    """Command-line interface for campaign batches"""
+    parser = argparse.ArgumentParser(description="DuBuBu.com campaign media batch")
+    parser.add_argument('--campaign', default=LAUNCH_CAMPAIGN, metavar='NAME_OR_FILE',
+                        help=f"Campaign manifest (JSON/YAML) or bundled campaign: {', '.join(list_campaigns())}")
+    parser.add_argument('--dry-run', action='store_true',
+                        help='List the tasks the campaign expands to without generating anything')
+    parser.add_argument('--workers', '-w', type=int, default=4,
+                        help='Number of generation requests in flight at once')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Regenerate every asset instead of reusing cached results')
+    parser.add_argument('--resume', metavar='MANIFEST',
+                        help='Resume a previous run from its media_manifest_*.jsonl journal')
+    parser.add_argument('--derivatives', action='store_true',
+                        help='Also build WebP/AVIF responsive derivatives and placeholders')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Set aside near-duplicate and blank images before cataloguing')
+    parser.add_argument('--sheet', action='store_true',
+                        help='Write a contact sheet of the batch for review')
+    parser.add_argument('--store', default=DEFAULT_STORE, metavar='SQLITE',
+                        help=f"Persistent catalog store to update (default: {DEFAULT_STORE})")
+    parser.add_argument('--no-store', action='store_true',
+                        help='Only write the timestamped JSON catalog')
+    parser.add_argument('--queue', action='store_true',
+                        help="Submit all tasks to fal's queue up front and poll for results")
+    parser.add_argument('--no-coalesce', action='store_true',
+                        help='Send one request per task even when tasks share a prompt')
+    parser.add_argument('--trace', metavar='JSONL',
+                        help='Trace file for per-stage timings (default: media_trace_<timestamp>.jsonl)')
+    args = parser.parse_args(argv)
+    
+    try:
+        manifest = load_manifest(args.campaign)
+    except ManifestError as e:
+        parser.error(str(e))
+    
+    if args.dry_run:
+        for tid, task in iter_task_ids(iter_tasks(manifest)):
+            tags = ", ".join(f"{k}={v}" for k, v in task.get("tags", {}).items())
+            print(f"{tid:<24} {json.dumps(task['params'], ensure_ascii=False)}  [{tags}]")
+        print(f"\n📋 {manifest['name']}: {count_tasks(manifest)} tasks")
+        return
+    
+    run_campaign(
+        manifest,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        resume=args.resume,
+        derivatives=args.derivatives,
+        queue=args.queue,
+        coalesce=not args.no_coalesce,
+        trace=args.trace,
+        dedup=args.dedup,
+        store=None if args.no_store else args.store,
+        sheet=args.sheet
+    )
+
+
 if __name__ == "__main__":
-    generate_launch_media()
+    main()
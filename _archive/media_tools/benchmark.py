@@ -0,0 +1,319 @@
+"""
+Offline Benchmarks for DuBuBu.com
+Runs the media tools against the local stand-in (stub_server.py) and
+reports throughput, per-stage latency and peak memory, so performance
+regressions show up without API keys or network access
+
+Usage:
+    python -m media_tools bench                               # every scenario once
+    python -m media_tools bench launch catalog --repeat 3 --output bench.json
+    python -m media_tools bench --baseline bench.json         # exit 1 on regression
+"""
+
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Compared against a baseline run; higher is worse for every metric
+REGRESSION_METRICS = ("wall", "peak_rss_mb")
+DEFAULT_TOLERANCE = 0.25
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ==========================================
+# SCENARIOS
+# ==========================================
+
+def scenario_launch(server, options: Dict) -> int:
+    """The 23-task launch batch through fal subscribe, with downloads"""
+    from .batch_media import build_launch_tasks
+    from .fal_generator import DuBuBuImageGenerator
+    from .scheduler import BATCH
+    from .stub_server import StubFalClient
+
+    gen = DuBuBuImageGenerator(
+        use_cache=False,
+        download_workers=max(4, options["workers"]),
+        priority=BATCH,
+        client=StubFalClient(server.url)
+    )
+    grouped = gen.batch_generate_grouped(build_launch_tasks(), max_workers=options["workers"], coalesce=True)
+    gen.downloader.close()
+    return sum(len(images) for images in grouped)
+
+
+def scenario_launch_queue(server, options: Dict) -> int:
+    """The 23-task launch batch through fal's submit/poll queue"""
+    from .batch_media import build_launch_tasks
+    from .fal_generator import DuBuBuImageGenerator
+    from .fal_queue import FalQueueRunner
+    from .scheduler import BATCH
+    from .stub_server import StubFalClient
+
+    gen = DuBuBuImageGenerator(
+        use_cache=False,
+        download_workers=max(4, options["workers"]),
+        priority=BATCH,
+        client=StubFalClient(server.url)
+    )
+    runner = FalQueueRunner(gen, "fal_jobs.sqlite", poll_interval=0.1)
+    images = sum(len(imgs) for _, _, imgs, _ in runner.run_tasks(build_launch_tasks()))
+    gen.downloader.close()
+    return images
+
+
+def scenario_catalog(server, options: Dict) -> int:
+    """Search all 7 catalog categories, then mirror every rendition"""
+    from .gif_mirror import CATALOG_URL_KEYS, MediaMirror
+    from .tenor_fetcher import TenorFetcher
+
+    fetcher = TenorFetcher(use_cache=False, api_key="benchmark", base_url=f"{server.url}/tenor/v2")
+    catalog = fetcher.save_gif_catalog("gif_catalog.json")
+    urls = [gif[key] for gifs in catalog.values() for gif in gifs for key in CATALOG_URL_KEYS if gif.get(key)]
+
+    summary = MediaMirror("media_mirror", workers=options["workers"]).sync(urls)
+    return len(catalog) + summary["fetched"]
+
+
+def scenario_favicon(server, options: Dict) -> int:
+    """Full brand icon set from a synthetic 2048px logo, favicon_runs times"""
+    from PIL import Image
+
+    # convert_favicon.py lives next to the package, not inside it
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from convert_favicon import BRAND_OUTPUTS, generate_icons
+
+    source = Image.radial_gradient("L").resize((2048, 2048)).convert("RGBA")
+    source.save("logo.png")
+
+    written = 0
+    for run in range(options["favicon_runs"]):
+        outputs = [dict(o, path=f"icons/{run}/{o['path']}") for o in BRAND_OUTPUTS]
+        paths, _ = generate_icons("logo.png", outputs, state_file=None, force=True)
+        written += len(paths)
+    return written
+
+
+def scenario_sheet(server, options: Dict) -> int:
+    """Contact sheet and sprite atlas of sheet_images synthetic 256px images"""
+    from PIL import Image
+    from .contact_sheet import build_atlas, build_contact_sheet
+
+    Path("images").mkdir()
+    base = Image.radial_gradient("L")
+    paths = []
+    for i in range(options["sheet_images"]):
+        path = f"images/{i:04d}.png"
+        Image.merge("RGB", (base, base.rotate(i), Image.new("L", base.size, i % 256))).save(path, compress_level=1)
+        paths.append(path)
+
+    sheet = build_contact_sheet(paths, "contact_sheet.jpg", cache_dir="thumbs")
+    atlas = build_atlas(paths, "sprites", thumb=64, cache_dir="thumbs")
+    return len(sheet["items"]) + len(atlas["sprites"])
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "launch": scenario_launch,
+    "launch_queue": scenario_launch_queue,
+    "catalog": scenario_catalog,
+    "favicon": scenario_favicon,
+    "sheet": scenario_sheet,
+}
+
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+def run_scenario(name: str, options: Dict) -> Dict:
+    """
+    Run one scenario in the current process (normally a fresh worker, so
+    peak RSS belongs to this scenario alone) against its own stand-in.
+    """
+    from .stub_server import StubServer
+    from .telemetry import get_telemetry
+
+    workdir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    os.chdir(workdir)
+
+    server = StubServer(
+        latency=options["latency"],
+        jitter=options["jitter"],
+        inference=options["inference"],
+        error_rate=options["error_rate"],
+        image_bytes=options["image_bytes"],
+        gif_bytes=options["gif_bytes"],
+        seed=options["seed"]
+    ).start()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            items = SCENARIOS[name](server, options)
+        error = None
+    except Exception as e:
+        items, error = 0, f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - start
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    server.stop()
+
+    os.chdir(tempfile.gettempdir())
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = get_telemetry().summary()
+    return {
+        "scenario": name,
+        "wall": round(wall, 4),
+        "items": items,
+        "throughput": round(items / wall, 2) if wall else 0.0,
+        "peak_traced_mb": round(peak_traced / (1024 * 1024), 1),
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": summary["stages"],
+        "counters": summary["counters"],
+        "server": dict(server.stats),
+        "error": error,
+    }
+
+
+def run_benchmarks(names: List[str], options: Dict, repeat: int = 1) -> List[Dict]:
+    """Each run gets a freshly spawned process; the median-wall run is reported"""
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    for name in names:
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs.append(pool.submit(run_scenario, name, options).result())
+
+        runs.sort(key=lambda r: r["wall"])
+        result = runs[len(runs) // 2]
+        result["runs"] = [r["wall"] for r in runs]
+        if repeat > 1:
+            result["wall_stdev"] = round(statistics.stdev(result["runs"]), 4)
+        results.append(result)
+        print(f"   {name}: {result['wall']:.2f}s" + (f"  ❌ {result['error']}" if result["error"] else ""))
+
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Regressions vs. a previous results file, as human-readable lines"""
+    previous = {r["scenario"]: r for r in baseline}
+    regressions = []
+
+    for result in results:
+        before = previous.get(result["scenario"])
+        if not before:
+            continue
+        for metric in REGRESSION_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append(f"{result['scenario']} {metric}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+
+    return regressions
+
+
+def print_results(results: List[Dict]) -> None:
+    print(f"\n{'scenario':<14}{'wall s':>9}{'items':>7}{'items/s':>9}{'traced MB':>11}{'rss MB':>9}")
+    for r in results:
+        print(f"{r['scenario']:<14}{r['wall']:>9.2f}{r['items']:>7}{r['throughput']:>9.1f}"
+              f"{r['peak_traced_mb']:>11.1f}{(r['peak_rss_mb'] or 0):>9.1f}")
+
+    for r in results:
+        print(f"\n▶ {r['scenario']}  (server: {r['server']['requests']} requests, {r['server']['errors']} injected errors)")
+        for stage, s in r["stages"].items():
+            print(f"   {stage:<22}n={s['count']:<5} p50 {s['p50']:.3f}s  p95 {s['p95']:.3f}s  max {s['max']:.3f}s")
+
+
+def main(argv=None):
+    """Command-line interface: run scenarios and compare against a baseline"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the DuBuBu media tools")
+    parser.add_argument('scenarios', nargs='*',
+                        help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument('--repeat', '-r', type=int, default=1, help='Runs per scenario (median is reported)')
+    parser.add_argument('--workers', '-w', type=int, default=4, help='Concurrency passed to the tools')
+    parser.add_argument('--latency', type=float, default=0.02, help='Stand-in latency per response (s)')
+    parser.add_argument('--jitter', type=float, default=0.01, help='Extra random latency per response (s)')
+    parser.add_argument('--inference', type=float, default=0.3, help='Stand-in fal job duration (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of API calls answered 429/503')
+    parser.add_argument('--image-bytes', type=int, default=200_000, help='Generated image size')
+    parser.add_argument('--gif-bytes', type=int, default=500_000, help='Tenor media size')
+    parser.add_argument('--favicon-runs', type=int, default=5, help='Icon sets rendered in the favicon scenario')
+    parser.add_argument('--sheet-images', type=int, default=500, help='Images composited in the sheet scenario')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for injected latency and errors')
+    parser.add_argument('--output', '-o', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Previous results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed slowdown vs. baseline before failing (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    options = {
+        "workers": args.workers,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "inference": args.inference,
+        "error_rate": args.error_rate,
+        "image_bytes": args.image_bytes,
+        "gif_bytes": args.gif_bytes,
+        "favicon_runs": args.favicon_runs,
+        "sheet_images": args.sheet_images,
+        "seed": args.seed,
+    }
+
+    print("🧪 Running offline benchmarks...")
+    results = run_benchmarks(args.scenarios or list(SCENARIOS), options, args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"options": options, "results": results}, f, indent=2)
+        print(f"\n📄 Results saved: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for line in regressions:
+            print(f"⚠️  Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+    if any(r["error"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Incremental Build Graph for DuBuBu.com
+A make-like dependency graph for the media toolchain. Every node records a
+fingerprint of what it was built from (input values, input file contents
+and the results of the nodes it depends on); a rebuild only runs nodes whose
+fingerprint changed or whose outputs went missing, with independent nodes
+running in parallel
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .telemetry import get_telemetry
+
+
+DEFAULT_STATE = ".media_build.sqlite"
+
+# Node statuses reported by BuildGraph.run
+BUILT = "built"
+FRESH = "fresh"
+STALE = "stale"      # dry run: would be built
+FAILED = "failed"
+BLOCKED = "blocked"  # a dependency failed
+
+
+def _digest(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Node:
+    """
+    One buildable output.
+
+    Args:
+        name: Unique node name, e.g. 'launch/product:3fa2c1d0e9b7'
+        action: Called with {dep name: dep result}; returns a JSON-serializable
+                result. A dict result may list produced files under 'outputs'.
+        inputs: JSON-serializable values the output depends on
+        files: Input files, fingerprinted by content
+        deps: Names of nodes whose results this node needs
+        outputs: Files the node is known to produce up front
+        ttl: Seconds after which the node is stale regardless of inputs
+             (for remote data such as search results)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        action: Callable[[Dict[str, Any]], Any],
+        inputs: Optional[Dict] = None,
+        files: Iterable[str] = (),
+        deps: Iterable[str] = (),
+        outputs: Iterable[str] = (),
+        ttl: Optional[float] = None
+    ):
+        self.name = name
+        self.action = action
+        self.inputs = inputs or {}
+        self.files = [str(f) for f in files]
+        self.deps = list(deps)
+        self.outputs = [str(o) for o in outputs]
+        self.ttl = ttl
+
+
+class BuildState:
+    """
+    SQLite record of the last successful build of every node, plus a
+    content-hash cache for input files keyed by size and mtime so unchanged
+    files are never re-read.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS nodes (
+            name        TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            result      TEXT,
+            outputs     TEXT NOT NULL,
+            built_at    REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS files (
+            path     TEXT PRIMARY KEY,
+            size     INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            digest   TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(self.SCHEMA)
+
+    def get(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM nodes WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "fingerprint": row["fingerprint"],
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "outputs": json.loads(row["outputs"]),
+            "built_at": row["built_at"],
+        }
+
+    def put(self, name: str, fingerprint: str, result: Any, outputs: List[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO nodes (name, fingerprint, result, outputs, built_at) VALUES (?, ?, ?, ?, ?)",
+                (name, fingerprint, json.dumps(result, ensure_ascii=False, default=str), json.dumps(outputs), time.time())
+            )
+
+    def forget(self, names: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM nodes WHERE name = ?", [(n,) for n in names])
+
+    def file_digest(self, path: str) -> Optional[str]:
+        """sha256 of a file's contents, or None if it does not exist"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, digest FROM files WHERE path = ?", (path,)).fetchone()
+        if row and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+            return row["digest"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+            )
+        return digest.hexdigest()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class BuildGraph:
+    """
+    Nodes plus the scheduler that builds them.
+
+        graph = BuildGraph(BuildState())
+        graph.add(Node("icons", render, files=["logo.png"], outputs=["favicon.ico"]))
+        graph.add(Node("manifest", write_manifest, deps=["icons"]))
+        report = graph.run(jobs=4)     # {name: {"status": ..., "result": ..., "error": ...}}
+    """
+
+    def __init__(self, state: BuildState):
+        self.state = state
+        self.nodes: Dict[str, Node] = {}
+        self.telemetry = get_telemetry()
+
+    def add(self, node: Node) -> Node:
+        if node.name in self.nodes:
+            raise ValueError(f"Duplicate build node: {node.name}")
+        self.nodes[node.name] = node
+        return node
+
+    def closure(self, targets: Optional[Iterable[str]] = None) -> List[str]:
+        """Targets and everything they depend on, dependencies first"""
+        order: List[str] = []
+        visiting, done = set(), set()
+
+        def visit(name: str, parent: Optional[str]):
+            if name in done:
+                return
+            if name not in self.nodes:
+                raise ValueError(f"Unknown build node '{name}'" + (f" (needed by {parent})" if parent else ""))
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through '{name}'")
+            visiting.add(name)
+            for dep in self.nodes[name].deps:
+                visit(dep, name)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in (targets if targets is not None else list(self.nodes)):
+            visit(name, None)
+        return order
+
+    def fingerprint(self, node: Node, dep_results: Dict[str, Any]) -> str:
+        return _digest({
+            "inputs": node.inputs,
+            "files": {path: self.state.file_digest(path) for path in node.files},
+            "deps": {name: _digest(result) for name, result in dep_results.items()},
+        })
+
+    def _is_fresh(self, node: Node, fingerprint: str, record: Optional[Dict]) -> bool:
+        if not record or record["fingerprint"] != fingerprint:
+            return False
+        if node.ttl is not None and time.time() - record["built_at"] > node.ttl:
+            return False
+        return all(os.path.exists(path) for path in record["outputs"])
+
+    def _build(self, node: Node, dep_results: Dict[str, Any], force: bool, dry_run: bool) -> Dict:
+        """Check one node and build it if stale. Runs in a worker thread."""
+        with self.telemetry.task(node.name), self.telemetry.span("build.node") as span:
+            fingerprint = self.fingerprint(node, dep_results)
+            record = self.state.get(node.name)
+
+            if not force and self._is_fresh(node, fingerprint, record):
+                span["status"] = FRESH
+                return {"status": FRESH, "result": record["result"]}
+            if dry_run:
+                span["status"] = STALE
+                return {"status": STALE, "result": None}
+
+            try:
+                result = node.action(dep_results)
+            except Exception as e:
+                span.update(status=FAILED, ok=False)
+                return {"status": FAILED, "result": None, "error": f"{type(e).__name__}: {e}"}
+
+            produced = result.get("outputs", []) if isinstance(result, dict) else []
+            outputs = list(dict.fromkeys(node.outputs + [str(p) for p in produced]))
+            self.state.put(node.name, fingerprint, result, outputs)
+            span["status"] = BUILT
+            return {"status": BUILT, "result": result}
+
+    def run(
+        self,
+        targets: Optional[Iterable[str]] = None,
+        jobs: int = 4,
+        force: bool = False,
+        dry_run: bool = False,
+        on_node: Optional[Callable[[str, Dict], None]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Bring targets (default: every node) up to date.
+
+        A node starts as soon as all its dependencies have finished; nodes
+        whose dependency failed are reported as blocked. In a dry run, stale
+        nodes are reported instead of built, and so are their dependents.
+        on_node(name, report) fires as each node finishes.
+        """
+        order = self.closure(targets)
+        waiting = {name: len(self.nodes[name].deps) for name in order}
+        dependents: Dict[str, List[str]] = {name: [] for name in order}
+        for name in order:
+            for dep in self.nodes[name].deps:
+                dependents[dep].append(name)
+
+        reports: Dict[str, Dict] = {}
+
+        def finish(name: str, report: Dict) -> List[str]:
+            reports[name] = report
+            if on_node:
+                on_node(name, report)
+            ready = []
+            for child in dependents[name]:
+                waiting[child] -= 1
+                if waiting[child] == 0:
+                    ready.append(child)
+            return ready
+
+        def resolve(name: str) -> Optional[Dict]:
+            """Report for a node that need not (or cannot) run, else None"""
+            statuses = [reports[dep]["status"] for dep in self.nodes[name].deps]
+            if FAILED in statuses or BLOCKED in statuses:
+                return {"status": BLOCKED, "result": None}
+            if STALE in statuses:
+                return {"status": STALE, "result": None}
+            return None
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            in_flight: Dict = {}
+            ready = [name for name in order if waiting[name] == 0]
+
+            while ready or in_flight:
+                while ready:
+                    name = ready.pop(0)
+                    report = resolve(name)
+                    if report:
+                        ready.extend(finish(name, report))
+                        continue
+                    dep_results = {dep: reports[dep]["result"] for dep in self.nodes[name].deps}
+                    in_flight[pool.submit(self._build, self.nodes[name], dep_results, force, dry_run)] = name
+
+                if in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        ready.extend(finish(in_flight.pop(future), future.result()))
+
+        return {name: reports[name] for name in order}
+
+
+def summarize(reports: Dict[str, Dict]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for report in reports.values():
+        counts[report["status"]] = counts.get(report["status"], 0) + 1
+    return counts
+
+
+def print_report(reports: Dict[str, Dict], verbose: bool = False) -> None:
+    icons = {BUILT: "✅", FRESH: "·", STALE: "~", FAILED: "❌", BLOCKED: "⏭"}
+    for name, report in reports.items():
+        if verbose or report["status"] != FRESH:
+            detail = f"  {report['error']}" if report.get("error") else ""
+            print(f"{icons[report['status']]} {report['status']:<8}{name}{detail}")
+
+    counts = summarize(reports)
+    print(f"\n🔨 {len(reports)} nodes: " + ", ".join(f"{n} {status}" for status, n in counts.items()))
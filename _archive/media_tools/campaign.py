@@ -0,0 +1,154 @@
+"""
+Campaign Manifests for DuBuBu.com
+Describes a batch as data (JSON, or YAML with PyYAML installed): task
+entries with shared defaults, matrix expansion and templated params/tags.
+Tasks are expanded lazily, so a seasonal campaign with hundreds of assets
+is never materialised in memory
+"""
+
+import itertools
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Union
+
+
+CAMPAIGNS_DIR = Path(__file__).parent / "campaigns"
+
+# Keys a task entry may carry; num_images/seed/model are task-level
+# overrides understood by DuBuBuImageGenerator.task_request
+ENTRY_KEYS = {"type", "params", "matrix", "exclude", "tags", "num_images", "seed", "model"}
+DEFAULT_KEYS = {"tags", "num_images", "seed", "model"}
+
+
+class ManifestError(ValueError):
+    """A campaign manifest that cannot be loaded or expanded"""
+
+
+def resolve_manifest(name_or_path: Union[str, Path]) -> Path:
+    """A manifest path, or the name of a bundled campaign (e.g. 'launch')"""
+    path = Path(name_or_path)
+    if path.exists():
+        return path
+    for suffix in (".json", ".yaml", ".yml"):
+        bundled = CAMPAIGNS_DIR / f"{name_or_path}{suffix}"
+        if bundled.exists():
+            return bundled
+    raise ManifestError(f"No manifest at {name_or_path} and no bundled campaign of that name")
+
+
+def load_manifest(name_or_path: Union[str, Path]) -> Dict:
+    """Read and validate a manifest"""
+    path = resolve_manifest(name_or_path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ManifestError("YAML manifests need PyYAML (pip install pyyaml)")
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    validate(manifest, str(path))
+    manifest.setdefault("name", path.stem)
+    return manifest
+
+
+def validate(manifest: Any, source: str = "manifest") -> None:
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("tasks"), list):
+        raise ManifestError(f"{source}: expected an object with a 'tasks' list")
+
+    unknown = set(manifest.get("defaults", {})) - DEFAULT_KEYS
+    if unknown:
+        raise ManifestError(f"{source}: unknown defaults {sorted(unknown)}")
+
+    for n, entry in enumerate(manifest["tasks"]):
+        where = f"{source}: tasks[{n}]"
+        if not isinstance(entry, dict) or not entry.get("type"):
+            raise ManifestError(f"{where}: every task needs a 'type'")
+        unknown = set(entry) - ENTRY_KEYS
+        if unknown:
+            raise ManifestError(f"{where}: unknown keys {sorted(unknown)}")
+        for key, values in entry.get("matrix", {}).items():
+            if not isinstance(values, list) or not values:
+                raise ManifestError(f"{where}: matrix '{key}' must be a non-empty list")
+
+
+def _render(value: Any, variables: Dict, where: str) -> Any:
+    """
+    Fill {name} placeholders from the matrix variables. A string that is
+    exactly one placeholder keeps the variable's type (numbers, lists...).
+    """
+    if isinstance(value, dict):
+        return {k: _render(v, variables, where) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_render(v, variables, where) for v in value]
+    if not isinstance(value, str) or "{" not in value:
+        return value
+
+    if value.startswith("{") and value.endswith("}") and value[1:-1] in variables:
+        return variables[value[1:-1]]
+    try:
+        return value.format_map(variables)
+    except (KeyError, IndexError, ValueError) as e:
+        raise ManifestError(f"{where}: cannot fill '{value}' ({type(e).__name__}: {e})")
+
+
+def _combinations(entry: Dict) -> Iterator[Dict]:
+    """
+    Variables for each matrix combination, in row-major order. A matrix
+    value that is an object contributes all of its keys; anything else is
+    bound to the matrix key itself. Combinations matching every key of an
+    'exclude' item are skipped.
+    """
+    matrix = entry.get("matrix", {})
+    keys = list(matrix)
+    excludes = entry.get("exclude", [])
+
+    for combo in itertools.product(*(matrix[k] for k in keys)):
+        variables: Dict = {}
+        for key, value in zip(keys, combo):
+            if isinstance(value, dict):
+                variables.update(value)
+            else:
+                variables[key] = value
+
+        if any(all(variables.get(k) == v for k, v in ex.items()) for ex in excludes):
+            continue
+        yield variables
+
+
+def expand_entry(entry: Dict, defaults: Dict, where: str = "task") -> Iterator[Dict]:
+    """
+    Batch tasks for one manifest entry. Without an explicit 'params', the
+    matrix variables are the params; with one, variables only reach the
+    params through {placeholders}.
+    """
+    for variables in _combinations(entry):
+        params = _render(entry["params"], variables, where) if "params" in entry else dict(variables)
+        task = {
+            "type": entry["type"],
+            "params": params,
+            "tags": _render({**defaults.get("tags", {}), **entry.get("tags", {})}, variables, where),
+        }
+        for key in ("num_images", "seed", "model"):
+            if key in entry or key in defaults:
+                task[key] = _render(entry.get(key, defaults.get(key)), variables, where)
+        yield task
+
+
+def iter_tasks(manifest: Dict) -> Iterator[Dict]:
+    """Every task of the campaign, expanded one at a time"""
+    defaults = manifest.get("defaults", {})
+    for n, entry in enumerate(manifest["tasks"]):
+        yield from expand_entry(entry, defaults, f"{manifest.get('name', 'manifest')}: tasks[{n}]")
+
+
+def count_tasks(manifest: Dict) -> int:
+    return sum(1 for _ in iter_tasks(manifest))
+
+
+def list_campaigns() -> List[str]:
+    """Names of the campaigns bundled in campaigns/"""
+    return sorted(p.stem for p in CAMPAIGNS_DIR.glob("*") if p.suffix in (".json", ".yaml", ".yml"))
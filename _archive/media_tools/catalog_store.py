@@ -0,0 +1,254 @@
+"""
+Media Catalog Store for DuBuBu.com
+One persistent, indexed SQLite catalog of every generated image and Tenor
+GIF, written incrementally by the batch and GIF tools, so lookups such as
+"all instagram couple_goals images at square_hd" are an index query instead
+of a scan over every timestamped JSON dump
+
+Usage:
+    python -m media_tools query --category social --platform instagram --theme couple_goals --size square_hd
+    python -m media_tools query --stats
+    python -m media_tools query --import media_catalog_*.json gif_catalog.json
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_STORE = "media_catalog.sqlite"
+
+# Columns that can be filtered on; each has an index
+FILTERS = ("kind", "campaign", "category", "subcategory", "theme", "platform", "size", "model", "prompt_hash")
+
+
+def prompt_hash(prompt: Optional[str]) -> Optional[str]:
+    """Short stable hash of a full prompt, for finding every image of one prompt"""
+    if not prompt:
+        return None
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class CatalogStore:
+    """
+    SQLite catalog, one row per media item:
+
+        media_key   local path (generated images) or tenor:<id> (GIFs)
+        kind        'image' | 'gif'
+        campaign, task_id, category, subcategory, theme, platform,
+        size, model, prompt_hash, url, local_path, width, height
+        record      the full catalog record as JSON
+
+    Writing an item again replaces its row.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS media (
+            media_key   TEXT PRIMARY KEY,
+            kind        TEXT NOT NULL,
+            campaign    TEXT,
+            task_id     TEXT,
+            category    TEXT,
+            subcategory TEXT,
+            theme       TEXT,
+            platform    TEXT,
+            size        TEXT,
+            model       TEXT,
+            prompt_hash TEXT,
+            url         TEXT,
+            local_path  TEXT,
+            width       INTEGER,
+            height      INTEGER,
+            added_at    TEXT NOT NULL,
+            record      TEXT NOT NULL
+        )
+    """
+
+    COLUMNS = ("media_key", "kind", "campaign", "task_id", "category", "subcategory", "theme", "platform",
+               "size", "model", "prompt_hash", "url", "local_path", "width", "height", "added_at", "record")
+
+    def __init__(self, path: str = DEFAULT_STORE):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(self.SCHEMA)
+            for column in FILTERS:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS media_{column} ON media ({column})")
+            # The common storefront lookup: a section, narrowed by theme
+            self._conn.execute("CREATE INDEX IF NOT EXISTS media_category_theme ON media (category, subcategory, theme)")
+
+    def _write(self, rows: List[tuple]) -> int:
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO media ({', '.join(self.COLUMNS)}) VALUES ({placeholders})", rows
+            )
+        return len(rows)
+
+    def add_images(
+        self,
+        images: Iterable[Dict],
+        campaign: Optional[str] = None,
+        task_id: Optional[str] = None
+    ) -> int:
+        """Upsert generated image records (as produced by batch_media, tags included)"""
+        now = datetime.now().isoformat()
+        rows = []
+        for img in images:
+            key = img.get("local_path") or img.get("url")
+            if not key:
+                continue
+            rows.append((
+                key, "image", campaign or img.get("campaign"), task_id or img.get("task_id"),
+                img.get("category"), img.get("subcategory"), img.get("theme"), img.get("platform"),
+                img.get("size"), img.get("model"), prompt_hash(img.get("prompt")),
+                img.get("url"), img.get("local_path"), img.get("width"), img.get("height"),
+                img.get("timestamp") or now, json.dumps(img, ensure_ascii=False),
+            ))
+        return self._write(rows)
+
+    def add_gifs(self, category: str, gifs: Iterable[Dict]) -> int:
+        """Upsert Tenor GIF records (TenorFetcher._extract_urls format) for one category"""
+        now = datetime.now().isoformat()
+        rows = []
+        for gif in gifs:
+            if not gif.get("id"):
+                continue
+            rows.append((
+                f"tenor:{gif['id']}", "gif", None, None,
+                category, None, None, None, None, None, None,
+                gif.get("gif"), None, None, None,
+                now, json.dumps(dict(gif, category=category), ensure_ascii=False),
+            ))
+        return self._write(rows)
+
+    def remove(self, keys: Iterable[str]) -> int:
+        with self._lock, self._conn:
+            cursor = self._conn.executemany("DELETE FROM media WHERE media_key = ?", [(k,) for k in keys])
+        return cursor.rowcount
+
+    @staticmethod
+    def _where(filters: Dict) -> tuple:
+        unknown = set(filters) - set(FILTERS) - {"prompt"}
+        if unknown:
+            raise ValueError(f"Unknown catalog filter(s): {', '.join(sorted(unknown))}")
+
+        filters = dict(filters)
+        if filters.get("prompt"):
+            filters["prompt_hash"] = prompt_hash(filters["prompt"])
+        filters.pop("prompt", None)
+
+        clauses = [(f"{column} = ?", value) for column, value in filters.items() if value is not None]
+        if not clauses:
+            return "", []
+        return " WHERE " + " AND ".join(c for c, _ in clauses), [v for _, v in clauses]
+
+    def query(self, limit: Optional[int] = None, offset: int = 0, **filters) -> List[Dict]:
+        """
+        Catalog records matching every given filter (see FILTERS; prompt=
+        matches the full prompt via its hash), newest first.
+        """
+        where, params = self._where(filters)
+        sql = f"SELECT media_key, kind, campaign, task_id, record FROM media{where} ORDER BY added_at DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        results = []
+        for row in rows:
+            record = json.loads(row["record"])
+            record.update(media_key=row["media_key"], kind=row["kind"])
+            if row["campaign"]:
+                record["campaign"] = row["campaign"]
+            if row["task_id"]:
+                record["task_id"] = row["task_id"]
+            results.append(record)
+        return results
+
+    def count(self, **filters) -> int:
+        where, params = self._where(filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM media{where}", params).fetchone()[0]
+
+    def facets(self, column: str, **filters) -> Dict[str, int]:
+        """Item counts per value of one column, e.g. facets('platform', category='social')"""
+        if column not in FILTERS:
+            raise ValueError(f"Unknown catalog column: {column}")
+        where, params = self._where(filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {column}, COUNT(*) FROM media{where} GROUP BY {column} ORDER BY COUNT(*) DESC", params
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def import_json(self, path: str) -> int:
+        """Backfill from a media_catalog_*.json (batch_media) or gif_catalog.json (Tenor) dump"""
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        if isinstance(data, dict) and isinstance(data.get("images"), list):
+            return self.add_images(data["images"], campaign=data.get("campaign"))
+        return sum(self.add_gifs(category, gifs) for category, gifs in data.items() if isinstance(gifs, list))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def main(argv=None):
+    """Command-line interface: query, summarize or backfill the media catalog"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the DuBuBu media catalog")
+    parser.add_argument('--store', default=DEFAULT_STORE, help='Catalog database (SQLite)')
+    for column in FILTERS:
+        if column != "prompt_hash":
+            parser.add_argument(f"--{column}", help=f"Match {column}")
+    parser.add_argument('--prompt', help='Match the exact full prompt')
+    parser.add_argument('--limit', '-n', type=int, default=50, help='Maximum results (default: 50)')
+    parser.add_argument('--json', action='store_true', help='Print matching records as JSON')
+    parser.add_argument('--stats', action='store_true', help='Counts per kind, campaign, category, platform and size')
+    parser.add_argument('--import', dest='imports', nargs='+', metavar='JSON',
+                        help='Backfill from existing media_catalog_*.json / gif_catalog.json files')
+    args = parser.parse_args(argv)
+
+    store = CatalogStore(args.store)
+    filters = {column: getattr(args, column, None) for column in FILTERS if column != "prompt_hash"}
+    filters["prompt"] = args.prompt
+
+    if args.imports:
+        for path in args.imports:
+            print(f"📥 {path}: {store.import_json(path)} items")
+        return
+
+    if args.stats:
+        print(f"📚 {store.count(**filters)} items in {args.store}")
+        for column in ("kind", "campaign", "category", "platform", "size"):
+            counts = ", ".join(f"{value}: {n}" for value, n in store.facets(column, **filters).items() if value)
+            print(f"   {column:<10}{counts or '-'}")
+        return
+
+    results = store.query(limit=args.limit, **filters)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    for item in results:
+        where = item.get("local_path") or item.get("url") or item.get("gif")
+        labels = "/".join(str(item[k]) for k in ("category", "subcategory", "theme", "size") if item.get(k))
+        print(f"{item['kind']:<6}{labels:<40} {where}")
+    total = store.count(**filters)
+    print(f"\n🔎 {len(results)} of {total} matching items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Configuration for DuBuBu.com media tools
+API keys and endpoints are resolved on first use instead of at import time,
+so importing a module (or running --help) never reads .env.local
+"""
+
+import os
+import threading
+from typing import Optional
+
+
+ENV_FILE = ".env.local"
+DEFAULT_TENOR_BASE_URL = "https://tenor.googleapis.com/v2"
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env(path: str = ENV_FILE) -> None:
+    """Load .env.local into os.environ once per process"""
+    global _env_loaded
+    with _env_lock:
+        if _env_loaded:
+            return
+        from dotenv import load_dotenv
+        load_dotenv(path)
+        _env_loaded = True
+
+
+def get(name: str, default: Optional[str] = None) -> Optional[str]:
+    load_env()
+    return os.getenv(name, default)
+
+
+def fal_key() -> Optional[str]:
+    return get("FAL_KEY")
+
+
+def tenor_api_key() -> Optional[str]:
+    return get("TENOR_API_KEY")
+
+
+def tenor_base_url() -> str:
+    return get("TENOR_BASE_URL", DEFAULT_TENOR_BASE_URL)
@@ -0,0 +1,388 @@
+"""
+Contact Sheets and Sprite Atlases for DuBuBu.com
+Composites many generated images into one picture: a labelled contact sheet
+for reviewing a batch at a glance, or a shelf-packed sprite atlas with a
+JSON coordinate map and CSS for the storefront's small thumbnails and icons.
+Tiles are pasted as NumPy slice assignments into one preallocated canvas,
+and thumbnails are cached so re-reviewing a batch only decodes new images.
+
+Usage:
+    python -m media_tools sheet                                  # generated_images/ -> contact_sheet.jpg
+    python -m media_tools sheet media_catalog_launch.json --cell 256 --output launch_review.jpg
+    python -m media_tools sheet public/icons --atlas public/sprites/icons --thumb 64
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw
+
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+THUMB_DIR = "generated_images/.thumbs"
+
+# Contact sheet cells are square; the label strip sits under the image
+DEFAULT_CELL = 192
+DEFAULT_GAP = 8
+LABEL_HEIGHT = 14
+DEFAULT_BACKGROUND = "#1e1e1e"
+
+# Atlas sprites are downscaled to fit this box (0 keeps native size);
+# padding keeps neighbours from bleeding in when the browser scales a sprite
+DEFAULT_THUMB = 128
+DEFAULT_PADDING = 2
+
+
+# ==========================================
+# THUMBNAILS
+# ==========================================
+
+def collect_images(sources: List[str]) -> List[str]:
+    """
+    Image paths from folders, image files and catalog JSON files
+    (media_catalog_*.json: every image's local_path), in order, deduplicated.
+    """
+    paths = []
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            paths += sorted(str(p) for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        elif path.suffix.lower() == ".json":
+            with open(path, "r") as f:
+                data = json.load(f)
+            paths += [img["local_path"] for img in data.get("images", []) if img.get("local_path")]
+        else:
+            paths.append(str(path))
+    return [p for p in dict.fromkeys(paths) if os.path.exists(p)]
+
+
+def _cache_path(path: str, max_size: int, cache_dir: str) -> Path:
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{max_size}"
+    return Path(cache_dir) / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]}.png"
+
+
+def load_thumbnail(path: str, max_size: int, cache_dir: Optional[str] = THUMB_DIR) -> np.ndarray:
+    """
+    One image as an RGBA uint8 array fitting inside max_size x max_size
+    (0 = native size, never upscaled). JPEGs are reduced while decoding;
+    with cache_dir, thumbnails are reused while the source is unchanged.
+    """
+    cached = _cache_path(path, max_size, cache_dir) if cache_dir and max_size else None
+    if cached and cached.exists():
+        with Image.open(cached) as img:
+            return np.asarray(img.convert("RGBA"))
+
+    with Image.open(path) as img:
+        source_size = img.size
+        if max_size:
+            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        thumb = img.convert("RGBA")
+
+    # Sources already near thumbnail size decode about as fast as a cached copy
+    if cached and max(source_size) > 2 * max_size:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        thumb.save(cached, compress_level=1)
+    return np.asarray(thumb)
+
+
+def _thumbnail_safely(args) -> Tuple[str, Optional[np.ndarray], Optional[str]]:
+    path, max_size, cache_dir = args
+    try:
+        return path, load_thumbnail(path, max_size, cache_dir), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def load_thumbnails(
+    paths: List[str],
+    max_size: int,
+    cache_dir: Optional[str] = THUMB_DIR,
+    workers: Optional[int] = None
+) -> Tuple[List[Tuple[str, np.ndarray]], List[Dict]]:
+    """
+    Thumbnails for many images; cache misses are decoded across a process pool.
+
+    Returns:
+        ([(path, RGBA array)] in input order, [{"path", "error"}] for unreadable files)
+    """
+    loaded: Dict[str, Tuple] = {}
+    misses = []
+    for path in paths:
+        cached = _cache_path(path, max_size, cache_dir) if cache_dir and max_size else None
+        if cached and cached.exists():
+            # Small cached PNGs decode faster here than a pool round trip
+            loaded[path] = _thumbnail_safely((path, max_size, cache_dir))
+        else:
+            misses.append((path, max_size, cache_dir))
+
+    if len(misses) < 16 or workers == 1:
+        results = map(_thumbnail_safely, misses)
+        loaded.update((job[0], result) for job, result in zip(misses, results))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_thumbnail_safely, misses, chunksize=max(1, min(32, len(misses) // 16)))
+            loaded.update((job[0], result) for job, result in zip(misses, results))
+
+    results = [loaded[path] for path in paths]
+    tiles = [(path, tile) for path, tile, error in results if error is None]
+    errors = [{"path": path, "error": error} for path, _, error in results if error]
+    return tiles, errors
+
+
+# ==========================================
+# LAYOUT AND COMPOSITING
+# ==========================================
+
+def grid_layout(
+    sizes: np.ndarray,
+    cell: int = DEFAULT_CELL,
+    columns: Optional[int] = None,
+    gap: int = DEFAULT_GAP,
+    label_height: int = 0
+) -> Tuple[np.ndarray, Tuple[int, int], int]:
+    """
+    Contact sheet layout: each (width, height) centered in a square cell of
+    a near-square grid.
+
+    Returns:
+        ((n, 2) array of x, y positions, (sheet width, sheet height), columns)
+    """
+    n = len(sizes)
+    columns = columns or max(1, math.ceil(math.sqrt(n)))
+    rows = max(1, math.ceil(n / columns))
+    pitch_x, pitch_y = cell + gap, cell + label_height + gap
+
+    index = np.arange(n)
+    positions = np.empty((n, 2), dtype=np.int64)
+    positions[:, 0] = gap + (index % columns) * pitch_x + (cell - sizes[:, 0]) // 2
+    positions[:, 1] = gap + (index // columns) * pitch_y + (cell - sizes[:, 1]) // 2
+    return positions, (gap + columns * pitch_x, gap + rows * pitch_y), columns
+
+
+def shelf_pack(
+    sizes: np.ndarray,
+    width: Optional[int] = None,
+    padding: int = DEFAULT_PADDING
+) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Pack rectangles into shelves (next-fit decreasing height): sprites are
+    placed tallest first, left to right, starting a new shelf when a row is
+    full. The default width makes the atlas roughly square.
+
+    Returns:
+        ((n, 2) array of x, y positions in input order, (atlas width, atlas height))
+    """
+    padded = sizes + padding
+    if width is None:
+        area = int((padded[:, 0] * padded[:, 1]).sum())
+        width = math.ceil(math.sqrt(area) * 1.05)
+    width = max(width, int(padded[:, 0].max(initial=0)) + padding)
+
+    # Tallest first; ties by width so equal-height icons line up
+    order = np.lexsort((-padded[:, 0], -padded[:, 1]))
+    positions = np.empty((len(sizes), 2), dtype=np.int64)
+    x = y = shelf_height = padding
+
+    for i in order.tolist():
+        w, h = int(padded[i, 0]), int(padded[i, 1])
+        if x + w > width:
+            x, y = padding, y + shelf_height
+            shelf_height = padding
+        positions[i] = (x, y)
+        x += w
+        shelf_height = max(shelf_height, h)
+
+    return positions, (width, y + shelf_height)
+
+
+def composite(tiles: List[np.ndarray], positions: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Paste RGBA tiles into one transparent (height, width, 4) canvas, one slice copy per tile"""
+    canvas = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+    for tile, (x, y) in zip(tiles, positions.tolist()):
+        canvas[y:y + tile.shape[0], x:x + tile.shape[1]] = tile
+    return canvas
+
+
+def _sizes(tiles: List[np.ndarray]) -> np.ndarray:
+    return np.array([(tile.shape[1], tile.shape[0]) for tile in tiles], dtype=np.int64).reshape(-1, 2)
+
+
+# ==========================================
+# CONTACT SHEET
+# ==========================================
+
+def build_contact_sheet(
+    paths: List[str],
+    output: str = "contact_sheet.jpg",
+    cell: int = DEFAULT_CELL,
+    columns: Optional[int] = None,
+    labels: bool = True,
+    background: str = DEFAULT_BACKGROUND,
+    cache_dir: Optional[str] = THUMB_DIR,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Render a review sheet of paths into output (format from its suffix) and
+    write a <output>.json map of which cell holds which source.
+    """
+    tiles, errors = load_thumbnails(paths, cell, cache_dir, workers)
+    arrays = [tile for _, tile in tiles]
+    sizes = _sizes(arrays)
+    label_height = LABEL_HEIGHT if labels else 0
+    positions, size, columns = grid_layout(sizes, cell, columns, label_height=label_height)
+
+    sheet = Image.new("RGBA", size, ImageColor.getrgb(background))
+    sheet.alpha_composite(Image.fromarray(composite(arrays, positions, size), "RGBA"))
+
+    items = []
+    draw = ImageDraw.Draw(sheet) if labels else None
+    for i, (path, _) in enumerate(tiles):
+        x, y = positions[i].tolist()
+        w, h = sizes[i].tolist()
+        items.append({"source": path, "x": x, "y": y, "width": w, "height": h})
+        if draw:
+            cell_x = DEFAULT_GAP + (i % columns) * (cell + DEFAULT_GAP)
+            cell_y = DEFAULT_GAP + (i // columns) * (cell + label_height + DEFAULT_GAP)
+            draw.text((cell_x, cell_y + cell + 1), Path(path).stem[:cell // 6], fill=(200, 200, 200, 255))
+
+    target = Path(output)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.suffix.lower() in (".jpg", ".jpeg"):
+        sheet.convert("RGB").save(target, quality=85)
+    else:
+        sheet.save(target)
+
+    sheet_map = {"image": str(target), "width": size[0], "height": size[1], "cell": cell,
+                 "items": items, "errors": errors}
+    with open(target.with_suffix(".json"), "w") as f:
+        json.dump(sheet_map, f, indent=2)
+    return sheet_map
+
+
+# ==========================================
+# SPRITE ATLAS
+# ==========================================
+
+def sprite_names(paths: List[str]) -> List[str]:
+    """CSS-safe, unique sprite names from file stems"""
+    names, seen = [], {}
+    for path in paths:
+        name = re.sub(r"[^a-z0-9_-]+", "-", Path(path).stem.lower()).strip("-") or "sprite"
+        if name[0].isdigit():
+            name = f"s{name}"
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}-{seen[name]}")
+    return names
+
+
+def _atlas_css(sprites: Dict[str, Dict], image_name: str, class_name: str) -> str:
+    lines = [
+        f".{class_name} {{",
+        f"  background-image: url(\"{image_name}\");",
+        "  background-repeat: no-repeat;",
+        "  display: inline-block;",
+        "}",
+    ]
+    for name, s in sprites.items():
+        lines.append(
+            f".{class_name}-{name} {{ width: {s['w']}px; height: {s['h']}px; "
+            f"background-position: -{s['x']}px -{s['y']}px; }}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def build_atlas(
+    paths: List[str],
+    prefix: str = "sprites",
+    thumb: int = DEFAULT_THUMB,
+    padding: int = DEFAULT_PADDING,
+    width: Optional[int] = None,
+    class_name: str = "sprite",
+    cache_dir: Optional[str] = THUMB_DIR,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Pack paths into <prefix>.png with a <prefix>.json coordinate map
+    ({"sprites": {name: {"x", "y", "w", "h", "source"}}}) and <prefix>.css
+    (.<class_name>-<name> rules positioning the shared background).
+    """
+    tiles, errors = load_thumbnails(paths, thumb, cache_dir, workers)
+    arrays = [tile for _, tile in tiles]
+    sizes = _sizes(arrays)
+    positions, size = shelf_pack(sizes, width, padding)
+
+    target = Path(prefix)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    image_path = target.with_suffix(".png")
+    Image.fromarray(composite(arrays, positions, size), "RGBA").save(image_path, optimize=True)
+
+    sprites = {}
+    for name, (path, _), (x, y), (w, h) in zip(sprite_names([p for p, _ in tiles]), tiles,
+                                               positions.tolist(), sizes.tolist()):
+        sprites[name] = {"x": x, "y": y, "w": w, "h": h, "source": path}
+
+    atlas = {"image": image_path.name, "width": size[0], "height": size[1], "sprites": sprites, "errors": errors}
+    with open(target.with_suffix(".json"), "w") as f:
+        json.dump(atlas, f, indent=2)
+    with open(target.with_suffix(".css"), "w") as f:
+        f.write(_atlas_css(sprites, image_path.name, class_name))
+    return atlas
+
+
+def main(argv=None):
+    """Command-line interface: build a review contact sheet or a sprite atlas"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Composite generated images into a contact sheet or sprite atlas")
+    parser.add_argument('sources', nargs='*', default=['generated_images'],
+                        help='Image folders, image files or media_catalog_*.json files')
+    parser.add_argument('--output', '-o', default='contact_sheet.jpg', help='Contact sheet image')
+    parser.add_argument('--cell', type=int, default=DEFAULT_CELL, help='Contact sheet cell size in px')
+    parser.add_argument('--columns', type=int, help='Contact sheet columns (default: near-square grid)')
+    parser.add_argument('--no-labels', action='store_true', help='Leave file names off the contact sheet')
+    parser.add_argument('--background', default=DEFAULT_BACKGROUND, help='Contact sheet background color')
+    parser.add_argument('--atlas', metavar='PREFIX',
+                        help='Build a sprite atlas instead: PREFIX.png, PREFIX.json and PREFIX.css')
+    parser.add_argument('--thumb', type=int, default=DEFAULT_THUMB,
+                        help='Max sprite size in px (0 keeps native size)')
+    parser.add_argument('--padding', type=int, default=DEFAULT_PADDING, help='Transparent px between sprites')
+    parser.add_argument('--width', type=int, help='Atlas width in px (default: roughly square)')
+    parser.add_argument('--class-name', default='sprite', help='CSS class prefix for the atlas')
+    parser.add_argument('--no-thumb-cache', action='store_true', help=f"Don't read or write {THUMB_DIR}")
+    parser.add_argument('--workers', '-w', type=int, help='Decoding processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    paths = collect_images(args.sources)
+    if not paths:
+        parser.error(f"no images found in {', '.join(args.sources)}")
+    cache_dir = None if args.no_thumb_cache else THUMB_DIR
+
+    start = time.perf_counter()
+    if args.atlas:
+        result = build_atlas(paths, args.atlas, args.thumb, args.padding, args.width, args.class_name,
+                             cache_dir, args.workers)
+        written = f"{args.atlas}.png/.json/.css"
+        placed = len(result["sprites"])
+    else:
+        result = build_contact_sheet(paths, args.output, args.cell, args.columns, not args.no_labels,
+                                     args.background, cache_dir, args.workers)
+        written = f"{args.output} (+ {Path(args.output).with_suffix('.json')})"
+        placed = len(result["items"])
+    elapsed = time.perf_counter() - start
+
+    for error in result["errors"]:
+        print(f"❌ {error['path']}: {error['error']}")
+    print(f"✅ {placed} images in {elapsed:.1f}s -> {result['width']}x{result['height']} {written}")
+
+
+if __name__ == "__main__":
+    main()
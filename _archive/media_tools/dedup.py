@@ -0,0 +1,309 @@
+"""
+Near-Duplicate Filter for DuBuBu.com
+Perceptual hashes (pHash + dHash) for generated images, clustered with a
+vectorized Hamming-distance index so only the best image of each group of
+near-identical results is kept, catalogued and uploaded. Near-blank images
+(e.g. fal's black safety-filter placeholders) are flagged as well.
+
+Usage:
+    python -m media_tools dedup                      # report only
+    python -m media_tools dedup --apply              # move duplicates to generated_images/duplicates/
+"""
+
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+INDEX_FILE = "dedup_index.json"
+DUPLICATES_DIR = "duplicates"
+
+# Bits (of 64) two images may differ by in BOTH hashes and still be duplicates
+DEFAULT_MAX_DISTANCE = 8
+
+# Grayscale standard deviation (0-255) below which an image is considered blank
+DEFAULT_MIN_CONTRAST = 4.0
+
+HASH_SIZE = 8
+PHASH_SIZE = 32
+
+# Rows of the distance matrix computed per step; bounds the temporary
+# XOR matrix to BLOCK_ROWS x n x 8 bytes (~60 MB at 30k images)
+BLOCK_ROWS = 256
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def image_hashes(path: str) -> Dict:
+    """
+    Hash one image. The image is reduced to grayscale 32x32 (pHash: sign of
+    the low 8x8 DCT coefficients vs. their median) and 9x8 (dHash: sign of
+    horizontal gradients); JPEGs are decoded at reduced size via draft().
+    """
+    source = Path(path)
+    stat = source.stat()
+
+    with Image.open(source) as img:
+        width, height = img.size
+        img.draft("L", (PHASH_SIZE * 2, PHASH_SIZE * 2))
+        gray = img.convert("L")
+
+    small = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.BOX, reducing_gap=2.0), dtype=np.float64)
+    gradient = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX, reducing_gap=2.0), dtype=np.int16)
+
+    coefficients = (_DCT @ small @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    phash = coefficients > np.median(coefficients[1:])
+    dhash = gradient[:, 1:] > gradient[:, :-1]
+
+    return {
+        "path": str(source),
+        "width": width,
+        "height": height,
+        "bytes": stat.st_size,
+        "mtime": stat.st_mtime,
+        "phash": f"{_bits_to_int(phash):016x}",
+        "dhash": f"{_bits_to_int(dhash):016x}",
+        "contrast": round(float(small.std()), 2),
+    }
+
+
+def _hash_safely(path: str) -> Dict:
+    try:
+        return image_hashes(path)
+    except Exception as e:
+        return {"path": str(path), "error": f"{type(e).__name__}: {e}"}
+
+
+def hash_images(
+    paths: List[str],
+    index_path: Optional[str] = None,
+    workers: Optional[int] = None
+) -> List[Dict]:
+    """
+    Hash many images across a process pool. With index_path, hashes are
+    kept in a JSON index and reused while a file's size and mtime are
+    unchanged, so reruns only decode new images.
+    """
+    index: Dict[str, Dict] = {}
+    if index_path and Path(index_path).exists():
+        with open(index_path, "r") as f:
+            index = json.load(f)
+
+    entries: Dict[str, Dict] = {}
+    todo = []
+    for path in map(str, paths):
+        cached = index.get(path)
+        stat = os.stat(path)
+        if cached and cached.get("bytes") == stat.st_size and cached.get("mtime") == stat.st_mtime:
+            entries[path] = cached
+        else:
+            todo.append(path)
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for entry in pool.map(_hash_safely, todo, chunksize=max(1, min(64, len(todo) // 32))):
+                entries[entry["path"]] = entry
+
+    if index_path:
+        index = {path: entry for path, entry in index.items() if os.path.exists(path)}
+        index.update({path: entry for path, entry in entries.items() if not entry.get("error")})
+        Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(index_path, "w") as f:
+            json.dump(index, f)
+
+    return [entries[str(path)] for path in paths]
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Set bits per uint64 element"""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(values)
+    return _POPCOUNT8[values.view(np.uint8)].reshape(*values.shape, 8).sum(axis=-1)
+
+
+def near_pairs(
+    phashes: np.ndarray,
+    dhashes: np.ndarray,
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+    block_rows: int = BLOCK_ROWS
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    (i, j) index arrays, i < j, of every pair within max_distance bits in
+    both hashes. The upper triangle of the distance matrix is computed
+    one block of rows at a time, so memory stays bounded for any n.
+    """
+    n = len(phashes)
+    for start in range(0, n, block_rows):
+        stop = min(n, start + block_rows)
+        close = _popcount(phashes[start:stop, None] ^ phashes[None, start:]) <= max_distance
+
+        rows, cols = np.nonzero(close)
+        rows, cols = rows + start, cols + start
+        upper = cols > rows
+        rows, cols = rows[upper], cols[upper]
+
+        # dHash only needs checking for the few pairs pHash already matched
+        agree = _popcount(dhashes[rows] ^ dhashes[cols]) <= max_distance
+        if agree.any():
+            yield rows[agree], cols[agree]
+
+
+def cluster(entries: List[Dict], max_distance: int = DEFAULT_MAX_DISTANCE) -> List[List[int]]:
+    """Groups (entry indices) of two or more near-duplicates, via union-find over near pairs"""
+    phashes = np.array([int(e["phash"], 16) for e in entries], dtype=np.uint64)
+    dhashes = np.array([int(e["dhash"], 16) for e in entries], dtype=np.uint64)
+    parent = list(range(len(entries)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for rows, cols in near_pairs(phashes, dhashes, max_distance):
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(entries)):
+        groups.setdefault(find(i), []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def quality_key(entry: Dict) -> Tuple:
+    """Best representative first: most pixels, then largest file, then path for stability"""
+    return (-entry["width"] * entry["height"], -entry["bytes"], entry["path"])
+
+
+def find_duplicates(
+    paths: List[str],
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+    min_contrast: float = DEFAULT_MIN_CONTRAST,
+    index_path: Optional[str] = None,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Hash and cluster images.
+
+    Returns:
+        {
+          "clusters":    [{"keep": path, "duplicates": [paths]}],
+          "low_quality": [paths of near-blank images],
+          "errors":      [{"path", "error"}],
+          "remove":      [every path that should not be kept],
+        }
+    """
+    entries = hash_images(paths, index_path, workers)
+    errors = [e for e in entries if e.get("error")]
+    good = [e for e in entries if not e.get("error")]
+
+    low_quality = sorted(e["path"] for e in good if e["contrast"] < min_contrast)
+    blank = set(low_quality)
+    candidates = [e for e in good if e["path"] not in blank]
+
+    clusters = []
+    for members in cluster(candidates, max_distance):
+        ranked = sorted((candidates[i] for i in members), key=quality_key)
+        clusters.append({"keep": ranked[0]["path"], "duplicates": [e["path"] for e in ranked[1:]]})
+    clusters.sort(key=lambda c: c["keep"])
+
+    return {
+        "clusters": clusters,
+        "low_quality": low_quality,
+        "errors": [{"path": e["path"], "error": e["error"]} for e in errors],
+        "remove": sorted({p for c in clusters for p in c["duplicates"]} | blank),
+    }
+
+
+def set_aside(paths: List[str], dest_dir: str) -> List[str]:
+    """Move rejected images into dest_dir (not deleted, so a bad call can be undone)"""
+    target = Path(dest_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    moved = []
+    for path in paths:
+        if os.path.exists(path):
+            destination = target / Path(path).name
+            shutil.move(path, destination)
+            moved.append(str(destination))
+    return moved
+
+
+def filter_catalog(images: List[Dict], report: Dict) -> List[Dict]:
+    """Catalog image records whose local file was not rejected"""
+    removed = set(report["remove"])
+    return [img for img in images if img.get("local_path") not in removed]
+
+
+def list_images(source: str) -> List[str]:
+    folder = Path(source)
+    if not folder.is_dir():
+        return [str(folder)]
+    return sorted(str(p) for p in folder.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def main(argv=None):
+    """Command-line interface: find (and optionally set aside) near-duplicate images"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate and blank generated images")
+    parser.add_argument('source', nargs='?', default='generated_images', help='Image folder')
+    parser.add_argument('--max-distance', '-d', type=int, default=DEFAULT_MAX_DISTANCE,
+                        help='Max differing bits (of 64) in both pHash and dHash for a duplicate')
+    parser.add_argument('--min-contrast', type=float, default=DEFAULT_MIN_CONTRAST,
+                        help='Grayscale std. deviation below which an image counts as blank')
+    parser.add_argument('--apply', action='store_true',
+                        help=f"Move duplicates and blank images into <source>/{DUPLICATES_DIR}/")
+    parser.add_argument('--report', metavar='JSON', help='Write the full report to this file')
+    parser.add_argument('--workers', '-w', type=int, help='Hashing processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    paths = list_images(args.source)
+    index_path = str(Path(args.source) / INDEX_FILE) if Path(args.source).is_dir() else None
+
+    print(f"🔍 Hashing {len(paths)} images...")
+    start = time.perf_counter()
+    report = find_duplicates(paths, args.max_distance, args.min_contrast, index_path, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for c in report["clusters"]:
+        print(f"   keep {c['keep']}  ({len(c['duplicates'])} duplicates)")
+    print(f"\n✅ {len(paths)} images in {elapsed:.1f}s: {len(report['clusters'])} duplicate groups, "
+          f"{len(report['low_quality'])} blank, {len(report['errors'])} unreadable")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report: {args.report}")
+
+    if args.apply:
+        moved = set_aside(report["remove"], str(Path(args.source) / DUPLICATES_DIR))
+        print(f"📦 Moved {len(moved)} images to {Path(args.source) / DUPLICATES_DIR}")
+    elif report["remove"]:
+        print(f"💡 {len(report['remove'])} images would be set aside; rerun with --apply")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Responsive Image Derivatives for DuBuBu.com
+Turns full-size generated PNGs into WebP/AVIF renditions at responsive
+widths, plus a tiny placeholder for blur-up loading
+"""
+
+import base64
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image, features
+
+
+# next/image's default deviceSizes (next.config.ts does not override them), so
+# each srcset entry the storefront requests has a rendition; widths above the
+# source are skipped
+DEFAULT_WIDTHS = [640, 750, 828, 1080, 1200, 1920, 2048, 3840]
+
+QUALITY = {
+    "webp": 80,
+    "avif": 60,
+}
+
+LQIP_WIDTH = 16
+
+INDEX_FILE = "derivatives_index.json"
+
+
+def _register_avif() -> bool:
+    """Make AVIF encodable in this process (Pillow 11.3+, or the pillow-avif-plugin package)"""
+    if features.check("avif"):
+        return True
+    try:
+        import pillow_avif  # noqa: F401 (registers the AVIF plugin)
+        return True
+    except ImportError:
+        return False
+
+
+def supported_formats() -> List[str]:
+    """Derivative formats this Pillow build can encode"""
+    formats = ["webp"] if features.check("webp") else []
+    if _register_avif():
+        formats.append("avif")
+    return formats
+
+
+def _placeholder(img: Image.Image) -> Dict:
+    """Base64 LQIP data URI, plus a blurhash when the blurhash package is installed"""
+    height = max(1, round(img.height * LQIP_WIDTH / img.width))
+    tiny = img.resize((LQIP_WIDTH, height), Image.Resampling.BILINEAR)
+
+    buffer = io.BytesIO()
+    tiny.save(buffer, format="WEBP", quality=30)
+    placeholder = {
+        "lqip": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii"),
+        "blurhash": None,
+    }
+
+    try:
+        import blurhash
+        placeholder["blurhash"] = blurhash.encode(tiny.convert("RGB"), x_components=4, y_components=3)
+    except ImportError:
+        pass
+
+    return placeholder
+
+
+def build_derivatives(
+    image_path: str,
+    out_dir: str = "generated_images/derivatives",
+    widths: Optional[List[int]] = None,
+    formats: Optional[List[str]] = None
+) -> Dict:
+    """
+    Write every derivative for one image and return its index entry.
+
+    Widths larger than the source are skipped (no upscaling); the source width
+    itself is always included so the largest rendition is full resolution.
+    """
+    widths = widths or DEFAULT_WIDTHS
+    formats = formats or supported_formats()
+    if "avif" in formats:
+        # Pool workers started by spawn/forkserver have not imported the plugin
+        _register_avif()
+    source = Path(image_path)
+    target_dir = Path(out_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source) as img:
+        img.load()
+        has_alpha = img.mode in ("RGBA", "LA") or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+
+    entry = {
+        "source": str(source),
+        "width": img.width,
+        "height": img.height,
+        "bytes": source.stat().st_size,
+        "placeholder": _placeholder(img),
+        "derivatives": [],
+    }
+
+    targets = sorted({w for w in widths if w < img.width} | {img.width}, reverse=True)
+
+    # Resize largest first and step down so each resample starts from a smaller image
+    base = img
+    for width in targets:
+        height = max(1, round(img.height * width / img.width))
+        resized = base.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        base = resized
+
+        for fmt in formats:
+            path = target_dir / f"{source.stem}-{width}w.{fmt}"
+            resized.save(path, format=fmt.upper(), quality=QUALITY.get(fmt, 80))
+            entry["derivatives"].append({
+                "path": str(path),
+                "format": fmt,
+                "width": width,
+                "height": height,
+                "bytes": path.stat().st_size,
+            })
+
+    return entry
+
+
+def _build_safely(args) -> Dict:
+    image_path, out_dir, widths, formats = args
+    try:
+        return build_derivatives(image_path, out_dir, widths, formats)
+    except Exception as e:
+        return {"source": str(image_path), "error": f"{type(e).__name__}: {e}", "derivatives": []}
+
+
+def process_images(
+    image_paths: List[str],
+    out_dir: str = "generated_images/derivatives",
+    widths: Optional[List[int]] = None,
+    formats: Optional[List[str]] = None,
+    workers: Optional[int] = None
+) -> Dict[str, Dict]:
+    """
+    Build derivatives for many images across a process pool and merge the
+    results into <out_dir>/derivatives_index.json, keyed by source path.
+    """
+    formats = formats or supported_formats()
+    jobs = [(str(p), out_dir, widths, formats) for p in image_paths]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        entries = list(pool.map(_build_safely, jobs))
+
+    index_path = Path(out_dir) / INDEX_FILE
+    index = {}
+    if index_path.exists():
+        with open(index_path, "r") as f:
+            index = json.load(f)
+
+    for entry in entries:
+        index[entry["source"]] = entry
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=2)
+
+    return {entry["source"]: entry for entry in entries}
+
+
+def attach_to_catalog(images: List[Dict], index: Dict[str, Dict]) -> None:
+    """Add derivative and placeholder info to catalog image records in place"""
+    for img in images:
+        entry = index.get(img.get("local_path"))
+        if entry and not entry.get("error"):
+            img["derivatives"] = entry["derivatives"]
+            img["placeholder"] = entry["placeholder"]
+
+
+def main(argv=None):
+    """Command-line interface: build responsive derivatives for images"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build responsive WebP/AVIF derivatives")
+    parser.add_argument('source', nargs='?', default='generated_images', help='Image file or folder of PNGs')
+    parser.add_argument('--out-dir', default='generated_images/derivatives', help='Where derivatives are written')
+    parser.add_argument('--widths', type=lambda s: [int(w) for w in s.split(',')],
+                        help=f"Comma-separated widths (default: {','.join(map(str, DEFAULT_WIDTHS))})")
+    parser.add_argument('--workers', '-w', type=int, help='Worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    source = Path(args.source)
+    paths = sorted(source.glob('*.png')) if source.is_dir() else [source]
+
+    print(f"Building derivatives for {len(paths)} images ({', '.join(supported_formats())})...")
+    results = process_images(paths, args.out_dir, args.widths, workers=args.workers)
+
+    original = sum(e.get("bytes", 0) for e in results.values())
+    smallest = sum(min((d["bytes"] for d in e["derivatives"]), default=0) for e in results.values())
+    errors = [e for e in results.values() if e.get("error")]
+
+    print(f"✅ {len(results) - len(errors)} images processed, {len(errors)} failed")
+    print(f"📦 Originals: {original / 1024:.0f} KB, smallest renditions: {smallest / 1024:.0f} KB")
+    print(f"📄 Index: {Path(args.out_dir) / INDEX_FILE}")
+
+
+if __name__ == "__main__":
+    main()
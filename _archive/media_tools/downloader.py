@@ -0,0 +1,91 @@
+"""
+Image Downloader for DuBuBu.com
+Pooled, streaming downloads shared by the media tools
+"""
+
+import os
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+
+from .telemetry import get_telemetry
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ImageDownloader:
+    """
+    Downloads files over a keep-alive connection pool.
+
+    Bodies are streamed to a temporary file next to the destination in
+    CHUNK_SIZE pieces and renamed into place once complete, so a failed or
+    interrupted download never leaves a truncated image behind. Downloads
+    submitted with submit() run on a small thread pool in the background.
+    Spans are recorded under stage and bytes counted as "<stage>.bytes".
+    """
+
+    def __init__(self, max_workers: int = 4, timeout: float = 60.0, stage: str = "download"):
+        # requests is imported on first use to keep module import cheap
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.stage = stage
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+        self.telemetry = get_telemetry()
+
+    def download(self, url: str, dest: Union[str, Path]) -> Optional[Path]:
+        """Download url to dest. Returns the saved path, or None on failure."""
+        import requests
+
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.part")
+
+        with self.telemetry.span(self.stage) as span:
+            try:
+                with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                    if response.status_code != 200:
+                        print(f"Download error {response.status_code}: {url}")
+                        span.update(status=response.status_code, ok=False)
+                        return None
+                    size = 0
+                    with open(tmp_path, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            f.write(chunk)
+                            size += len(chunk)
+                os.replace(tmp_path, dest)
+                span["bytes"] = size
+                self.telemetry.count(f"{self.stage}.bytes", size)
+                return dest
+            except (requests.RequestException, OSError) as e:
+                print(f"Download error: {e}")
+                span.update(error=str(e), ok=False)
+                return None
+            finally:
+                if tmp_path.exists():
+                    try:
+                        tmp_path.unlink()
+                    except OSError:
+                        pass
+
+    def submit(self, url: str, dest: Union[str, Path]) -> "Future[Optional[Path]]":
+        """Queue a download in the background and return its future"""
+        return self._pool.submit(self.telemetry.bind(self.download), url, dest)
+
+    def close(self):
+        """Wait for queued downloads and release pooled connections"""
+        self._pool.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
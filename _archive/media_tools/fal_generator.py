@@ -3,60 +3,98 @@ fal.ai Image Generator for DuBuBu.com
 Generates custom images for products, marketing, and social media
 """
 
-import os
-import fal_client
-import requests
+import itertools
 import json
+import queue
+import shutil
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from dotenv import load_dotenv
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Callable, Iterable, Iterator, Tuple
 
-# Load environment variables
-load_dotenv('.env.local')
+from . import config
+from .batch_journal import task_id
+from .downloader import ImageDownloader
+from .planner import plan_batch, run_plan
+from .presets import CHARACTERS, STYLE_PRESETS, full_prompt, preset_request
+from .prompt_cache import PromptCache
+from .scheduler import INTERACTIVE, get_scheduler
+from .telemetry import get_telemetry
 
-# Configure fal.ai
-FAL_KEY = os.getenv('FAL_KEY')
-if FAL_KEY:
-    os.environ['FAL_KEY'] = FAL_KEY
+DEFAULT_MODEL = "fal-ai/flux/schnell"
+
+
+class LazyFalClient:
+    """
+    Stands in for fal_client until a call is made, so a generator can build
+    and fingerprint requests (e.g. for a build dry run) without FAL_KEY
+    """
+    
+    def __getattr__(self, name):
+        if not config.fal_key():
+            raise ValueError("FAL_KEY not found in environment variables. Add it to .env.local")
+        import fal_client
+        return getattr(fal_client, name)
 
 
 class DuBuBuImageGenerator:
     """Image generator for DuBuBu.com using fal.ai"""
     
-    # Preset style modifiers for consistent branding
-    STYLE_PRESETS = {
-        "kawaii": "kawaii style, cute, pastel colors, soft lighting, adorable, chibi",
-        "product": "product photography, white background, professional, clean, e-commerce",
-        "social": "vibrant, eye-catching, social media style, modern, trendy",
-        "banner": "wide format, promotional, bold text space, gradient background",
-        "romantic": "soft pink tones, hearts, romantic atmosphere, dreamy, love theme",
-        "cozy": "warm lighting, comfortable, homey, soft textures, inviting",
-    }
-    
-    # Character descriptions for consistency
-    CHARACTERS = {
-        "bubu": "cute brown teddy bear character, round face, small ears, friendly expression",
-        "dudu": "adorable white panda character, black and white, gentle expression, cute",
-        "both": "cute bear and panda couple, brown teddy bear and white panda together, adorable duo",
-    }
-    
-    def __init__(self):
-        if not FAL_KEY:
-            raise ValueError("FAL_KEY not found in environment variables. Add it to .env.local")
+    # Preset style modifiers and character descriptions (see presets.json)
+    STYLE_PRESETS = STYLE_PRESETS
+    CHARACTERS = CHARACTERS
+    
+    def __init__(
+        self,
+        use_cache: bool = True,
+        cache_dir: Optional[str] = None,
+        download_workers: int = 4,
+        priority: int = INTERACTIVE,
+        client=None
+    ):
+        # Anything exposing fal_client's subscribe/submit/status/result API
+        # (e.g. stub_server.StubFalClient for offline benchmarks); the real
+        # client and FAL_KEY are only loaded when none is given
+        if client is None:
+            if not config.fal_key():
+                raise ValueError("FAL_KEY not found in environment variables. Add it to .env.local")
+            import fal_client
+            client = fal_client
+        self.client = client
         
         self.output_dir = Path("generated_images")
         self.output_dir.mkdir(exist_ok=True)
+        
+        # Prompt result cache (bypass per call with use_cache=False)
+        self.use_cache = use_cache
+        self.cache = PromptCache(cache_dir or self.output_dir / ".cache")
+        
+        # Shared keep-alive pool for streaming image downloads; inside
+        # deferred_downloads() requests return before their files are saved
+        self.downloader = ImageDownloader(max_workers=download_workers)
+        self._deferred = threading.local()
+        
+        # fal.ai calls go through the shared rate limiter / retry scheduler;
+        # batch jobs use priority=BATCH so interactive calls jump the queue
+        self.scheduler = get_scheduler()
+        self.priority = priority
+        
+        # Per-stage spans and counters (see telemetry.py)
+        self.telemetry = get_telemetry()
     
     def generate_image(
         self,
         prompt: str,
         style: str = "kawaii",
         character: str = "both",
-        model: str = "fal-ai/flux/schnell",
+        model: str = DEFAULT_MODEL,
         size: str = "square_hd",
         num_images: int = 1,
-        save: bool = True
+        save: bool = True,
+        seed: Optional[int] = None,
+        use_cache: Optional[bool] = None
     ) -> List[Dict]:
         """
         Generate images using fal.ai
@@ -69,71 +107,218 @@ class DuBuBuImageGenerator:
             size: Image size (square_hd, portrait_4_3, landscape_4_3, landscape_16_9)
             num_images: Number of images to generate
             save: Whether to save images locally
+            seed: Optional fixed seed for reproducible results
+            use_cache: Override the generator's cache setting for this call
         
         Returns:
             List of generated image data
         """
         
-        # Build enhanced prompt
-        full_prompt = self._build_prompt(prompt, style, character)
+        with self.telemetry.span("fal.prompt_build"):
+            request = self.prepare_request(prompt, style, character, model, size, num_images, seed, use_cache)
+        
+        cached = self.cached_images(request, save)
+        if cached:
+            return cached
         
-        print(f"Generating image with prompt:\n{full_prompt}\n")
+        print(f"Generating image with prompt:\n{request['full_prompt']}\n")
         
         try:
-            result = fal_client.subscribe(
-                model,
-                arguments={
-                    "prompt": full_prompt,
-                    "image_size": size,
-                    "num_images": num_images,
-                    "enable_safety_checker": True,
-                },
-                with_logs=True
-            )
-            
-            images = []
-            for i, img in enumerate(result.get("images", [])):
-                img_data = {
-                    "url": img.get("url"),
-                    "width": img.get("width"),
-                    "height": img.get("height"),
-                    "prompt": full_prompt,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                if save and img_data["url"]:
-                    local_path = self._save_image(img_data["url"], prompt, i)
-                    img_data["local_path"] = str(local_path)
-                
-                images.append(img_data)
-            
-            return images
+            with self.telemetry.span("fal.inference", model=request["model"], images=num_images):
+                result = self.scheduler.call(
+                    "fal",
+                    self.client.subscribe,
+                    request["model"],
+                    arguments=request["arguments"],
+                    priority=self.priority
+                )
+            return self.finish_request(request, result, save)
             
         except Exception as e:
             print(f"Error generating image: {e}")
             return []
     
+    def prepare_request(
+        self,
+        prompt: str,
+        style: str = "kawaii",
+        character: str = "both",
+        model: str = DEFAULT_MODEL,
+        size: str = "square_hd",
+        num_images: int = 1,
+        seed: Optional[int] = None,
+        use_cache: Optional[bool] = None
+    ) -> Dict:
+        """Resolve generate_image arguments into the fal.ai request they produce"""
+        
+        # Build enhanced prompt
+        full_prompt = self._build_prompt(prompt, style, character)
+        
+        arguments = {
+            "prompt": full_prompt,
+            "image_size": size,
+            "num_images": num_images,
+            "enable_safety_checker": True,
+        }
+        if seed is not None:
+            arguments["seed"] = seed
+        
+        if use_cache is None:
+            use_cache = self.use_cache
+        
+        return {
+            "prompt": prompt,
+            "full_prompt": full_prompt,
+            "model": model,
+            "arguments": arguments,
+            "cache_key": PromptCache.make_key(full_prompt, model, size, num_images, seed) if use_cache else None,
+        }
+    
+    def cached_images(self, request: Dict, save: bool = True) -> Optional[List[Dict]]:
+        """generate_image results for a prepared request, if it is cached"""
+        
+        if not request["cache_key"]:
+            return None
+        
+        with self.telemetry.span("fal.cache_lookup"):
+            cached = self.cache.get(request["cache_key"], require_files=save)
+            if not cached:
+                self.telemetry.count("fal.cache_miss")
+                return None
+            
+            self.telemetry.count("fal.cache_hit")
+            print(f"Cache hit ({request['cache_key'][:12]}) for prompt:\n{request['full_prompt']}\n")
+            images = self._restore_cached(cached, request["prompt"], save)
+            # Entries cached before size/model were recorded
+            for img in images:
+                img.setdefault("size", request["arguments"]["image_size"])
+                img.setdefault("model", request["model"])
+            return images
+    
+    def finish_request(self, request: Dict, result: Dict, save: bool = True) -> List[Dict]:
+        """Turn a fal.ai result into image records, downloading and caching them"""
+        
+        images = []
+        pending = []
+        for i, img in enumerate(result.get("images", [])):
+            img_data = {
+                "url": img.get("url"),
+                "width": img.get("width"),
+                "height": img.get("height"),
+                "prompt": request["full_prompt"],
+                "size": request["arguments"]["image_size"],
+                "model": request["model"],
+                "timestamp": datetime.now().isoformat()
+            }
+            
+            if save and img_data["url"]:
+                local_path = self._image_path(request["prompt"], i)
+                img_data["local_path"] = str(local_path)
+                pending.append((local_path, self.downloader.submit(img_data["url"], local_path)))
+            
+            images.append(img_data)
+        
+        saved = self._when_saved(request, images, pending)
+        deferred = getattr(self._deferred, "futures", None)
+        if deferred is not None:
+            deferred.append(saved)
+        else:
+            self.wait_downloads([saved])
+        
+        return images
+    
+    def _when_saved(self, request: Dict, images: List[Dict], pending: List[Tuple[Path, Future]]) -> Future:
+        """A future resolved once every download of a request has finished and it is cached"""
+        
+        saved: Future = Future()
+        remaining = [len(pending)]
+        lock = threading.Lock()
+        
+        def on_download(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+            try:
+                for local_path, future in pending:
+                    if future.result():
+                        print(f"Saved: {local_path}")
+                self._cache_result(request, images)
+            finally:
+                saved.set_result(images)
+        
+        on_download = self.telemetry.bind(on_download)
+        if not pending:
+            remaining[0] = 1
+            on_download(None)
+        for _, future in pending:
+            future.add_done_callback(on_download)
+        return saved
+    
+    def _cache_result(self, request: Dict, images: List[Dict]) -> None:
+        if request["cache_key"] and images:
+            try:
+                with self.telemetry.span("fal.cache_write"):
+                    self.cache.put(request["cache_key"], images)
+            except OSError as e:
+                print(f"Warning: could not write prompt cache: {e}")
+    
+    @contextmanager
+    def deferred_downloads(self) -> Iterator[List[Future]]:
+        """
+        Within this block (on this thread), finish_request returns as soon as
+        its downloads are queued. The yielded list collects one future per
+        request, resolved once its files are saved and cached; pass it to
+        wait_downloads before using the files.
+        """
+        
+        previous = getattr(self._deferred, "futures", None)
+        self._deferred.futures = futures = []
+        try:
+            yield futures
+        finally:
+            self._deferred.futures = previous
+    
+    def wait_downloads(self, futures: List[Future]) -> None:
+        """Block until deferred requests have saved and cached their files"""
+        
+        with self.telemetry.span("fal.download_wait", requests=len(futures)):
+            for future in futures:
+                future.result()
+    
+    def _restore_cached(self, cached: List[Dict], prompt: str, save: bool) -> List[Dict]:
+        """Rebuild generate_image results from a cache entry"""
+        
+        images = []
+        for i, record in enumerate(cached):
+            img_data = {k: v for k, v in record.items() if k != "cache_path"}
+            if save and record.get("cache_path"):
+                local_path = self._image_path(prompt, i)
+                shutil.copyfile(record["cache_path"], local_path)
+                img_data["local_path"] = str(local_path)
+            images.append(img_data)
+        
+        return images
+    
     def _build_prompt(self, base_prompt: str, style: str, character: str) -> str:
         """Build a full prompt with style and character modifiers"""
         
-        style_mod = self.STYLE_PRESETS.get(style, self.STYLE_PRESETS["kawaii"])
-        char_mod = self.CHARACTERS.get(character, self.CHARACTERS["both"])
+        return full_prompt(base_prompt, style, character)
+    
+    def _image_path(self, prompt: str, index: int) -> Path:
+        """Build a unique output filename from the prompt"""
         
-        return f"{base_prompt}, featuring {char_mod}, {style_mod}, high quality, detailed"
+        safe_name = "".join(c if c.isalnum() else "_" for c in prompt[:50])
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        filename = f"{safe_name}_{timestamp}_{index}.png"
+        return self.output_dir / filename
     
     def _save_image(self, url: str, prompt: str, index: int) -> Path:
         """Download and save image locally"""
         
-        # Create filename from prompt
-        safe_name = "".join(c if c.isalnum() else "_" for c in prompt[:50])
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{safe_name}_{timestamp}_{index}.png"
-        filepath = self.output_dir / filename
+        filepath = self._image_path(prompt, index)
         
-        response = requests.get(url)
-        if response.status_code == 200:
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+        if self.downloader.download(url, filepath):
             print(f"Saved: {filepath}")
         
         return filepath
@@ -142,6 +327,16 @@ class DuBuBuImageGenerator:
     # PRESET GENERATORS FOR DUBUBU.COM
     # ==========================================
     
+    def product_mockup_request(
+        self,
+        product_type: str,
+        description: str = "",
+        background: str = "white"
+    ) -> Dict:
+        """generate_image arguments for a product mockup"""
+        
+        return preset_request("product", product_type, description=description, background=background)
+    
     def generate_product_mockup(
         self,
         product_type: str,
@@ -150,25 +345,17 @@ class DuBuBuImageGenerator:
     ) -> List[Dict]:
         """Generate product mockup images"""
         
-        prompts = {
-            "plush": f"plush toy {description}, soft stuffed animal, product photo on {background} background",
-            "tshirt": f"t-shirt {description}, flat lay, clothing product photo on {background} background",
-            "hoodie": f"hoodie sweatshirt {description}, apparel product photo on {background} background",
-            "mug": f"ceramic coffee mug {description}, drinkware product photo on {background} background",
-            "blanket": f"soft fleece blanket {description}, cozy home product on {background} background",
-            "pillow": f"throw pillow {description}, home decor product on {background} background",
-            "keychain": f"metal keychain {description}, accessory product photo on {background} background",
-            "phone_case": f"smartphone case {description}, tech accessory on {background} background",
-        }
-        
-        base_prompt = prompts.get(product_type, f"{product_type} {description}")
+        return self.generate_image(**self.product_mockup_request(product_type, description, background))
+    
+    def social_post_request(
+        self,
+        theme: str,
+        platform: str = "instagram",
+        text_overlay: str = ""
+    ) -> Dict:
+        """generate_image arguments for a social media post"""
         
-        return self.generate_image(
-            prompt=base_prompt,
-            style="product",
-            character="both",
-            size="square_hd"
-        )
+        return preset_request("social", theme, platform=platform, text_overlay=text_overlay)
     
     def generate_social_post(
         self,
@@ -178,35 +365,17 @@ class DuBuBuImageGenerator:
     ) -> List[Dict]:
         """Generate social media post images"""
         
-        sizes = {
-            "instagram": "square_hd",
-            "instagram_story": "portrait_4_3",
-            "facebook": "landscape_4_3",
-            "pinterest": "portrait_4_3",
-            "twitter": "landscape_16_9",
-        }
-        
-        themes = {
-            "valentines": "Valentine's Day theme, hearts, pink and red colors, romantic",
-            "christmas": "Christmas theme, festive, snow, holiday decorations, cozy",
-            "sale": "sale promotion, exciting, bold colors, shopping theme",
-            "new_arrival": "new product showcase, fresh, exciting, spotlight",
-            "couple_goals": "cute couple moment, romantic, relationship goals, love",
-            "cozy_vibes": "cozy atmosphere, warm, comfortable, hygge aesthetic",
-        }
-        
-        theme_prompt = themes.get(theme, theme)
-        prompt = f"social media graphic, {theme_prompt}"
-        
-        if text_overlay:
-            prompt += f", space for text overlay saying '{text_overlay}'"
+        return self.generate_image(**self.social_post_request(theme, platform, text_overlay))
+    
+    def banner_request(
+        self,
+        banner_type: str,
+        headline: str = "",
+        size: str = "landscape_16_9"
+    ) -> Dict:
+        """generate_image arguments for a website banner"""
         
-        return self.generate_image(
-            prompt=prompt,
-            style="social",
-            character="both",
-            size=sizes.get(platform, "square_hd")
-        )
+        return dict(preset_request("banner", banner_type, headline=headline), size=size)
     
     def generate_banner(
         self,
@@ -216,57 +385,35 @@ class DuBuBuImageGenerator:
     ) -> List[Dict]:
         """Generate website banners"""
         
-        types = {
-            "hero": "website hero banner, large promotional image, welcoming",
-            "collection": "collection banner, category header, themed",
-            "sale": "sale banner, promotional, urgent, exciting deals",
-            "seasonal": "seasonal banner, holiday themed, festive",
-        }
-        
-        prompt = types.get(banner_type, banner_type)
-        if headline:
-            prompt += f", with space for headline text: {headline}"
+        return self.generate_image(**self.banner_request(banner_type, headline, size))
+    
+    def email_header_request(self, campaign_type: str) -> Dict:
+        """generate_image arguments for an email header"""
         
-        return self.generate_image(
-            prompt=prompt,
-            style="banner",
-            character="both",
-            size=size
-        )
+        return preset_request("email", campaign_type)
     
     def generate_email_header(self, campaign_type: str) -> List[Dict]:
         """Generate email marketing headers"""
         
-        campaigns = {
-            "welcome": "welcoming, friendly, warm introduction, hello theme",
-            "abandoned_cart": "missing you, come back, reminder, friendly nudge",
-            "promotion": "special offer, exciting deal, limited time",
-            "newsletter": "monthly update, news, friendly communication",
-            "thank_you": "gratitude, appreciation, happy, thank you theme",
-        }
-        
-        prompt = f"email header graphic, {campaigns.get(campaign_type, campaign_type)}"
+        return self.generate_image(**self.email_header_request(campaign_type))
+    
+    def pattern_request(self, style: str = "seamless") -> Dict:
+        """generate_image arguments for a product pattern"""
         
-        return self.generate_image(
-            prompt=prompt,
-            style="romantic",
-            character="both",
-            size="landscape_16_9"
-        )
+        return preset_request("pattern", style)
     
     def generate_pattern(self, style: str = "seamless") -> List[Dict]:
         """Generate patterns for product designs"""
         
-        prompt = f"{style} pattern, repeating design, tileable, print-ready"
-        
-        return self.generate_image(
-            prompt=prompt,
-            style="kawaii",
-            character="both",
-            size="square_hd"
-        )
+        return self.generate_image(**self.pattern_request(style))
     
-    def batch_generate(self, tasks: List[Dict]) -> List[Dict]:
+    def batch_generate(
+        self,
+        tasks: List[Dict],
+        max_workers: int = 1,
+        on_result: Optional[Callable[[int, Dict, List[Dict], Optional[str]], None]] = None,
+        coalesce: bool = False
+    ) -> List[Dict]:
         """
         Batch generate multiple images
         
@@ -274,42 +421,197 @@ class DuBuBuImageGenerator:
             tasks: List of task dictionaries with keys:
                    - type: 'product', 'social', 'banner', 'email', 'pattern'
                    - params: dict of parameters for that type
+            max_workers: Maximum number of tasks in flight at once (1 = sequential)
+            on_result: Optional callback(index, task, images, error) fired as each task finishes
+            coalesce: Merge identical tasks and tasks sharing a prompt into
+                      multi-image requests (see planner.plan_batch)
         
         Returns:
-            List of all generated images
+            List of all generated images, in task order
         """
         
         all_results = []
+        for images in self.batch_generate_grouped(tasks, max_workers, on_result, coalesce):
+            all_results.extend(images)
         
-        for i, task in enumerate(tasks):
-            print(f"\n[{i+1}/{len(tasks)}] Processing task: {task.get('type')}")
-            
-            task_type = task.get('type')
-            params = task.get('params', {})
-            
-            if task_type == 'product':
-                results = self.generate_product_mockup(**params)
-            elif task_type == 'social':
-                results = self.generate_social_post(**params)
-            elif task_type == 'banner':
-                results = self.generate_banner(**params)
-            elif task_type == 'email':
-                results = self.generate_email_header(**params)
-            elif task_type == 'pattern':
-                results = self.generate_pattern(**params)
+        return all_results
+    
+    def batch_generate_grouped(
+        self,
+        tasks: List[Dict],
+        max_workers: int = 1,
+        on_result: Optional[Callable[[int, Dict, List[Dict], Optional[str]], None]] = None,
+        coalesce: bool = False
+    ) -> List[List[Dict]]:
+        """
+        Run a batch and return one list of images per task, in task order.
+        
+        A task that raises is reported and yields an empty list; the rest of
+        the batch keeps running. With coalesce, duplicate tasks are generated
+        once and tasks sharing a prompt are packed into num_images requests.
+        """
+        
+        grouped: List[List[Dict]] = [[] for _ in tasks]
+        failures = 0
+        
+        if not coalesce:
+            if max_workers <= 1:
+                print(f"\nProcessing {len(tasks)} tasks sequentially...")
             else:
-                results = self.generate_image(prompt=params.get('prompt', ''), **params)
+                print(f"\nProcessing {len(tasks)} tasks with {max_workers} workers...")
+        
+        # One window spanning the whole batch: everything is planned (or
+        # submitted) up front, as before streaming existed
+        for index, task, images, error in self.iter_batch(tasks, max_workers, coalesce, window=len(tasks) or None):
+            grouped[index] = images
+            if error or not images:
+                failures += 1
+                print(f"[{index+1}/{len(tasks)}] Task {task.get('type')} failed: {error or 'no images returned'}")
+            if on_result:
+                on_result(index, task, images, error)
+        
+        if failures:
+            print(f"\n⚠️  {failures}/{len(tasks)} tasks failed")
+        
+        return grouped
+    
+    def iter_batch(
+        self,
+        tasks: Iterable[Dict],
+        max_workers: int = 1,
+        coalesce: bool = False,
+        window: Optional[int] = None
+    ) -> Iterator[Tuple[int, Dict, List[Dict], Optional[str]]]:
+        """
+        Stream a batch, yielding (index, task, images, error) as each task
+        finishes, in completion order.
+        
+        Tasks are pulled from the iterable only as room frees up: at most
+        window tasks (default 4 per worker) are held at once, so a campaign
+        of any length runs in constant memory. With coalesce, each window
+        of tasks is planned and run as one batch (see planner.plan_batch).
+        """
+        
+        window = window or max(1, max_workers) * 4
+        numbered = enumerate(tasks)
+        
+        if coalesce:
+            while True:
+                chunk = list(itertools.islice(numbered, window))
+                if not chunk:
+                    return
+                offset = chunk[0][0]
+                for i, task, images, error in self._iter_plan([task for _, task in chunk], max_workers):
+                    yield offset + i, task, images, error
+        
+        if max_workers <= 1:
+            # A task is yielded once its files are saved, but its downloads
+            # overlap the next task's generation
+            previous = None
+            for index, task in numbered:
+                with self.deferred_downloads() as downloads:
+                    images, error = self._run_task_safely(task)
+                if previous:
+                    yield self._settle(*previous)
+                previous = (downloads, index, task, images, error)
+            if previous:
+                yield self._settle(*previous)
+            return
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            in_flight: Dict = {}
+            
+            def refill():
+                for index, task in itertools.islice(numbered, window - len(in_flight)):
+                    in_flight[pool.submit(self._run_task_safely, task)] = (index, task)
             
-            all_results.extend(results)
+            refill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, task = in_flight.pop(future)
+                    images, error = future.result()
+                    yield index, task, images, error
+                refill()
+    
+    def _settle(self, downloads: List[Future], *result):
+        """Wait for a deferred task's downloads and return its result"""
+        self.wait_downloads(downloads)
+        return result
+    
+    def _iter_plan(self, tasks: List[Dict], max_workers: int):
+        """Run a coalesced plan in the background, yielding tasks as run_plan finishes them"""
+        
+        finished: queue.Queue = queue.Queue()
+        failure: List[BaseException] = []
+        
+        def run():
+            try:
+                run_plan(self, tasks, plan_batch(self, tasks), max_workers,
+                         lambda *result: finished.put(result))
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                finished.put(None)
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        for result in iter(finished.get, None):
+            yield result
+        thread.join()
+        
+        if failure:
+            raise failure[0]
+    
+    def _run_task_safely(self, task: Dict):
+        """Run a single task, capturing any exception as an error string"""
+        with self.telemetry.task(task_id(task)), self.telemetry.span("task", task_type=task.get('type')) as span:
+            try:
+                images = self._run_task(task)
+                span.update(images=len(images), ok=bool(images))
+                return images, None
+            except Exception as e:
+                span.update(error=f"{type(e).__name__}: {e}", ok=False)
+                return [], span["error"]
+    
+    def task_request(self, task: Dict) -> Dict:
+        """
+        generate_image keyword arguments for a batch task. Optional task-level
+        'num_images', 'seed' and 'model' keys apply to any task type.
+        """
         
-        return all_results
+        task_type = task.get('type')
+        params = task.get('params', {})
+        
+        builders = {
+            'product': self.product_mockup_request,
+            'social': self.social_post_request,
+            'banner': self.banner_request,
+            'email': self.email_header_request,
+            'pattern': self.pattern_request,
+        }
+        
+        if task_type in builders:
+            request = builders[task_type](**params)
+        else:
+            request = {"prompt": "", **params}
+        
+        for key in ('num_images', 'seed', 'model'):
+            if key in task:
+                request[key] = task[key]
+        
+        return request
+    
+    def _run_task(self, task: Dict) -> List[Dict]:
+        """Dispatch a batch task to generate_image"""
+        return self.generate_image(**self.task_request(task))
 
 
 # ==========================================
 # CLI INTERFACE
 # ==========================================
 
-def main():
+def main(argv=None):
     """Command-line interface for image generation"""
     import argparse
     
@@ -317,9 +619,9 @@ def main():
     parser.add_argument('--type', '-t', choices=['product', 'social', 'banner', 'email', 'pattern', 'custom'],
                         default='custom', help='Type of image to generate')
     parser.add_argument('--prompt', '-p', type=str, help='Custom prompt for generation')
-    parser.add_argument('--style', '-s', choices=['kawaii', 'product', 'social', 'banner', 'romantic', 'cozy'],
+    parser.add_argument('--style', '-s', choices=list(STYLE_PRESETS),
                         default='kawaii', help='Style preset')
-    parser.add_argument('--character', '-c', choices=['bubu', 'dudu', 'both'],
+    parser.add_argument('--character', '-c', choices=list(CHARACTERS),
                         default='both', help='Character to feature')
     parser.add_argument('--size', choices=['square_hd', 'portrait_4_3', 'landscape_4_3', 'landscape_16_9'],
                         default='square_hd', help='Image size')
@@ -327,10 +629,12 @@ def main():
     parser.add_argument('--product-type', type=str, help='Product type for mockup')
     parser.add_argument('--theme', type=str, help='Theme for social/banner')
     parser.add_argument('--platform', type=str, default='instagram', help='Social platform')
+    parser.add_argument('--seed', type=int, help='Fixed seed for reproducible results')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the prompt result cache')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
-    generator = DuBuBuImageGenerator()
+    generator = DuBuBuImageGenerator(use_cache=not args.no_cache)
     
     if args.type == 'product' and args.product_type:
         results = generator.generate_product_mockup(args.product_type, args.prompt or '')
@@ -350,7 +654,8 @@ def main():
             style=args.style,
             character=args.character,
             size=args.size,
-            num_images=args.count
+            num_images=args.count,
+            seed=args.seed
         )
     
     print("\n" + "="*50)
@@ -0,0 +1,377 @@
+"""
+fal.ai Queue Runner for DuBuBu.com
+Submits every generation in a batch to fal's queue API up front, records
+the request IDs in a persistent job table, and collects results as they
+complete. An interrupted run reattaches to its in-flight jobs instead of
+resubmitting (and paying for) them.
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .prompt_cache import PromptCache
+from .scheduler import RETRYABLE_STATUS, classify
+from .telemetry import get_telemetry
+
+
+DEFAULT_TABLE = "generated_images/fal_jobs.sqlite"
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_POLL_WORKERS = 8
+# Status/result errors (each already retried by the scheduler) before a job
+# is left in flight for the next run
+DEFAULT_MAX_POLL_ERRORS = 10
+
+
+def job_key(request: Dict) -> str:
+    """Content key for a prepared request (same fields as the prompt cache key)"""
+    arguments = request["arguments"]
+    return PromptCache.make_key(
+        request["full_prompt"],
+        request["model"],
+        arguments["image_size"],
+        arguments["num_images"],
+        arguments.get("seed")
+    )
+
+
+class FalJobTable:
+    """
+    SQLite table of submitted fal.ai jobs, one row per request key.
+
+    status is 'submitted' while the job is in fal's queue, then 'collected'
+    once its images have been downloaded, or 'failed'.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_key      TEXT PRIMARY KEY,
+            request_id   TEXT NOT NULL,
+            model        TEXT NOT NULL,
+            request      TEXT NOT NULL,
+            status       TEXT NOT NULL,
+            submitted_at TEXT NOT NULL,
+            finished_at  TEXT,
+            error        TEXT
+        )
+    """
+
+    def __init__(self, path: str = DEFAULT_TABLE):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(self.SCHEMA)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+    def _row(self, row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        return job
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_key = ?", (key,)).fetchone()
+        return self._row(row)
+
+    def add(self, key: str, request_id: str, request: Dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_key, request_id, model, request, status, submitted_at) "
+                "VALUES (?, ?, ?, ?, 'submitted', ?)",
+                (key, request_id, request["model"], json.dumps(request), datetime.now().isoformat())
+            )
+
+    def mark(self, key: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_key = ?",
+                (status, error, datetime.now().isoformat(), key)
+            )
+
+    def in_flight(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = 'submitted' ORDER BY submitted_at"
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class _Collector:
+    """
+    Polls submitted jobs on a background thread, checking every pending job's
+    status concurrently once per poll interval. Completed jobs are handed to
+    a separate pool that fetches the result and downloads the images, so a
+    slow download never delays polling; finished jobs come out of ready()
+    and drain().
+
+    Status and result-fetch errors leave a job pending to be retried. A job
+    is only marked failed when fal rejects its result with a client error;
+    one that keeps erroring is given up for this run but left 'submitted',
+    so the next run reattaches to it rather than paying for it again.
+    """
+
+    def __init__(self, runner: "FalQueueRunner", save: bool):
+        self.runner = runner
+        self.save = save
+        self._pending: Dict[str, int] = {}          # key -> errors so far
+        self._outstanding = 0
+        self._results: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._status_pool = ThreadPoolExecutor(max_workers=runner.poll_workers, thread_name_prefix="fal-status")
+        self._fetch_pool = ThreadPoolExecutor(max_workers=runner.poll_workers, thread_name_prefix="fal-result")
+        self._thread = threading.Thread(target=self._poll_loop, name="fal-poll", daemon=True)
+        self._thread.start()
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._pending[key] = 0
+            self._outstanding += 1
+        self._wake.set()
+
+    def ready(self) -> Iterator[Tuple[str, List[Dict], Optional[str]]]:
+        """Jobs finished so far, without waiting"""
+        while True:
+            try:
+                item = self._results.get_nowait()
+            except queue.Empty:
+                return
+            yield self._take(item)
+
+    def drain(self) -> Iterator[Tuple[str, List[Dict], Optional[str]]]:
+        """Every remaining job, as each one finishes"""
+        while self._outstanding:
+            yield self._take(self._results.get())
+
+    def _take(self, item):
+        with self._lock:
+            self._outstanding -= 1
+        return item
+
+    def close(self) -> None:
+        self._stopped = True
+        self._wake.set()
+        self._thread.join()
+        self._status_pool.shutdown(wait=True)
+        self._fetch_pool.shutdown(wait=True)
+
+    def _poll_loop(self) -> None:
+        while not self._stopped:
+            with self._lock:
+                keys = list(self._pending)
+            if keys:
+                for key, completed in zip(keys, self._status_pool.map(self._check, keys)):
+                    if completed:
+                        with self._lock:
+                            self._pending.pop(key, None)
+                        self._fetch_pool.submit(self.runner.telemetry.bind(self._fetch), key)
+            self._wake.wait(self.runner.poll_interval if keys else None)
+            self._wake.clear()
+
+    def _check(self, key: str) -> bool:
+        """True once fal reports the job complete; errors count toward max_poll_errors"""
+        client = self.runner.generator.client
+        try:
+            job = self.runner.table.get(key)
+            status = self.runner._call("fal_queue", client.status, job["model"], job["request_id"], with_logs=False)
+        except Exception as e:
+            self._retry_later(key, f"status check failed: {type(e).__name__}: {e}")
+            return False
+        if not isinstance(status, client.Completed):
+            return False
+
+        # Time from submission until fal reported the job complete
+        waited = (datetime.now() - datetime.fromisoformat(job["submitted_at"])).total_seconds()
+        self.runner.telemetry.record("fal.queue_wait", waited, task=key, model=job["model"])
+        return True
+
+    def _retry_later(self, key: str, error: str) -> None:
+        with self._lock:
+            errors = self._pending[key] = self._pending.get(key, 0) + 1
+            give_up = errors > self.runner.max_poll_errors
+            if give_up:
+                del self._pending[key]
+        if give_up:
+            print(f"⚠️  Giving up on {key[:12]} for now ({error}); it stays in flight for the next run to collect")
+            self._results.put((key, [], f"{error} (left in flight)"))
+        else:
+            print(f"Will retry {key[:12]}: {error}")
+
+    def _fetch(self, key: str) -> None:
+        try:
+            self._fetch_job(key)
+        except Exception as e:
+            self._results.put((key, [], f"{type(e).__name__}: {e} (left in flight)"))
+
+    def _fetch_job(self, key: str) -> None:
+        job = self.runner.table.get(key)
+        client = self.runner.generator.client
+        with self.runner.telemetry.task(key):
+            try:
+                with self.runner.telemetry.span("fal.result_fetch"):
+                    result = self.runner._call("fal_queue", client.result, job["model"], job["request_id"])
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                status, _ = classify(e)
+                if status is not None and status not in RETRYABLE_STATUS:
+                    # fal rejected the job itself (e.g. a validation error)
+                    self.runner.table.mark(key, "failed", error)
+                    self._results.put((key, [], error))
+                    return
+                with self._lock:
+                    self._pending[key] = self._pending.get(key, 0)
+                self._retry_later(key, f"result fetch failed: {error}")
+                self._wake.set()
+                return
+
+            try:
+                images = self.runner.generator.finish_request(job["request"], result, self.save)
+            except Exception as e:
+                # Refetching the result is free, so leave the job to be collected again
+                self._results.put((key, [], f"{type(e).__name__}: {e} (left in flight)"))
+                return
+
+        self.runner.table.mark(key, "collected")
+        self._results.put((key, images, None))
+
+
+class FalQueueRunner:
+    """
+    Submit/poll execution for DuBuBuImageGenerator requests.
+
+        runner = FalQueueRunner(generator)
+        for index, task, images, error in runner.run_tasks(tasks):
+            ...   # yielded in completion order, not task order
+    """
+
+    def __init__(
+        self,
+        generator,
+        table_path: str = DEFAULT_TABLE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        poll_workers: int = DEFAULT_POLL_WORKERS,
+        max_poll_errors: int = DEFAULT_MAX_POLL_ERRORS
+    ):
+        self.generator = generator
+        self.table = FalJobTable(table_path)
+        self.poll_interval = poll_interval
+        self.poll_workers = poll_workers
+        self.max_poll_errors = max_poll_errors
+        self.telemetry = get_telemetry()
+
+    def _call(self, endpoint: str, fn, *args, **kwargs):
+        return self.generator.scheduler.call(endpoint, fn, *args, priority=self.generator.priority, **kwargs)
+
+    def submit(self, request: Dict) -> str:
+        """
+        Enqueue one request (or reattach to it if an identical job is already
+        in flight) and return its job key.
+        """
+        key = job_key(request)
+        existing = self.table.get(key)
+
+        if existing and existing["status"] == "submitted":
+            print(f"Reattached to in-flight job {existing['request_id']}")
+            return key
+
+        with self.telemetry.span("fal.submit", task=key):
+            handle = self._call("fal", self.generator.client.submit, request["model"], arguments=request["arguments"])
+        self.table.add(key, handle.request_id, request)
+        print(f"Submitted {handle.request_id}: {request['prompt'][:60]}")
+        return key
+
+    def collect(self, keys: List[str], save: bool = True) -> Iterator[Tuple[str, List[Dict], Optional[str]]]:
+        """Poll the given jobs and yield (key, images, error) as each one finishes"""
+        collector = _Collector(self, save)
+        try:
+            for key in dict.fromkeys(keys):
+                collector.add(key)
+            yield from collector.drain()
+        finally:
+            collector.close()
+
+    def run_tasks(self, tasks: Iterable[Dict], save: bool = True) -> Iterator[Tuple[int, Dict, List[Dict], Optional[str]]]:
+        """
+        Run batch tasks through the queue. Cache hits are yielded immediately
+        and everything else is submitted, with jobs polled from the moment
+        they are submitted, so early jobs are collected while later ones are
+        still being enqueued. Identical requests within the batch share one
+        job. tasks may be any iterable; only the submitted tasks are kept
+        while their jobs are in flight.
+        """
+        waiting: Dict[str, List[Tuple[int, Dict]]] = defaultdict(list)
+        collector = _Collector(self, save)
+
+        def finished(results):
+            for key, images, error in results:
+                for i, task in waiting.pop(key):
+                    yield i, task, [dict(img) for img in images], error
+
+        try:
+            for i, task in enumerate(tasks):
+                try:
+                    request = self.generator.prepare_request(**self.generator.task_request(task))
+                except Exception as e:
+                    yield i, task, [], f"invalid task: {type(e).__name__}: {e}"
+                    continue
+
+                cached = self.generator.cached_images(request, save)
+                if cached:
+                    yield i, task, cached, None
+                    continue
+
+                try:
+                    key = self.submit(request)
+                except Exception as e:
+                    yield i, task, [], f"submit failed: {type(e).__name__}: {e}"
+                    continue
+                if key not in waiting:
+                    collector.add(key)
+                waiting[key].append((i, task))
+
+                yield from finished(collector.ready())
+
+            print(f"\n⏳ {len(waiting)} jobs queued, collecting results as they finish...")
+            yield from finished(collector.drain())
+        finally:
+            collector.close()
+
+    def reattach(self, save: bool = True) -> List[Tuple[str, List[Dict], Optional[str]]]:
+        """Collect every job left in flight by an earlier, interrupted run"""
+        keys = [job["job_key"] for job in self.table.in_flight()]
+        print(f"Reattaching to {len(keys)} in-flight jobs...")
+        return list(self.collect(keys, save))
+
+
+def main(argv=None):
+    """Command-line interface: collect jobs left in flight"""
+    import argparse
+    from .fal_generator import DuBuBuImageGenerator
+
+    parser = argparse.ArgumentParser(description="Collect fal.ai jobs left in flight by an interrupted run")
+    parser.add_argument('--table', default=DEFAULT_TABLE, help='Job table (SQLite)')
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_INTERVAL, help='Seconds between status polls')
+    args = parser.parse_args(argv)
+
+    runner = FalQueueRunner(DuBuBuImageGenerator(), args.table, args.poll)
+    results = runner.reattach()
+    ok = sum(1 for _, images, error in results if images and not error)
+    print(f"\n✅ Collected {ok}/{len(results)} jobs into generated_images/")
+
+
+if __name__ == "__main__":
+    main()
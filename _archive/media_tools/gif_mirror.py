@@ -0,0 +1,196 @@
+"""
+GIF Mirror for DuBuBu.com
+Mirrors preset and catalog Tenor media into a local content-addressed store,
+so the storefront can serve them without hotlinking media.tenor.com
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from .downloader import ImageDownloader
+from .presets import PRESET_GIFS
+
+
+# Catalog entry keys holding media URLs (see TenorFetcher._extract_urls)
+CATALOG_URL_KEYS = ("gif", "webp", "tiny_gif", "preview")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def collect_urls(catalog_files: Iterable[str] = ()) -> List[str]:
+    """Every PRESET_GIFS URL plus the media URLs in any gif_catalog.json files"""
+    urls = [url for gifs in PRESET_GIFS.values() for url in gifs]
+
+    for catalog_file in catalog_files:
+        with open(catalog_file, "r") as f:
+            catalog = json.load(f)
+        for gifs in catalog.values():
+            for gif in gifs:
+                urls.extend(gif[key] for key in CATALOG_URL_KEYS if gif.get(key))
+
+    # Keep first-seen order, drop repeats
+    return list(dict.fromkeys(urls))
+
+
+class MediaMirror:
+    """
+    Content-addressed media store:
+
+        <root>/objects/<sha256[:2]>/<sha256><ext>   one file per unique body
+        <root>/index.json                           url -> object record
+
+    Identical bytes served under different URLs are stored once.
+    """
+
+    def __init__(self, root: str = "media_mirror", workers: int = 8):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.tmp_dir = self.root / "tmp"
+        self.index_path = self.root / "index.json"
+        self.workers = workers
+        self.index: Dict[str, Dict] = self._load_index()
+        # One lock per content hash, so concurrent identical bodies dedup
+        self._hash_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_lock = threading.Lock()
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(f".index.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def local_path(self, url: str) -> Optional[str]:
+        """Mirrored file for url, if it has been synced and is still on disk"""
+        record = self.index.get(url)
+        if record and (self.root / record["path"]).exists():
+            return str(self.root / record["path"])
+        return None
+
+    def _fetch(self, downloader: ImageDownloader, url: str) -> Dict:
+        """Download one URL and move it into the object store"""
+        tmp_path = self.tmp_dir / uuid.uuid4().hex
+        if not downloader.download(url, tmp_path):
+            return {"url": url, "error": "download failed"}
+
+        try:
+            sha256 = file_sha256(tmp_path)
+            shard = self.objects_dir / sha256[:2]
+            with self._locks_lock:
+                hash_lock = self._hash_locks[sha256]
+
+            # Same bytes may arrive under a .gif and a .webp URL; keep the first copy
+            with hash_lock:
+                existing = next(shard.glob(f"{sha256}.*"), None) if shard.exists() else None
+                duplicate = existing is not None
+                if duplicate:
+                    object_path = existing
+                else:
+                    ext = Path(urlparse(url).path).suffix.lower() or ".bin"
+                    object_path = shard / f"{sha256}{ext}"
+                    shard.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp_path, object_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        return {
+            "url": url,
+            "sha256": sha256,
+            "path": str(object_path.relative_to(self.root)),
+            "bytes": object_path.stat().st_size,
+            "fetched_at": datetime.now().isoformat(),
+            "duplicate": duplicate,
+        }
+
+    def _fetch_safely(self, downloader: ImageDownloader, url: str) -> Dict:
+        try:
+            return self._fetch(downloader, url)
+        except Exception as e:
+            return {"url": url, "error": f"{type(e).__name__}: {e}"}
+
+    def sync(self, urls: Iterable[str], incremental: bool = True) -> Dict:
+        """
+        Mirror urls into the store. In incremental mode, URLs already in the
+        index (with their object still on disk) are not fetched again. A URL
+        that fails is listed in the summary's "failed" (with its reason in
+        "errors"); everything fetched is indexed regardless.
+        """
+        urls = list(dict.fromkeys(urls))
+        todo = [u for u in urls if not (incremental and self.local_path(u))]
+        summary = {"total": len(urls), "skipped": len(urls) - len(todo), "fetched": 0, "deduplicated": 0,
+                   "failed": [], "errors": {}}
+
+        if not todo:
+            return summary
+
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            with ImageDownloader(max_workers=self.workers) as downloader:
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    for result in pool.map(lambda u: self._fetch_safely(downloader, u), todo):
+                        if result.get("error"):
+                            summary["failed"].append(result["url"])
+                            summary["errors"][result["url"]] = result["error"]
+                            continue
+                        summary["fetched"] += 1
+                        if result.pop("duplicate"):
+                            summary["deduplicated"] += 1
+                        self.index[result.pop("url")] = result
+        finally:
+            self._save_index()
+
+        return summary
+
+    def stats(self) -> Dict:
+        """Unique objects and bytes on disk vs. URLs indexed"""
+        objects = {record["sha256"]: record["bytes"] for record in self.index.values()}
+        return {"urls": len(self.index), "objects": len(objects), "bytes": sum(objects.values())}
+
+
+def main(argv=None):
+    """Command-line interface: mirror preset and catalog GIFs"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mirror preset and catalog GIFs locally")
+    parser.add_argument('catalogs', nargs='*', help='gif_catalog.json files to mirror as well as PRESET_GIFS')
+    parser.add_argument('--root', default='media_mirror', help='Mirror directory')
+    parser.add_argument('--full', action='store_true', help='Re-fetch every URL instead of only new ones')
+    parser.add_argument('--workers', '-w', type=int, default=8, help='Parallel downloads')
+    args = parser.parse_args(argv)
+
+    mirror = MediaMirror(args.root, workers=args.workers)
+    summary = mirror.sync(collect_urls(args.catalogs), incremental=not args.full)
+    stats = mirror.stats()
+
+    print(f"✅ Synced {summary['total']} URLs: {summary['fetched']} fetched, "
+          f"{summary['skipped']} already mirrored, {summary['deduplicated']} duplicates")
+    print(f"📦 {stats['objects']} unique files ({stats['bytes'] / 1024:.0f} KB) for {stats['urls']} URLs")
+    for url in summary["failed"]:
+        print(f"❌ {url}: {summary['errors'][url]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Media Build Pipeline for DuBuBu.com
+The whole toolchain as one incremental build graph (see build_graph.py):
+campaign assets with their derivatives and catalogs, brand icons and the
+Tenor GIF catalog. Only stale outputs are rebuilt, so editing one product
+prompt regenerates one asset instead of the whole launch set
+
+Usage:
+    python -m media_tools build                                   # launch campaign
+    python -m media_tools build --campaign valentines --derivatives --icons dububu-logo.png --gifs
+    python -m media_tools build --dry-run                         # list what is stale
+    python -m media_tools build 'launch/product:*' --force        # rebuild matching nodes
+"""
+
+import fnmatch
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from . import config
+from .batch_journal import iter_task_ids
+from .build_graph import DEFAULT_STATE, FAILED, BLOCKED, BuildGraph, BuildState, Node, print_report
+from .campaign import ManifestError, iter_tasks, load_manifest
+from .catalog_store import DEFAULT_STORE, CatalogStore
+from .presets import CATALOG_CATEGORIES
+from .search_cache import DEFAULT_TTL
+
+
+DERIVATIVES_DIR = "generated_images/derivatives"
+
+# Tenor results change over time, so category searches go stale after the
+# search cache's TTL even when nothing else changed
+GIF_TTL = DEFAULT_TTL
+
+
+def _favicon_module():
+    # convert_favicon.py lives next to the package, not inside it
+    root = str(Path(__file__).resolve().parent.parent)
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import convert_favicon
+    return convert_favicon
+
+
+# ==========================================
+# CAMPAIGNS
+# ==========================================
+
+def add_campaign(
+    graph: BuildGraph,
+    generator,
+    campaign: Union[str, Dict],
+    derivatives: bool = False,
+    store: Optional[str] = DEFAULT_STORE
+) -> str:
+    """
+    One node per campaign task (named <campaign>/<task_id>), optionally one
+    derivatives node per task, and a <campaign>/catalog node that writes
+    media_catalog_<campaign>.json and updates the catalog store.
+
+    A task's fingerprint is the fal request it resolves to: model, size,
+    image count, seed and the full prompt, which already spells out the
+    STYLE_PRESETS and CHARACTERS text it uses. Editing one task, or one
+    preset, only invalidates the tasks whose request actually changed.
+    """
+    manifest = campaign if isinstance(campaign, dict) else load_manifest(campaign)
+    name = manifest["name"]
+
+    if derivatives:
+        # Pillow is only needed (and loaded) for this step
+        from .derivatives import DEFAULT_WIDTHS, build_derivatives, supported_formats
+        formats = supported_formats()
+
+    catalog_deps = []
+    tags: Dict[str, Dict] = {}
+
+    for tid, task in iter_task_ids(iter_tasks(manifest)):
+        asset = f"{name}/{tid}"
+        tags[tid] = task.get("tags", {})
+
+        try:
+            request = generator.prepare_request(**generator.task_request(task), use_cache=False)
+        except Exception as e:
+            # A task whose params the generator rejects fails as its own node
+            # (blocking this campaign's catalog) instead of stopping the build
+            error = f"invalid task {tid}: {type(e).__name__}: {e}"
+
+            def invalid(deps, error=error):
+                raise ManifestError(error)
+
+            graph.add(Node(asset, invalid, inputs={"task": task}))
+            catalog_deps.append(asset)
+            continue
+
+        def generate(deps, task=task):
+            images = generator.generate_image(**generator.task_request(task))
+            if not images:
+                raise RuntimeError("no images returned")
+            return {"images": images, "outputs": [img["local_path"] for img in images if img.get("local_path")]}
+
+        graph.add(Node(asset, generate, inputs={"model": request["model"], "arguments": request["arguments"]}))
+        catalog_deps.append(asset)
+
+        if derivatives:
+            def derive(deps, asset=asset):
+                entries = {
+                    img["local_path"]: build_derivatives(img["local_path"], DERIVATIVES_DIR, DEFAULT_WIDTHS, formats)
+                    for img in deps[asset]["images"] if img.get("local_path")
+                }
+                outputs = [d["path"] for entry in entries.values() for d in entry["derivatives"]]
+                return {"entries": entries, "outputs": outputs}
+
+            graph.add(Node(f"{asset}/derivatives", derive, deps=[asset],
+                           inputs={"widths": DEFAULT_WIDTHS, "formats": formats, "out_dir": DERIVATIVES_DIR}))
+            catalog_deps.append(f"{asset}/derivatives")
+
+    output_file = f"media_catalog_{name}.json"
+
+    def write_catalog(deps):
+        images = []
+        for tid, task_tags in tags.items():
+            derived = (deps.get(f"{name}/{tid}/derivatives") or {}).get("entries", {})
+            for img in deps[f"{name}/{tid}"]["images"]:
+                img = dict(img, **task_tags, campaign=name, task_id=tid)
+                entry = derived.get(img.get("local_path"))
+                if entry:
+                    img["derivatives"] = entry["derivatives"]
+                    img["placeholder"] = entry["placeholder"]
+                images.append(img)
+
+        with open(output_file, "w") as f:
+            json.dump({"campaign": name, "images": images}, f, indent=2)
+        if store:
+            catalog = CatalogStore(store)
+            catalog.add_images(images)
+            catalog.close()
+        return {"images": len(images), "outputs": [output_file]}
+
+    graph.add(Node(f"{name}/catalog", write_catalog, deps=catalog_deps,
+                   inputs={"tags": tags, "store": store}, outputs=[output_file]))
+    return f"{name}/catalog"
+
+
+# ==========================================
+# ICONS
+# ==========================================
+
+def add_icons(graph: BuildGraph, source: str, out_dir: str = "brand_icons") -> List[str]:
+    """
+    Icon nodes: one for a single logo (storefront DEFAULT_OUTPUTS), or one per
+    brand for a folder of logos / JSON brand manifest (BRAND_OUTPUTS into
+    out_dir/<brand>/). Each is fingerprinted by the logo's content and the
+    output spec.
+    """
+    favicon = _favicon_module()
+    path = Path(source)
+
+    if path.is_file() and path.suffix.lower() in favicon.SOURCE_EXTENSIONS:
+        def render(deps):
+            paths, _ = favicon.generate_icons(source, favicon.DEFAULT_OUTPUTS, state_file=None, force=True)
+            return {"outputs": paths}
+
+        name = f"icons/{path.stem}"
+        graph.add(Node(name, render, inputs={"outputs": favicon.DEFAULT_OUTPUTS}, files=[source],
+                       outputs=[o["path"] for o in favicon.DEFAULT_OUTPUTS]))
+        return [name]
+
+    names = []
+    for brand in favicon.discover_brands(source):
+        def render_brand(deps, brand=brand):
+            report = favicon.render_brand(brand, out_dir, force=True)
+            if report["error"]:
+                raise RuntimeError(report["error"])
+            return {"outputs": report["outputs"]}
+
+        name = f"icons/{brand['name']}"
+        graph.add(Node(name, render_brand, inputs={"brand": brand, "outputs": favicon.BRAND_OUTPUTS, "out_dir": out_dir},
+                       files=[brand["source"]]))
+        names.append(name)
+    return names
+
+
+# ==========================================
+# GIF CATALOG
+# ==========================================
+
+def add_gifs(
+    graph: BuildGraph,
+    limit: int = 10,
+    output_file: str = "gif_catalog.json",
+    store: Optional[str] = DEFAULT_STORE,
+    ttl: float = GIF_TTL
+) -> str:
+    """
+    One search node per catalog category (searched in parallel) and a
+    gifs/catalog node writing output_file, in save_gif_catalog's format.
+    """
+    fetcher = []
+    lock = threading.Lock()
+
+    def get_fetcher():
+        # Created on first search, so a dry run never loads requests
+        with lock:
+            if not fetcher:
+                from .tenor_fetcher import TenorFetcher
+                fetcher.append(TenorFetcher())
+        return fetcher[0]
+
+    for category in CATALOG_CATEGORIES:
+        def search(deps, category=category):
+            gifs = get_fetcher().get_bubu_dudu_gifs(category, limit=limit)
+            if not gifs:
+                raise RuntimeError(f"no results for '{category}'")
+            return {"gifs": gifs}
+
+        graph.add(Node(f"gifs/{category}", search, ttl=ttl,
+                       inputs={"category": category, "limit": limit, "base_url": config.tenor_base_url()}))
+
+    def write_catalog(deps):
+        catalog = {category: deps[f"gifs/{category}"]["gifs"] for category in CATALOG_CATEGORIES}
+        with open(output_file, "w") as f:
+            json.dump(catalog, f, indent=2)
+        if store:
+            catalog_store = CatalogStore(store)
+            for category, gifs in catalog.items():
+                catalog_store.add_gifs(category, gifs)
+            catalog_store.close()
+        return {"outputs": [output_file]}
+
+    graph.add(Node("gifs/catalog", write_catalog, deps=[f"gifs/{c}" for c in CATALOG_CATEGORIES],
+                   inputs={"store": store}, outputs=[output_file]))
+    return "gifs/catalog"
+
+
+def select(graph: BuildGraph, patterns: List[str]) -> List[str]:
+    """Node names matching any glob pattern (e.g. 'launch/product:*')"""
+    names = [name for name in graph.nodes if any(fnmatch.fnmatchcase(name, p) for p in patterns)]
+    if not names:
+        raise ValueError(f"No build nodes match {', '.join(patterns)}")
+    return names
+
+
+def main(argv=None):
+    """Command-line interface: bring campaign assets, icons and GIF catalogs up to date"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incrementally build DuBuBu media (only stale outputs are redone)")
+    parser.add_argument('targets', nargs='*', metavar='NODE',
+                        help="Only build nodes matching these glob patterns (and what they depend on)")
+    parser.add_argument('--campaign', action='append', metavar='NAME_OR_FILE',
+                        help='Campaign manifest to build (repeatable; default: launch unless --icons/--gifs)')
+    parser.add_argument('--derivatives', action='store_true', help='Also build responsive derivatives per asset')
+    parser.add_argument('--icons', metavar='LOGO_OR_BRANDS', help='Logo file, folder of logos or brand manifest')
+    parser.add_argument('--icons-out', default='brand_icons', help='Output folder for brand icon sets')
+    parser.add_argument('--gifs', action='store_true', help='Also build the Tenor GIF catalog')
+    parser.add_argument('--gif-limit', type=int, default=10, help='GIFs per catalog category')
+    parser.add_argument('--store', default=DEFAULT_STORE, metavar='SQLITE', help='Catalog store to update')
+    parser.add_argument('--no-store', action='store_true', help='Only write the catalog JSON files')
+    parser.add_argument('--state', default=DEFAULT_STATE, help=f"Build state database (default: {DEFAULT_STATE})")
+    parser.add_argument('--jobs', '-j', type=int, default=4, help='Nodes built in parallel')
+    parser.add_argument('--force', '-f', action='store_true', help='Rebuild nodes even if fresh')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Regenerate assets instead of reusing prompt cache results')
+    parser.add_argument('--dry-run', '-n', action='store_true', help='Only report which nodes are stale')
+    parser.add_argument('--verbose', '-v', action='store_true', help='List fresh nodes too')
+    args = parser.parse_args(argv)
+
+    from .fal_generator import DuBuBuImageGenerator, LazyFalClient
+    from .scheduler import BATCH
+
+    store = None if args.no_store else args.store
+    state = BuildState(args.state)
+    graph = BuildGraph(state)
+    campaigns = args.campaign or ([] if args.icons or args.gifs else ["launch"])
+
+    try:
+        try:
+            if campaigns:
+                generator = DuBuBuImageGenerator(
+                    use_cache=not args.no_cache,
+                    download_workers=max(4, args.jobs),
+                    priority=BATCH,
+                    client=LazyFalClient()
+                )
+                for campaign in campaigns:
+                    add_campaign(graph, generator, campaign, args.derivatives, store)
+            if args.icons:
+                add_icons(graph, args.icons, args.icons_out)
+            if args.gifs:
+                add_gifs(graph, args.gif_limit, store=store)
+            targets = select(graph, args.targets) if args.targets else None
+        except (ManifestError, ValueError, OSError) as e:
+            parser.error(str(e))
+
+        print(f"🔨 {'Checking' if args.dry_run else 'Building'} {len(graph.closure(targets))} nodes ({args.jobs} at a time)...")
+        reports = graph.run(targets, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+        print_report(reports, args.verbose)
+    finally:
+        state.close()
+
+    if any(r["status"] in (FAILED, BLOCKED) for r in reports.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
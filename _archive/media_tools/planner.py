@@ -0,0 +1,194 @@
+"""
+Batch Request Planner for DuBuBu.com
+Coalesces batch tasks that share a prompt into multi-image fal.ai requests,
+dedups identical tasks, and fans the images back out to each task
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .batch_journal import task_id
+from .telemetry import get_telemetry
+
+
+# fal.ai's flux endpoints accept at most 4 images per request
+MAX_IMAGES_PER_REQUEST = 4
+
+
+def plan_batch(generator, tasks: List[Dict], max_images: int = MAX_IMAGES_PER_REQUEST) -> Dict:
+    """
+    Build an execution plan for a batch.
+
+    Returns:
+        {
+          "demands":  [{"tasks": [task indices], "group": g, "offset": o, "count": n}],
+          "requests": [{"kwargs": generate_image kwargs, "group": g, "offset": o, "count": n}],
+          "invalid":  [(task index, error)],
+        }
+
+    A demand is one distinct request; identical tasks share it. Demands
+    whose (model, size, full prompt, seed) match form a group, laid out
+    back to back in one run of image slots that is then cut into requests
+    of at most max_images. Tasks that do not resolve to a request (unknown
+    parameters, say) are listed under "invalid" and left out of the plan.
+    """
+    demands: List[Dict] = []
+    invalid: List[Tuple[int, str]] = []
+    demand_index: Dict[str, int] = {}
+    groups: Dict[tuple, Dict] = {}
+
+    for i, task in enumerate(tasks):
+        try:
+            kwargs = generator.task_request(task)
+            identity = json.dumps(kwargs, sort_keys=True, default=str)
+
+            if identity in demand_index:
+                demands[demand_index[identity]]["tasks"].append(i)
+                continue
+
+            count = max(1, kwargs.pop("num_images", 1))
+            request = generator.prepare_request(**kwargs)
+        except Exception as e:
+            invalid.append((i, f"invalid task: {type(e).__name__}: {e}"))
+            continue
+        group_key = (request["model"], request["arguments"]["image_size"], request["full_prompt"], kwargs.get("seed"))
+
+        if group_key not in groups:
+            groups[group_key] = {"kwargs": kwargs, "slots": 0, "index": len(groups)}
+        group = groups[group_key]
+
+        demand_index[identity] = len(demands)
+        demands.append({"tasks": [i], "group": group["index"], "offset": group["slots"], "count": count})
+        group["slots"] += count
+
+    requests = []
+    for group in groups.values():
+        for offset in range(0, group["slots"], max_images):
+            count = min(max_images, group["slots"] - offset)
+            requests.append({
+                "kwargs": dict(group["kwargs"], num_images=count),
+                "group": group["index"],
+                "offset": offset,
+                "count": count,
+            })
+
+    return {"demands": demands, "requests": requests, "invalid": invalid}
+
+
+def _overlaps(demand: Dict, request: Dict) -> bool:
+    return (
+        demand["group"] == request["group"]
+        and demand["offset"] < request["offset"] + request["count"]
+        and request["offset"] < demand["offset"] + demand["count"]
+    )
+
+
+def run_plan(
+    generator,
+    tasks: List[Dict],
+    plan: Dict,
+    max_workers: int = 1,
+    on_result: Optional[Callable[[int, Dict, List[Dict], Optional[str]], None]] = None
+) -> List[List[Dict]]:
+    """
+    Execute a plan and return one image list per task, in task order.
+    on_result fires for each task as soon as every request it depends on
+    has finished. A task missing some of its images is reported with an
+    error (and whatever images it did get); invalid tasks fail up front.
+    """
+    requests = plan["requests"]
+    demands = plan["demands"]
+
+    # Images per group, indexed by slot; None until the covering request returns
+    slots: Dict[int, List[Optional[Dict]]] = {}
+    for request in requests:
+        slots.setdefault(request["group"], [])
+        slots[request["group"]].extend([None] * request["count"])
+
+    remaining = [sum(1 for r in requests if _overlaps(d, r)) for d in demands]
+    dependents = [[d for d, demand in enumerate(demands) if _overlaps(demand, r)] for r in requests]
+    errors: Dict[int, str] = {}
+    # Why each demand is missing images, from every short request it overlaps
+    demand_errors: Dict[int, List[str]] = {}
+    grouped: List[List[Dict]] = [[] for _ in tasks]
+    lock = threading.Lock()
+
+    print(f"\nPlanned {len(tasks)} tasks as {len(demands)} distinct demands in {len(requests)} requests")
+
+    for i, error in plan.get("invalid", []):
+        if on_result:
+            on_result(i, tasks[i], [], error)
+
+    telemetry = get_telemetry()
+
+    def execute(r: int) -> List[Dict]:
+        # Spans are tagged with the first task the request serves
+        served = [i for d in dependents[r] for i in demands[d]["tasks"]]
+        with telemetry.task(task_id(tasks[served[0]])), telemetry.span("request", tasks=len(served)) as span:
+            try:
+                images = generator.generate_image(**requests[r]["kwargs"])
+                span.update(images=len(images), ok=bool(images))
+                return images
+            except Exception as e:
+                errors[r] = f"{type(e).__name__}: {e}"
+                span.update(error=errors[r], ok=False)
+                return []
+
+    def finish(r: int, images: List[Dict]):
+        request = requests[r]
+        ready = []
+        with lock:
+            group_slots = slots[request["group"]]
+            received = images[:request["count"]]
+            for k, img in enumerate(received):
+                group_slots[request["offset"] + k] = img
+
+            # Slots this request left empty
+            missing = {"group": request["group"], "offset": request["offset"] + len(received),
+                       "count": request["count"] - len(received)}
+            reason = errors.get(r) or (f"request returned {len(received)} of {request['count']} images"
+                                       if received else "no images returned")
+
+            for d in dependents[r]:
+                if missing["count"] > 0 and _overlaps(demands[d], missing):
+                    demand_errors.setdefault(d, []).append(reason)
+                remaining[d] -= 1
+                if remaining[d] == 0:
+                    demand = demands[d]
+                    taken = group_slots[demand["offset"]:demand["offset"] + demand["count"]]
+                    ready.append((d, [img for img in taken if img is not None]))
+
+        for d, images_for_demand in ready:
+            error = None
+            if len(images_for_demand) < demands[d]["count"]:
+                reasons = "; ".join(dict.fromkeys(demand_errors.get(d, []))) or "no images returned"
+                error = reasons if not images_for_demand else (
+                    f"partial: {len(images_for_demand)} of {demands[d]['count']} images ({reasons})")
+            for i in demands[d]["tasks"]:
+                grouped[i] = [dict(img) for img in images_for_demand]
+                if on_result:
+                    on_result(i, tasks[i], grouped[i], error)
+
+    if max_workers <= 1:
+        # Each request's downloads overlap the next request's generation;
+        # its tasks are finished once the files are saved
+        previous = None
+        for r in range(len(requests)):
+            with generator.deferred_downloads() as downloads:
+                images = execute(r)
+            if previous:
+                generator.wait_downloads(previous[2])
+                finish(*previous[:2])
+            previous = (r, images, downloads)
+        if previous:
+            generator.wait_downloads(previous[2])
+            finish(*previous[:2])
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(execute, r): r for r in range(len(requests))}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+
+    return grouped
@@ -0,0 +1,195 @@
+"""
+Presets for DuBuBu.com
+Brand styles, characters, request templates and preset GIFs, read from one
+registry (presets.json) on first use and kept free of client libraries so
+they load instantly. The storefront's lib/constants/gifs.ts is generated
+from the same file, so the two GIF lists cannot drift apart.
+
+Usage:
+    python -m media_tools presets                    # list everything
+    python -m media_tools presets love 1             # one preset GIF URL
+    python -m media_tools presets --ts               # regenerate lib/constants/gifs.ts
+    python -m media_tools presets --ts --check       # exit 1 if it is out of date
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict
+
+
+REGISTRY_FILE = Path(__file__).with_name("presets.json")
+
+# The storefront module generated from the registry (repo root/lib/constants)
+TS_MODULE = Path(__file__).resolve().parent.parent.parent / "lib" / "constants" / "gifs.ts"
+
+# Module attribute -> registry section, loaded on first access
+_SECTIONS = {
+    "STYLE_PRESETS": "styles",
+    "CHARACTERS": "characters",
+    "CATALOG_CATEGORIES": "catalog_categories",
+    "PRESET_GIFS": "gifs",
+    "GIF_ALIASES": "gif_aliases",
+}
+
+
+@lru_cache(maxsize=None)
+def load_registry(path: str = str(REGISTRY_FILE)) -> Dict:
+    """The parsed registry, read once per process"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def __getattr__(name):
+    if name not in _SECTIONS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = load_registry()[_SECTIONS[name]]
+    globals()[name] = value
+    return value
+
+
+@lru_cache(maxsize=4096)
+def full_prompt(prompt: str, style: str, character: str) -> str:
+    """A base prompt with its character and style modifiers (unknown names fall back to the defaults)"""
+    registry = load_registry()
+    defaults = registry["defaults"]
+    styles, characters = registry["styles"], registry["characters"]
+    return registry["full_prompt"].format(
+        prompt=prompt,
+        character=characters.get(character, characters[defaults["character"]]),
+        style=styles.get(style, styles[defaults["style"]]),
+    )
+
+
+@lru_cache(maxsize=4096)
+def _render_request(kind: str, key: str, fields: tuple) -> tuple:
+    spec = load_registry()["requests"][kind]
+    values = dict(fields, key=key)
+
+    subject = spec.get("subjects", {}).get(key, spec.get("fallback", "{key}")).format(**values)
+    prompt = spec["template"].format(subject=subject, **values)
+    for field, suffix in spec.get("extras", {}).items():
+        if values.get(field):
+            prompt += suffix.format(**values)
+
+    size = spec.get("sizes", {}).get(values.get(spec.get("size_by")), spec["size"])
+    return prompt, spec["style"], spec["character"], size
+
+
+def preset_request(kind: str, key: str, **fields) -> Dict:
+    """
+    generate_image arguments for a request template in the registry
+    ('product', 'social', 'banner', 'email', 'pattern'). key picks the
+    subject (product type, theme, banner type...); fields fill the
+    template's other placeholders. Rendered prompts are memoized, and a
+    fresh dict is returned so callers may modify it.
+    """
+    try:
+        prompt, style, character, size = _render_request(kind, key, tuple(sorted(fields.items())))
+    except TypeError:
+        # Unhashable field values can't be memoized
+        prompt, style, character, size = _render_request.__wrapped__(kind, key, tuple(sorted(fields.items())))
+    return {"prompt": prompt, "style": style, "character": character, "size": size}
+
+
+def get_preset_gif(category: str, index: int = 0, local: bool = False, mirror=None) -> str:
+    """
+    Get a preset GIF URL without API
+
+    With local=True, returns the mirrored file path from gif_mirror.MediaMirror
+    (default ./media_mirror) when the URL has been synced, else the URL.
+    """
+    registry = load_registry()
+    gifs = registry["gifs"]
+    category = registry["gif_aliases"].get(category, category)
+    urls = gifs.get(category, gifs[registry["default_gif_category"]])
+    url = urls[index % len(urls)]
+
+    if local:
+        if mirror is None:
+            from .gif_mirror import MediaMirror
+            mirror = MediaMirror()
+        return mirror.local_path(url) or url
+
+    return url
+
+
+def render_typescript() -> str:
+    """lib/constants/gifs.ts: the preset GIFs (aliases included) and getRandomGif"""
+    registry = load_registry()
+    gifs = dict(registry["gifs"])
+    for alias, category in registry["gif_aliases"].items():
+        gifs[alias] = gifs[category]
+
+    lines = [
+        "// Generated from _archive/media_tools/presets.json; do not edit by hand.",
+        "// Regenerate with: cd _archive && python -m media_tools presets --ts",
+        "",
+        "export const GIFS = {",
+    ]
+    for category, urls in gifs.items():
+        lines.append(f"    {category}: [")
+        lines += [f"        {json.dumps(url)}," for url in urls]
+        lines.append("    ],")
+    lines += [
+        "} as const;",
+        "",
+        "export type GifCategory = keyof typeof GIFS;",
+        "",
+        "export function getRandomGif(category: GifCategory): string {",
+        "    const gifs = GIFS[category];",
+        "    return gifs[Math.floor(Math.random() * gifs.length)];",
+        "}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    """Command-line interface: list presets, resolve a preset GIF or generate the TypeScript module"""
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="List DuBuBu.com presets")
+    parser.add_argument('category', nargs='?', help='Print the preset GIF URL for this category')
+    parser.add_argument('index', nargs='?', type=int, default=0, help='Which GIF in the category')
+    parser.add_argument('--local', action='store_true', help='Prefer the mirrored file if it has been synced')
+    parser.add_argument('--ts', nargs='?', const=str(TS_MODULE), metavar='PATH',
+                        help=f"Write the storefront GIF module (default: {TS_MODULE})")
+    parser.add_argument('--check', action='store_true', help='With --ts, only report whether the module is current')
+    args = parser.parse_args(argv)
+
+    if args.ts:
+        source = render_typescript()
+        target = Path(args.ts)
+        current = target.read_text(encoding="utf-8") if target.exists() else None
+        if args.check:
+            print(f"{'✅' if current == source else '⚠️ '} {target} is {'up to date' if current == source else 'stale'}")
+            sys.exit(0 if current == source else 1)
+        if current != source:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(source, encoding="utf-8")
+        print(f"📄 {target} {'written' if current != source else 'already up to date'}")
+        return
+
+    if args.category:
+        print(get_preset_gif(args.category, args.index, local=args.local))
+        return
+
+    registry = load_registry()
+    print("Styles:")
+    for name, modifiers in registry["styles"].items():
+        print(f"  {name:<10} {modifiers}")
+    print("\nCharacters:")
+    for name, description in registry["characters"].items():
+        print(f"  {name:<10} {description}")
+    print("\nRequest templates:")
+    for kind, spec in registry["requests"].items():
+        print(f"  {kind:<10} {', '.join(spec.get('subjects', {})) or spec['template']}")
+    print("\nPreset GIFs:")
+    for category, urls in registry["gifs"].items():
+        aliases = [a for a, c in registry["gif_aliases"].items() if c == category]
+        print(f"  {category:<10} {len(urls)} GIFs" + (f" (also: {', '.join(aliases)})" if aliases else ""))
+
+
+if __name__ == "__main__":
+    main()
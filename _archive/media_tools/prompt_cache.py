@@ -0,0 +1,192 @@
+"""
+Prompt Result Cache for DuBuBu.com
+Content-addressed on-disk cache for fal.ai generations, so re-running a
+batch only pays for prompts that have not been generated before
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, List, Dict
+
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3       # 2 GB
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60     # 30 days
+
+
+class PromptCache:
+    """
+    Stores generation metadata and image bytes under a hash of the request.
+
+    Layout:
+        <cache_dir>/<key[:2]>/<key>/meta.json
+        <cache_dir>/<key[:2]>/<key>/0.png, 1.png, ...
+
+    Entries are evicted least-recently-used first once the cache grows past
+    max_bytes, and unconditionally once they have gone unused for max_age
+    seconds.
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(
+        self,
+        cache_dir: str = "generated_images/.cache",
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        full_prompt: str,
+        model: str,
+        size: str,
+        num_images: int,
+        seed: Optional[int] = None
+    ) -> str:
+        """Hash the request fields that determine the generated output"""
+        payload = json.dumps(
+            [full_prompt, model, size, num_images, seed],
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key: str, require_files: bool = True) -> Optional[List[Dict]]:
+        """
+        Look up a cached generation.
+
+        Returns the cached image records, each with a 'cache_path' pointing at
+        the stored bytes (or None), or None on a miss. With require_files, an
+        entry that was stored without image bytes counts as a miss.
+        """
+        entry = self._entry_dir(key)
+        meta_path = entry / self.META_FILE
+
+        try:
+            last_used = meta_path.stat().st_mtime
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - last_used > self.max_age:
+            with self._lock:
+                self._remove(entry)
+            return None
+
+        images = []
+        for record in meta.get("images", []):
+            record = dict(record)
+            filename = record.pop("file", None)
+            cache_path = entry / filename if filename else None
+            if cache_path is not None and not cache_path.exists():
+                cache_path = None
+            if require_files and cache_path is None:
+                return None
+            record["cache_path"] = cache_path
+            images.append(record)
+
+        if not images:
+            return None
+
+        # Bump the access time so LRU eviction keeps hot entries
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+
+        return images
+
+    def put(self, key: str, images: List[Dict]) -> None:
+        """
+        Store a generation. Records with a 'local_path' have their image bytes
+        copied into the cache alongside the metadata.
+        """
+        entry = self._entry_dir(key)
+        staging = entry.parent / f".{key}.{uuid.uuid4().hex}.tmp"
+        staging.mkdir(parents=True, exist_ok=True)
+
+        records = []
+        try:
+            for i, img in enumerate(images):
+                record = {k: v for k, v in img.items() if k != "local_path"}
+                local_path = img.get("local_path")
+                if local_path and Path(local_path).exists():
+                    filename = f"{i}{Path(local_path).suffix or '.png'}"
+                    shutil.copyfile(local_path, staging / filename)
+                    record["file"] = filename
+                records.append(record)
+
+            with open(staging / self.META_FILE, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "created": time.time(), "images": records}, f, indent=2)
+
+            with self._lock:
+                if entry.exists():
+                    self._remove(entry)
+                os.replace(staging, entry)
+        finally:
+            if staging.exists():
+                self._remove(staging)
+
+        self.evict()
+
+    def evict(self) -> int:
+        """Apply the age and size limits. Returns the number of entries removed."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            removed = 0
+
+            for meta_path in self.cache_dir.glob(f"*/*/{self.META_FILE}"):
+                entry = meta_path.parent
+                try:
+                    stat = meta_path.stat()
+                    size = sum(p.stat().st_size for p in entry.iterdir())
+                except OSError:
+                    continue
+
+                if now - stat.st_mtime > self.max_age:
+                    self._remove(entry)
+                    removed += 1
+                    continue
+                entries.append((stat.st_mtime, size, entry))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                self._remove(entry)
+                total -= size
+                removed += 1
+
+            return removed
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        with self._lock:
+            for child in self.cache_dir.iterdir():
+                self._remove(child)
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                path.unlink()
+            except OSError:
+                pass
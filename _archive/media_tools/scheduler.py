@@ -0,0 +1,348 @@
+"""
+Request Scheduler for DuBuBu.com
+Shared rate limiting, retries and prioritisation for the fal.ai and Tenor
+clients, so bulk batches run at the provider ceiling instead of collapsing
+on the first 429
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import config
+from .telemetry import get_telemetry
+
+
+# Lower value = served first
+INTERACTIVE = 0
+BATCH = 10
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Default per-endpoint limits: (rate env var, requests/second, burst). Rates
+# are read when a scheduler is built, so .env.local can override them
+DEFAULT_LIMITS = {
+    "fal": ("DUBUBU_FAL_RPS", 5.0, 10),
+    "fal_queue": ("DUBUBU_FAL_QUEUE_RPS", 20.0, 20),
+    "tenor": ("DUBUBU_TENOR_RPS", 5.0, 10),
+    # GIF/WebP renditions from Tenor's media CDN
+    "tenor_media": ("DUBUBU_TENOR_MEDIA_RPS", 50.0, 50),
+}
+
+
+def check_rate(rate: Any, name: str) -> float:
+    """rate as a finite float > 0; raises ValueError naming the setting otherwise"""
+    try:
+        value = float(rate)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or not math.isfinite(value) or value <= 0:
+        raise ValueError(f"{name} must be a number of requests per second greater than 0, got {rate!r}")
+    return value
+
+
+def resolve_limits() -> Dict[str, Tuple[float, int]]:
+    """DEFAULT_LIMITS as {endpoint: (requests/second, burst)}, with env overrides applied"""
+    return {
+        endpoint: (check_rate(config.get(env, str(rate)), env), burst)
+        for endpoint, (env, rate, burst) in DEFAULT_LIMITS.items()
+    }
+
+
+class TokenBucket:
+    """
+    Token bucket whose waiters are served from a priority queue: when a
+    token frees up it goes to the highest-priority (then oldest) waiter.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = check_rate(rate, "TokenBucket rate")
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority: int = BATCH) -> float:
+        """Block until a token is granted; returns seconds spent waiting"""
+        start = time.monotonic()
+        ticket = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                if self._waiters[0] == ticket and now >= self.paused_until and self.tokens >= 1:
+                    heapq.heappop(self._waiters)
+                    self.tokens -= 1
+                    self._cond.notify_all()
+                    return now - start
+
+                if self._waiters[0] != ticket:
+                    timeout = None
+                elif now < self.paused_until:
+                    timeout = self.paused_until - now
+                else:
+                    timeout = (1 - self.tokens) / self.rate
+                self._cond.wait(timeout)
+
+    async def acquire_async(self, priority: int = BATCH) -> float:
+        """
+        acquire() for coroutines: waits with asyncio.sleep instead of blocking
+        the event loop, in the same priority queue as threaded callers
+        """
+        start = time.monotonic()
+        ticket = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    self._refill(now)
+
+                    if self._waiters[0] == ticket and now >= self.paused_until and self.tokens >= 1:
+                        heapq.heappop(self._waiters)
+                        self.tokens -= 1
+                        self._cond.notify_all()
+                        return now - start
+
+                    if now < self.paused_until:
+                        delay = self.paused_until - now
+                    else:
+                        delay = max(0.0, 1 - self.tokens) / self.rate
+                await asyncio.sleep(max(delay, 0.001))
+        except BaseException:
+            # Cancelled while queued: give up the place in line
+            with self._cond:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+            raise
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for a while (e.g. after a 429 Retry-After)"""
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+            self._cond.notify_all()
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds, from either delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(outcome: Any) -> Tuple[Optional[int], Optional[float]]:
+    """
+    HTTP status and Retry-After for a response or exception.
+
+    Understands objects with status_code/headers (requests.Response) or
+    status/headers (aiohttp), HTTP errors carrying a .response (requests,
+    httpx) and fal_client errors exposing status_code/response_headers.
+    """
+    source = outcome
+    if getattr(outcome, "status_code", None) is None and getattr(outcome, "response", None) is not None:
+        source = outcome.response
+
+    status = getattr(source, "status_code", None)
+    if status is None:
+        # aiohttp responses and errors
+        status = getattr(source, "status", None)
+    headers = getattr(source, "headers", None) or getattr(outcome, "response_headers", None) or {}
+    retry_after = _parse_retry_after(headers.get("Retry-After") or headers.get("retry-after"))
+    return (status if isinstance(status, int) else None), retry_after
+
+
+def _is_transient(error: Exception) -> bool:
+    """Connection-level failures worth retrying even without a status code"""
+    try:
+        import requests
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+    except ImportError:
+        pass
+    # aiohttp is only checked if a caller has already loaded it
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp and isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError)):
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class RequestScheduler:
+    """
+    Routes calls through a per-endpoint TokenBucket and retries 429/5xx
+    responses (and transient connection errors) with exponential backoff
+    and full jitter, honouring Retry-After when the server sends one.
+
+    A 429 also pauses the endpoint's bucket, so every caller backs off
+    together instead of each one burning a retry. Coroutines use call_async,
+    which shares the same buckets.
+    """
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_retries = max_retries
+        self.limits = resolve_limits()
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.telemetry = get_telemetry()
+
+    def configure(self, endpoint: str, rate: float, burst: Optional[int] = None) -> None:
+        """Set the rate limit (requests/second) for an endpoint"""
+        rate = check_rate(rate, f"rate for {endpoint}")
+        with self._lock:
+            self._buckets[endpoint] = TokenBucket(rate, burst or max(1, int(rate)))
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        with self._lock:
+            if endpoint not in self._buckets:
+                rate, burst = self.limits.get(endpoint, (10.0, 10))
+                self._buckets[endpoint] = TokenBucket(rate, burst)
+            return self._buckets[endpoint]
+
+    def _count(self, endpoint: str, key: str) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(endpoint, {"calls": 0, "retries": 0, "throttled": 0})
+            stats[key] += 1
+        self.telemetry.count(f"{endpoint}.{key}")
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Retry-After if given, else full-jitter exponential backoff"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _should_retry(self, attempt: int, result: Any = None, error: Optional[Exception] = None):
+        """(status, Retry-After) if the outcome should be retried, else None"""
+        if error is not None:
+            status, retry_after = classify(error)
+            if not (status in RETRYABLE_STATUS or (status is None and _is_transient(error))):
+                return None
+        else:
+            status, retry_after = classify(result)
+            if status not in RETRYABLE_STATUS:
+                return None
+        if attempt == self.max_retries:
+            return None
+        return status, retry_after
+
+    def _retry_delay(self, endpoint: str, bucket: TokenBucket, attempt: int, status: Optional[int],
+                     retry_after: Optional[float]) -> float:
+        delay = self.backoff_delay(attempt, retry_after)
+        self._count(endpoint, "retries")
+        if status == 429:
+            self._count(endpoint, "throttled")
+            bucket.pause(delay)
+        print(f"[{endpoint}] {status or 'connection error'}, retrying in {delay:.1f}s "
+              f"(attempt {attempt + 1}/{self.max_retries})")
+        return delay
+
+    def call(
+        self,
+        endpoint: str,
+        fn: Callable,
+        *args,
+        priority: int = BATCH,
+        **kwargs
+    ) -> Any:
+        """
+        Run fn(*args, **kwargs) under the endpoint's rate limit with retries.
+
+        A retryable response that is still failing after max_retries is
+        returned as-is; a retryable exception is re-raised.
+        """
+        bucket = self._bucket(endpoint)
+
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.acquire(priority)
+            self.telemetry.record(f"{endpoint}.rate_wait", waited, priority=priority)
+            self._count(endpoint, "calls")
+
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retry = self._should_retry(attempt, error=e)
+                if retry is None:
+                    raise
+            else:
+                retry = self._should_retry(attempt, result)
+                if retry is None:
+                    return result
+
+            time.sleep(self._retry_delay(endpoint, bucket, attempt, *retry))
+
+    async def call_async(
+        self,
+        endpoint: str,
+        fn: Callable,
+        *args,
+        priority: int = BATCH,
+        **kwargs
+    ) -> Any:
+        """
+        call() for coroutine functions, e.g. aiohttp's session.get. A response
+        that is retried is released before the next attempt.
+        """
+        bucket = self._bucket(endpoint)
+
+        for attempt in range(self.max_retries + 1):
+            waited = await bucket.acquire_async(priority)
+            self.telemetry.record(f"{endpoint}.rate_wait", waited, priority=priority)
+            self._count(endpoint, "calls")
+
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                retry = self._should_retry(attempt, error=e)
+                if retry is None:
+                    raise
+            else:
+                retry = self._should_retry(attempt, result)
+                if retry is None:
+                    return result
+                if hasattr(result, "release"):
+                    result.release()
+
+            await asyncio.sleep(self._retry_delay(endpoint, bucket, attempt, *retry))
+
+
+_default_scheduler: Optional[RequestScheduler] = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Process-wide scheduler shared by every media tool"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
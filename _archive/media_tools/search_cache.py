@@ -0,0 +1,72 @@
+"""
+Tenor Search Cache for DuBuBu.com
+Persists Tenor search responses on disk with a TTL and ETag, so repeated
+catalog builds don't burn API quota re-running the same queries
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+DEFAULT_TTL = 24 * 60 * 60  # 1 day
+
+
+class SearchCache:
+    """
+    One JSON file per (query, limit, media_filter, pos):
+
+        {"stored_at": ..., "etag": ..., "data": <raw Tenor response>}
+
+    Entries younger than ttl are served without a request. Older entries
+    are kept so their ETag can be revalidated with If-None-Match.
+    """
+
+    def __init__(self, cache_dir: str = ".tenor_cache", ttl: float = DEFAULT_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(query: str, limit: int, media_filter: str, pos: Optional[str] = None) -> str:
+        payload = json.dumps([query, limit, media_filter, pos or ""], separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Tuple[Optional[Dict], bool, Optional[str]]:
+        """Returns (data, is_fresh, etag); data is None on a miss"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None, False, None
+
+        fresh = time.time() - entry.get("stored_at", 0) <= self.ttl
+        return entry.get("data"), fresh, entry.get("etag")
+
+    def put(self, key: str, data: Dict, etag: Optional[str] = None) -> None:
+        """Store a response, replacing the file atomically"""
+        path = self._path(key)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": time.time(), "etag": etag, "data": data}, f)
+        os.replace(tmp_path, path)
+
+    def touch(self, key: str) -> None:
+        """Mark a revalidated (304) entry as fresh again"""
+        data, _, etag = self.get(key)
+        if data is not None:
+            self.put(key, data, etag)
+
+    def clear(self) -> None:
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
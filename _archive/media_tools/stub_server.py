@@ -0,0 +1,298 @@
+"""
+Local fal.ai / Tenor Stand-in for DuBuBu.com
+An in-process HTTP server that imitates fal's queue API and Tenor's search
+and media endpoints, with configurable latency, error rate and payload
+sizes, so the media tools can be exercised without network access or keys
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class StubServer:
+    """
+    Endpoints (all under http://127.0.0.1:<port>):
+
+        POST /fal/run?model=M              synchronous generation (subscribe)
+        POST /fal/queue?model=M            enqueue, returns {"request_id": ...}
+        GET  /fal/requests/<id>/status     {"status": "IN_QUEUE" | "COMPLETED"}
+        GET  /fal/requests/<id>            result once completed
+        GET  /tenor/v2/search?q=&limit=&pos=
+        GET  /media/<name>                 image_bytes / gif_bytes of filler
+
+    latency (+ up to jitter) delays every response; inference is how long
+    a fal job takes. error_rate of fal and Tenor search requests (not media)
+    fail with a 503, or a 429 with Retry-After: 0 for every other injected
+    failure. The random source is seeded, so a scenario's failure pattern
+    is repeatable.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.02,
+        jitter: float = 0.0,
+        inference: float = 0.5,
+        error_rate: float = 0.0,
+        image_bytes: int = 200_000,
+        gif_bytes: int = 500_000,
+        results_per_query: int = 50,
+        seed: int = 0,
+        port: int = 0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.inference = inference
+        self.error_rate = error_rate
+        self.results_per_query = results_per_query
+        self.payloads = {
+            "image": b"\x89PNG\r\n\x1a\n" + bytes(max(0, image_bytes - 8)),
+            "gif": b"GIF89a" + bytes(max(0, gif_bytes - 6)),
+        }
+        self.jobs: Dict[str, Dict] = {}
+        self.stats = {"requests": 0, "errors": 0, "bytes_sent": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ----- behaviour -----
+
+    def _roll(self, api: bool):
+        """(delay, injected failure status or None) for one request"""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            if not api or self._random.random() >= self.error_rate:
+                return delay, None
+            self.stats["errors"] += 1
+            return delay, 429 if self.stats["errors"] % 2 == 0 else 503
+
+    def _images(self, request_id: str, arguments: Dict) -> Dict:
+        width, height = {
+            "landscape_16_9": (1344, 768),
+            "landscape_4_3": (1152, 896),
+            "portrait_4_3": (896, 1152),
+        }.get(arguments.get("image_size"), (1024, 1024))
+        return {
+            "images": [
+                {"url": f"{self.url}/media/{request_id}_{i}.png", "width": width, "height": height}
+                for i in range(arguments.get("num_images", 1))
+            ],
+            "seed": arguments.get("seed", 0),
+        }
+
+    def _search(self, query: Dict) -> Dict:
+        q = query.get("q", [""])[0]
+        limit = int(query.get("limit", ["20"])[0])
+        start = int(query.get("pos", ["0"])[0] or 0)
+        end = min(start + limit, self.results_per_query)
+        slug = "-".join(q.split()) or "gif"
+
+        results = []
+        for n in range(start, end):
+            gif_id = f"{slug}-{n}"
+            results.append({
+                "id": gif_id,
+                "title": f"{q} {n}",
+                "media_formats": {
+                    "gif": {"url": f"{self.url}/media/{gif_id}/{slug}.gif"},
+                    "webp": {"url": f"{self.url}/media/{gif_id}/{slug}.webp"},
+                    "tinygif": {"url": f"{self.url}/media/{gif_id}/{slug}-tiny.gif"},
+                },
+            })
+        return {"results": results, "next": str(end) if end < self.results_per_query else ""}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.stats["bytes_sent"] += len(body)
+
+            def _json(self, data: Dict, status: int = 200, headers=None):
+                self._send(status, json.dumps(data).encode(), headers=headers)
+
+            def _begin(self, api: bool = True) -> bool:
+                delay, failure = server._roll(api)
+                time.sleep(delay)
+                if failure:
+                    self._json({"detail": "injected failure"}, failure, {"Retry-After": "0"} if failure == 429 else None)
+                    return False
+                return True
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                arguments = json.loads(self.rfile.read(length) or b"{}")
+                if not self._begin():
+                    return
+
+                request_id = uuid.uuid4().hex
+                if parsed.path == "/fal/run":
+                    time.sleep(server.inference)
+                    self._json(server._images(request_id, arguments))
+                elif parsed.path == "/fal/queue":
+                    with server._lock:
+                        server.jobs[request_id] = {"arguments": arguments, "ready_at": time.monotonic() + server.inference}
+                    self._json({"request_id": request_id})
+                else:
+                    self._json({"detail": "not found"}, 404)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                parts = parsed.path.strip("/").split("/")
+                if not self._begin(api=parts[0] != "media"):
+                    return
+
+                if parsed.path == "/tenor/v2/search":
+                    data = server._search(parse_qs(parsed.query))
+                    etag = f'"{uuid.uuid5(uuid.NAMESPACE_URL, self.path).hex}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self._send(304, headers={"ETag": etag})
+                    else:
+                        self._json(data, headers={"ETag": etag})
+                elif parts[0] == "media":
+                    kind = "image" if parsed.path.endswith(".png") else "gif"
+                    content_type = "image/png" if kind == "image" else "image/gif"
+                    self._send(200, server.payloads[kind], content_type)
+                elif parts[:2] == ["fal", "requests"] and len(parts) >= 3:
+                    job = server.jobs.get(parts[2])
+                    if job is None:
+                        self._json({"detail": "unknown request"}, 404)
+                    elif parts[3:] == ["status"]:
+                        done = time.monotonic() >= job["ready_at"]
+                        self._json({"status": "COMPLETED" if done else "IN_QUEUE"})
+                    else:
+                        self._json(server._images(parts[2], job["arguments"]))
+                else:
+                    self._json({"detail": "not found"}, 404)
+
+        return Handler
+
+
+class StubFalError(Exception):
+    """HTTP error from the stand-in, shaped like fal_client's (status_code, response_headers)"""
+
+    def __init__(self, response):
+        super().__init__(f"{response.status_code}: {response.text[:200]}")
+        self.status_code = response.status_code
+        self.response_headers = dict(response.headers)
+
+
+class StubFalClient:
+    """
+    Drop-in for the fal_client module (subscribe/submit/status/result and
+    the Completed status type) that talks to a StubServer over HTTP.
+    Pass it as DuBuBuImageGenerator(client=StubFalClient(server.url)).
+    """
+
+    class Completed:
+        pass
+
+    class Queued:
+        pass
+
+    class _Handle:
+        def __init__(self, request_id: str):
+            self.request_id = request_id
+
+    def __init__(self, base_url: str):
+        import requests
+
+        self.base_url = f"{base_url}/fal"
+        self.session = requests.Session()
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict:
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=60, **kwargs)
+        if response.status_code != 200:
+            raise StubFalError(response)
+        return response.json()
+
+    def subscribe(self, model: str, arguments: Dict, with_logs: bool = False) -> Dict:
+        return self._request("POST", "/run", params={"model": model}, json=arguments)
+
+    def submit(self, model: str, arguments: Dict) -> "_Handle":
+        return self._Handle(self._request("POST", "/queue", params={"model": model}, json=arguments)["request_id"])
+
+    def status(self, model: str, request_id: str, with_logs: bool = False):
+        data = self._request("GET", f"/requests/{request_id}/status")
+        return self.Completed() if data["status"] == "COMPLETED" else self.Queued()
+
+    def result(self, model: str, request_id: str) -> Dict:
+        return self._request("GET", f"/requests/{request_id}")
+
+
+def main(argv=None):
+    """Command-line interface: serve the stand-in until interrupted"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the local fal.ai/Tenor stand-in")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency, up to this many seconds')
+    parser.add_argument('--inference', type=float, default=0.5, help='Seconds a fal job takes')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 429/503')
+    parser.add_argument('--image-bytes', type=int, default=200_000, help='Size of generated images')
+    parser.add_argument('--gif-bytes', type=int, default=500_000, help='Size of Tenor media')
+    args = parser.parse_args(argv)
+
+    server = StubServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        inference=args.inference,
+        error_rate=args.error_rate,
+        image_bytes=args.image_bytes,
+        gif_bytes=args.gif_bytes,
+        port=args.port
+    )
+    print(f"🧪 Stand-in listening on {server.url}")
+    print(f"   TENOR_BASE_URL={server.url}/tenor/v2")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Run Telemetry for DuBuBu.com
+Lightweight spans and counters for the media tools. Every span and counter
+is appended to a JSON Lines trace, and summary() reports p50/p95 latency
+per stage so concurrency and caching can be tuned from real runs
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+
+# Most recent spans per stage kept for percentiles, so a long-running
+# process (e.g. the worker) records in constant memory
+DEFAULT_WINDOW = 10_000
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _stage_summary(durations: List[float], errors: int, totals: Optional[List[float]] = None) -> Dict:
+    """totals ([count, total seconds, max]) covers every span when durations is only a recent window"""
+    count, total, longest = totals or (len(durations), sum(durations), max(durations, default=0.0))
+    return {
+        "count": int(count),
+        "errors": errors,
+        "total": round(total, 4),
+        "p50": round(percentile(durations, 50), 4),
+        "p95": round(percentile(durations, 95), 4),
+        "max": round(longest, 4),
+    }
+
+
+class Telemetry:
+    """
+    Collects timed spans per stage and named counters.
+
+        telemetry = get_telemetry()
+        with telemetry.task("social:3f2a..."):
+            with telemetry.span("fal.inference", model=model):
+                ...
+            telemetry.count("download.bytes", 51234)
+
+    Spans and counters are tagged with the thread's current task. Recording
+    is always on and costs a lock and a list append; the trace file is only
+    written once open_trace() has been called (or DUBUBU_TRACE is set).
+    Percentiles cover the last `window` spans of each stage; counts, totals
+    and maxima cover every span.
+    """
+
+    def __init__(self, trace_path: Optional[str] = None, window: int = DEFAULT_WINDOW):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._durations: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+        self._errors: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, float] = defaultdict(float)
+        self._trace = None
+        self.trace_path: Optional[str] = None
+        if trace_path:
+            self.open_trace(trace_path)
+
+    # ----- trace file -----
+
+    def open_trace(self, path: str) -> None:
+        """Append every following span and counter to path as JSON Lines"""
+        with self._lock:
+            if self._trace:
+                self._trace.close()
+            self._trace = open(path, "a", buffering=1)
+            self.trace_path = path
+
+    def close(self) -> None:
+        with self._lock:
+            if self._trace:
+                self._trace.close()
+                self._trace = None
+
+    def _emit(self, event: Dict) -> None:
+        if self._trace is None:
+            return
+        line = json.dumps(event, default=str)
+        with self._lock:
+            if self._trace:
+                self._trace.write(line + "\n")
+
+    # ----- task context -----
+
+    def current_task(self) -> Optional[str]:
+        stack = getattr(self._local, "tasks", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def task(self, task_id: Optional[str]) -> Iterator[None]:
+        """Tag spans and counters recorded on this thread with task_id"""
+        stack = self._local.__dict__.setdefault("tasks", [])
+        stack.append(task_id)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def bind(self, fn: Callable) -> Callable:
+        """Wrap fn so it runs under the caller's task when handed to a pool thread"""
+        task_id = self.current_task()
+
+        def run(*args, **kwargs):
+            with self.task(task_id):
+                return fn(*args, **kwargs)
+
+        return run
+
+    # ----- recording -----
+
+    @contextmanager
+    def span(self, stage: str, **attrs) -> Iterator[Dict]:
+        """
+        Time the block as one span of stage. The yielded dict is recorded
+        with the span, so the block can add attributes (bytes, status...)
+        or set "ok" to False. An exception marks the span as failed and is
+        re-raised.
+        """
+        started = time.time()
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield attrs
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            ok = attrs.pop("ok", True) and ok
+            self.record(stage, time.perf_counter() - start, ok=ok, start=started, **attrs)
+
+    def record(self, stage: str, seconds: float, ok: bool = True, start: Optional[float] = None, **attrs) -> None:
+        """Record a span measured elsewhere (e.g. queue wait from timestamps)"""
+        with self._lock:
+            self._durations[stage].append(seconds)
+            totals = self._totals[stage]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+            if not ok:
+                self._errors[stage] += 1
+
+        self._emit({
+            **attrs,
+            "type": "span",
+            "stage": stage,
+            "task": attrs.get("task", self.current_task()),
+            "start": round(start if start is not None else time.time() - seconds, 6),
+            "duration": round(seconds, 6),
+            "ok": ok,
+        })
+
+    def count(self, name: str, value: float = 1, **attrs) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+        self._emit({
+            **attrs,
+            "type": "counter",
+            "name": name,
+            "value": value,
+            "task": attrs.get("task", self.current_task()),
+            "time": round(time.time(), 6),
+        })
+
+    # ----- reporting -----
+
+    def summary(self) -> Dict:
+        """{"stages": {stage: count/errors/total/p50/p95/max}, "counters": {...}}"""
+        with self._lock:
+            stages = {
+                stage: _stage_summary(list(d), self._errors[stage], self._totals[stage])
+                for stage, d in self._durations.items()
+            }
+            counters = dict(self.counters)
+        return {"stages": dict(sorted(stages.items())), "counters": dict(sorted(counters.items()))}
+
+    def write_summary(self) -> Dict:
+        """Append the summary to the trace as a final {"type": "summary"} line"""
+        summary = self.summary()
+        self._emit({"type": "summary", "time": round(time.time(), 6), **summary})
+        return summary
+
+    def reset(self) -> None:
+        with self._lock:
+            self._durations.clear()
+            self._totals.clear()
+            self._errors.clear()
+            self.counters.clear()
+
+
+def summarize_trace(paths: Iterable[str]) -> Dict:
+    """
+    Summary built from trace files rather than memory, so spans written by
+    worker processes (or several runs) are included.
+    """
+    durations: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    counters: Dict[str, float] = defaultdict(float)
+
+    for path in paths:
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("type") == "span":
+                    durations[event["stage"]].append(event["duration"])
+                    if not event.get("ok", True):
+                        errors[event["stage"]] += 1
+                elif event.get("type") == "counter":
+                    counters[event["name"]] += event["value"]
+
+    stages = {stage: _stage_summary(d, errors[stage]) for stage, d in durations.items()}
+    return {"stages": dict(sorted(stages.items())), "counters": dict(sorted(counters.items()))}
+
+
+def print_summary(summary: Dict) -> None:
+    """Per-stage latency table followed by counter totals"""
+    if summary["stages"]:
+        print(f"\n⏱️  {'stage':<24}{'count':>7}{'errors':>8}{'p50 s':>10}{'p95 s':>10}{'max s':>10}{'total s':>10}")
+        for stage, s in summary["stages"].items():
+            print(f"   {stage:<24}{s['count']:>7}{s['errors']:>8}{s['p50']:>10.3f}{s['p95']:>10.3f}"
+                  f"{s['max']:>10.3f}{s['total']:>10.2f}")
+    if summary["counters"]:
+        print("\n📊 Counters:")
+        for name, value in summary["counters"].items():
+            shown = f"{value / 1024:.0f} KB" if name.endswith(".bytes") else f"{value:g}"
+            print(f"   {name:<24}{shown:>14}")
+
+
+_default_telemetry: Optional[Telemetry] = None
+_default_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """Process-wide telemetry shared by every media tool (traces to $DUBUBU_TRACE if set)"""
+    global _default_telemetry
+    with _default_lock:
+        if _default_telemetry is None:
+            _default_telemetry = Telemetry(os.getenv("DUBUBU_TRACE"))
+        return _default_telemetry
+
+
+def main(argv=None):
+    """Command-line interface: summarize trace files"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize media tool trace files")
+    parser.add_argument('traces', nargs='+', help='JSON Lines trace files')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    args = parser.parse_args(argv)
+
+    summary = summarize_trace(args.traces)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
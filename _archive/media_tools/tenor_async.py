@@ -0,0 +1,260 @@
+"""
+Async Tenor Fetcher for DuBuBu.com
+Fans out all catalog searches at once and bulk-downloads GIF renditions
+over one shared aiohttp connection pool
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .search_cache import SearchCache
+from . import config
+from .catalog_store import DEFAULT_STORE, CatalogStore
+from .presets import CATALOG_CATEGORIES
+from .scheduler import BATCH, get_scheduler
+from .tenor_fetcher import MEDIA_FILTER, TenorFetcher
+
+
+# Renditions downloaded for each catalog entry (keys from TenorFetcher._extract_urls)
+DEFAULT_RENDITIONS = ("gif", "webp", "tiny_gif")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AsyncTenorFetcher:
+    """
+    asyncio counterpart of TenorFetcher.
+
+    Use as an async context manager so the connection pool is shared by every
+    search and download and closed afterwards:
+
+        async with AsyncTenorFetcher(concurrency=8) as fetcher:
+            catalog = await fetcher.fetch_catalog()
+            report = await fetcher.download_catalog(catalog, "gifs")
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        concurrency: int = 8,
+        base_url: Optional[str] = None,
+        timeout: float = 60.0,
+        cache: Optional[SearchCache] = None,
+        use_cache: bool = True,
+        priority: int = BATCH
+    ):
+        self.api_key = api_key or config.tenor_api_key()
+        self.cache = (cache or SearchCache()) if use_cache else None
+        self.base_url = base_url or config.tenor_base_url()
+        self.concurrency = concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Searches and downloads share the rate limiter / retry scheduler
+        # (and its token buckets) with the threaded tools
+        self.scheduler = get_scheduler()
+        self.priority = priority
+
+        if not self.api_key:
+            print("Warning: TENOR_API_KEY not set. Using direct URLs instead.")
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+
+    async def search_gifs(self, query: str, limit: int = 20) -> list:
+        """Search for GIFs on Tenor"""
+        if not self.api_key:
+            return []
+
+        key = SearchCache.make_key(query, limit, MEDIA_FILTER)
+        cached, fresh, etag = self.cache.get(key) if self.cache else (None, False, None)
+        if cached is not None and fresh:
+            return TenorFetcher._extract_urls(cached.get("results", []))
+
+        params = {
+            "key": self.api_key,
+            "q": query,
+            "limit": limit,
+            "media_filter": MEDIA_FILTER
+        }
+        headers = {"If-None-Match": etag} if cached is not None and etag else {}
+
+        async with self._semaphore:
+            try:
+                response = await self.scheduler.call_async(
+                    "tenor", self.session.get, f"{self.base_url}/search",
+                    params=params, headers=headers, priority=self.priority
+                )
+                async with response:
+                    if response.status == 304 and cached is not None:
+                        self.cache.touch(key)
+                        data = cached
+                    elif response.status != 200:
+                        print(f"Error: {response.status}")
+                        return []
+                    else:
+                        data = await response.json()
+                        if self.cache:
+                            self.cache.put(key, data, response.headers.get("ETag"))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Search error for '{query}': {e}")
+                return []
+
+        return TenorFetcher._extract_urls(data.get("results", []))
+
+    async def get_bubu_dudu_gifs(self, category: Optional[str] = None, limit: int = 20) -> list:
+        """Get Bubu Dudu GIFs by category"""
+        query = "bubu dudu"
+        if category:
+            query = f"bubu dudu {category}"
+        return await self.search_gifs(query, limit)
+
+    async def fetch_catalog(
+        self,
+        categories: Iterable[str] = CATALOG_CATEGORIES,
+        limit: int = 10
+    ) -> Dict[str, list]:
+        """Search every category concurrently"""
+        categories = list(categories)
+        print(f"Fetching {len(categories)} categories concurrently...")
+        results = await asyncio.gather(*(self.get_bubu_dudu_gifs(c, limit) for c in categories))
+        return dict(zip(categories, results))
+
+    async def download(self, url: str, save_path: str) -> Dict:
+        """Stream one file to disk; returns a report instead of raising"""
+        report = {"url": url, "path": str(save_path), "ok": False, "bytes": 0, "error": None}
+        path = Path(save_path)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+
+        async with self._semaphore:
+            try:
+                response = await self.scheduler.call_async("tenor_media", self.session.get, url, priority=self.priority)
+                async with response:
+                    if response.status != 200:
+                        report["error"] = f"HTTP {response.status}"
+                        return report
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(tmp_path, "wb") as f:
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            f.write(chunk)
+                            report["bytes"] += len(chunk)
+                os.replace(tmp_path, path)
+                report["ok"] = True
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                report["error"] = f"{type(e).__name__}: {e}"
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+
+        return report
+
+    async def download_catalog(
+        self,
+        catalog: Dict[str, list],
+        output_dir: str = "gifs",
+        renditions: Iterable[str] = DEFAULT_RENDITIONS
+    ) -> List[Dict]:
+        """
+        Download the selected renditions of every catalog entry to
+        <output_dir>/<category>/<id>_<rendition>.<ext>, with bounded concurrency.
+        """
+        jobs = []
+        for category, gifs in catalog.items():
+            for gif in gifs:
+                for rendition in renditions:
+                    url = gif.get(rendition)
+                    if not url:
+                        continue
+                    ext = Path(urlparse(url).path).suffix or ".gif"
+                    save_path = Path(output_dir) / category / f"{gif.get('id')}_{rendition}{ext}"
+                    jobs.append((category, gif.get("id"), rendition, url, save_path))
+
+        total = len(jobs)
+        done = 0
+
+        async def run(category, gif_id, rendition, url, save_path):
+            nonlocal done
+            report = await self.download(url, save_path)
+            report.update({"category": category, "id": gif_id, "rendition": rendition})
+            done += 1
+            status = "✓" if report["ok"] else f"✗ {report['error']}"
+            print(f"[{done}/{total}] {category}/{gif_id} {rendition} {status}")
+            return report
+
+        return await asyncio.gather(*(run(*job) for job in jobs))
+
+
+async def build_catalog(
+    output_file: str = "gif_catalog.json",
+    download_dir: Optional[str] = None,
+    concurrency: int = 8,
+    limit: int = 10,
+    store: Optional[str] = DEFAULT_STORE
+) -> Dict:
+    """
+    Fetch the catalog concurrently, save it (to output_file, and to the
+    catalog store unless store is None), and optionally download all media
+    """
+    async with AsyncTenorFetcher(concurrency=concurrency) as fetcher:
+        catalog = await fetcher.fetch_catalog(limit=limit)
+
+        with open(output_file, 'w') as f:
+            json.dump(catalog, f, indent=2)
+        print(f"Catalog saved to {output_file}")
+
+        if store:
+            catalog_store = CatalogStore(store)
+            for category, gifs in catalog.items():
+                catalog_store.add_gifs(category, gifs)
+            catalog_store.close()
+
+        report = []
+        if download_dir:
+            report = await fetcher.download_catalog(catalog, download_dir)
+            report_file = Path(download_dir) / "download_report.json"
+            report_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(report_file, 'w') as f:
+                json.dump(report, f, indent=2)
+
+            ok = sum(1 for r in report if r["ok"])
+            print(f"✅ Downloaded {ok}/{len(report)} files ({sum(r['bytes'] for r in report) / 1024:.0f} KB)")
+            print(f"📄 Report saved: {report_file}")
+
+    return {"catalog": catalog, "downloads": report}
+
+
+def main(argv=None):
+    """Command-line interface: build (and optionally download) the GIF catalog"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the Bubu Dudu GIF catalog concurrently")
+    parser.add_argument('--output', '-o', default='gif_catalog.json', help='Catalog JSON file')
+    parser.add_argument('--download', metavar='DIR', help='Also download gif/webp/tinygif renditions to DIR')
+    parser.add_argument('--concurrency', '-c', type=int, default=8, help='Maximum requests in flight')
+    parser.add_argument('--limit', type=int, default=10, help='Results per category')
+    parser.add_argument('--store', default=DEFAULT_STORE, metavar='SQLITE',
+                        help=f"Catalog store to update as well (default: {DEFAULT_STORE})")
+    parser.add_argument('--no-store', action='store_true', help='Only write the catalog JSON')
+    args = parser.parse_args(argv)
+
+    store = None if args.no_store else args.store
+    asyncio.run(build_catalog(args.output, args.download, args.concurrency, args.limit, store))
+
+
+if __name__ == "__main__":
+    main()
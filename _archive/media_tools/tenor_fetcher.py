@@ -3,45 +3,136 @@ Tenor GIF Fetcher for DuBuBu.com
 Fetches Bubu Dudu GIFs from Tenor API
 """
 
-import os
-import requests
 import json
-from pathlib import Path
-from dotenv import load_dotenv
+from typing import Iterator, Optional, Tuple
 
-load_dotenv('.env.local')
+from . import config
+from .catalog_store import DEFAULT_STORE, CatalogStore
+from .downloader import ImageDownloader
+# get_preset_gif and PRESET_GIFS are re-exported for existing callers
+from .presets import CATALOG_CATEGORIES, PRESET_GIFS, get_preset_gif  # noqa: F401
+from .scheduler import INTERACTIVE, get_scheduler
+from .search_cache import SearchCache
+from .telemetry import get_telemetry
 
-TENOR_API_KEY = os.getenv('TENOR_API_KEY')
-BASE_URL = "https://tenor.googleapis.com/v2"
+MEDIA_FILTER = "gif,tinygif,webp"
 
 class TenorFetcher:
-    def __init__(self):
-        self.api_key = TENOR_API_KEY
+    def __init__(
+        self,
+        cache: Optional[SearchCache] = None,
+        use_cache: bool = True,
+        priority: int = INTERACTIVE,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None
+    ):
+        import requests
+        
+        self.api_key = api_key or config.tenor_api_key()
+        self.base_url = base_url or config.tenor_base_url()
         if not self.api_key:
             print("Warning: TENOR_API_KEY not set. Using direct URLs instead.")
+        
+        # Disk cache of raw search responses (TTL + ETag revalidation)
+        self.cache = (cache or SearchCache()) if use_cache else None
+        self.session = requests.Session()
+        
+        # GIF downloads stream to a .part file with a timeout (see downloader.py)
+        self.downloader = ImageDownloader(stage="tenor.download")
+        
+        # Searches go through the shared rate limiter / retry scheduler
+        self.scheduler = get_scheduler()
+        self.priority = priority
+        self.telemetry = get_telemetry()
     
-    def search_gifs(self, query: str, limit: int = 20) -> list:
+    def search_gifs(self, query: str, limit: int = 20, pos: Optional[str] = None) -> list:
         """Search for GIFs on Tenor"""
+        gifs, _ = self.search_page(query, limit, pos)
+        return gifs
+    
+    def search_page(self, query: str, limit: int = 20, pos: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """
+        Fetch one page of search results.
+        
+        Returns (gifs, next_pos); next_pos is None on the last page.
+        """
         if not self.api_key:
-            return []
+            return [], None
+        
+        data = self._search_raw(query, limit, pos)
+        if data is None:
+            return [], None
+        
+        return self._extract_urls(data.get("results", [])), data.get("next") or None
+    
+    def iter_search(self, query: str, page_size: int = 20, max_results: Optional[int] = None) -> Iterator[dict]:
+        """
+        Lazily yield search results, following Tenor's `next` cursor one page
+        at a time so large result sets never have to be held in memory.
+        """
+        pos = None
+        yielded = 0
+        
+        while True:
+            gifs, pos = self.search_page(query, page_size, pos)
+            for gif in gifs:
+                if max_results is not None and yielded >= max_results:
+                    return
+                yield gif
+                yielded += 1
+            if not gifs or not pos:
+                return
+    
+    def _search_raw(self, query: str, limit: int, pos: Optional[str]) -> Optional[dict]:
+        """Raw search response, served from the cache while it is fresh"""
+        key = SearchCache.make_key(query, limit, MEDIA_FILTER, pos)
+        cached, fresh, etag = self.cache.get(key) if self.cache else (None, False, None)
+        if cached is not None and fresh:
+            self.telemetry.count("tenor.cache_hit")
+            return cached
+        self.telemetry.count("tenor.cache_miss")
         
         params = {
             "key": self.api_key,
             "q": query,
             "limit": limit,
-            "media_filter": "gif,tinygif,webp"
+            "media_filter": MEDIA_FILTER
         }
+        if pos:
+            params["pos"] = pos
         
-        response = requests.get(f"{BASE_URL}/search", params=params)
+        headers = {"If-None-Match": etag} if cached is not None and etag else {}
+        import requests
+        try:
+            with self.telemetry.span("tenor.search", query=query) as span:
+                response = self.scheduler.call(
+                    "tenor",
+                    self.session.get,
+                    f"{self.base_url}/search",
+                    params=params,
+                    headers=headers,
+                    priority=self.priority
+                )
+                span["status"] = response.status_code
+        except requests.RequestException as e:
+            print(f"Error: {e}")
+            return None
         
+        if response.status_code == 304 and cached is not None:
+            self.telemetry.count("tenor.revalidated")
+            self.cache.touch(key)
+            return cached
         if response.status_code == 200:
             data = response.json()
-            return self._extract_urls(data.get("results", []))
-        else:
-            print(f"Error: {response.status_code}")
-            return []
+            if self.cache:
+                self.cache.put(key, data, response.headers.get("ETag"))
+            return data
+        
+        print(f"Error: {response.status_code}")
+        return None
     
-    def _extract_urls(self, results: list) -> list:
+    @staticmethod
+    def _extract_urls(results: list) -> list:
         """Extract GIF URLs from API results"""
         gifs = []
         for result in results:
@@ -66,26 +157,20 @@ class TenorFetcher:
     
     def download_gif(self, url: str, save_path: str) -> bool:
         """Download a GIF to local storage"""
-        try:
-            response = requests.get(url, stream=True)
-            if response.status_code == 200:
-                Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-                with open(save_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                return True
-        except Exception as e:
-            print(f"Download error: {e}")
-        return False
+        return self.downloader.download(url, save_path) is not None
     
-    def save_gif_catalog(self, output_file: str = "gif_catalog.json"):
-        """Save a catalog of all Bubu Dudu GIFs"""
-        categories = ["love", "kiss", "hug", "sleep", "cute", "dance", "fighting"]
+    def save_gif_catalog(self, output_file: str = "gif_catalog.json", store=None):
+        """
+        Save a catalog of all Bubu Dudu GIFs. With store (a CatalogStore),
+        each category is also written to it as soon as it is fetched.
+        """
         catalog = {}
         
-        for category in categories:
+        for category in CATALOG_CATEGORIES:
             print(f"Fetching {category} GIFs...")
             catalog[category] = self.get_bubu_dudu_gifs(category, limit=10)
+            if store:
+                store.add_gifs(category, catalog[category])
         
         with open(output_file, 'w') as f:
             json.dump(catalog, f, indent=2)
@@ -94,49 +179,27 @@ class TenorFetcher:
         return catalog
 
 
-# Hardcoded GIF URLs (no API key required)
-PRESET_GIFS = {
-    "love": [
-        "https://media.tenor.com/y_v4FLiKK3cAAAAM/kiss-me-through-the-phone-miss-you.gif",
-        "https://media.tenor.com/vJRHkcdlEQQAAAAm/casal-dudu.webp",
-        "https://media.tenor.com/JcPATwwdUOQAAAAm/bubu-dudu-sseeyall.webp",
-        "https://media.tenor.com/90xN7I6NjecAAAAm/bubu-dudu-sseeyall.webp",
-    ],
-    "hug": [
-        "https://media.tenor.com/pN7xf12qQcwAAAAM/cuddle-cute.gif",
-        "https://media.tenor.com/skrULsl5twcAAAAm/bubududukiwi-twitter.webp",
-        "https://media.tenor.com/vzkveVGDzmAAAAAm/dudu-hug-bubu-dudu-kiss.webp",
-    ],
-    "sleep": [
-        "https://media.tenor.com/cI9KcgiXQUkAAAAm/sseeyall-bubu-dudu.webp",
-        "https://media.tenor.com/oPHqTKxUDo4AAAAm/bubu-dudu-sleep-funny-bubu-dudu-love.webp",
-        "https://media.tenor.com/qQNt-BqDtE8AAAAm/bubu-fun-sleep-bubu-dudu-love.webp",
-    ],
-    "cute": [
-        "https://media.tenor.com/BvlQdl0TAeIAAAAm/cute.webp",
-        "https://media.tenor.com/cwNYjFIdTZ4AAAAm/bubu-cute-bubu-dudu.webp",
-        "https://media.tenor.com/eEf0j_M3z9wAAAAm/bubu-dudu-sseeyall.webp",
-    ],
-    "fun": [
-        "https://media.tenor.com/HOLG_hTN8WsAAAAm/bubu-jumping-on-dudu-happy.webp",
-        "https://media.tenor.com/27dQ8ddrv3AAAAAm/wee.webp",
-        "https://media.tenor.com/arLtVbLvu10AAAAm/bubu-dudu-sseeyall.webp",
-    ]
-}
-
-def get_preset_gif(category: str, index: int = 0) -> str:
-    """Get a preset GIF URL without API"""
-    gifs = PRESET_GIFS.get(category, PRESET_GIFS["cute"])
-    return gifs[index % len(gifs)]
-
-
-if __name__ == "__main__":
-    # Example usage
+def main(argv=None):
+    """Command-line interface: search one category, or list the presets without an API key"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Fetch Bubu Dudu GIFs from Tenor")
+    parser.add_argument('category', nargs='?', default='love', help='Category to search (default: love)')
+    parser.add_argument('--limit', '-n', type=int, default=5, help='Number of results')
+    parser.add_argument('--catalog', metavar='FILE', help='Save the full catalog of every category to FILE')
+    parser.add_argument('--store', default=DEFAULT_STORE, metavar='SQLITE',
+                        help=f"Catalog store --catalog also updates (default: {DEFAULT_STORE})")
+    args = parser.parse_args(argv)
+    
     fetcher = TenorFetcher()
     
     # If API key available, fetch from API
-    if TENOR_API_KEY:
-        gifs = fetcher.get_bubu_dudu_gifs("love", limit=5)
+    if fetcher.api_key and args.catalog:
+        store = CatalogStore(args.store)
+        fetcher.save_gif_catalog(args.catalog, store)
+        store.close()
+    elif fetcher.api_key:
+        gifs = fetcher.get_bubu_dudu_gifs(args.category, limit=args.limit)
         for gif in gifs:
             print(f"Title: {gif['title']}")
             print(f"URL: {gif['gif']}")
@@ -148,3 +211,7 @@ if __name__ == "__main__":
             print(f"\n{category.upper()}:")
             for url in urls:
                 print(f"  {url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+GIF Transcoder for DuBuBu.com
+Converts downloaded Tenor animations to animated WebP and H.264 MP4 / VP9
+WebM at capped dimensions and frame rates, and reports the size and
+duration of every rendition so the smallest one can ship per slot
+"""
+
+import json
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from PIL import Image, ImageSequence
+
+from .presets import PRESET_GIFS
+from .tenor_fetcher import TenorFetcher
+
+
+DEFAULT_MAX_WIDTH = 480
+DEFAULT_MAX_FPS = 15
+
+WEBP_QUALITY = 75
+MP4_CRF = 28
+WEBM_CRF = 38
+
+REPORT_FILE = "transcode_report.json"
+
+
+def probe_animation(path: Path) -> Dict:
+    """Dimensions, frame count, duration (seconds) and average frame rate of a GIF/WebP"""
+    with Image.open(path) as img:
+        frames = 0
+        duration_ms = 0
+        for frame in ImageSequence.Iterator(img):
+            frames += 1
+            duration_ms += frame.info.get("duration", 100) or 100
+        return {
+            "width": img.width,
+            "height": img.height,
+            "frames": frames,
+            "duration": round(duration_ms / 1000, 3),
+            "fps": round(frames * 1000 / duration_ms, 3) if duration_ms else 0.0,
+        }
+
+
+def _probe_video(path: Path) -> Dict:
+    """Duration and dimensions of an encoded video via ffprobe"""
+    if not shutil.which("ffprobe"):
+        return {}
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "stream=width,height:format=duration",
+            "-of", "json", str(path),
+        ],
+        capture_output=True, text=True
+    )
+    try:
+        data = json.loads(result.stdout)
+        stream = data["streams"][0]
+        return {
+            "width": stream["width"],
+            "height": stream["height"],
+            "duration": round(float(data["format"]["duration"]), 3),
+        }
+    except (ValueError, KeyError, IndexError):
+        return {}
+
+
+def to_webp(source: Path, dest: Path, max_width: int, max_fps: int) -> Dict:
+    """
+    Animated WebP with frames resized to max_width and dropped to max_fps.
+    Dropped frames' display time is folded into the previous kept frame so
+    the total duration is unchanged.
+    """
+    min_interval = 1000 / max_fps
+    frames: List[Image.Image] = []
+    durations: List[int] = []
+    next_slot = 0.0
+    clock = 0.0
+
+    with Image.open(source) as img:
+        scale = min(1.0, max_width / img.width)
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+
+        for frame in ImageSequence.Iterator(img):
+            duration = frame.info.get("duration", 100) or 100
+            if clock >= next_slot or not frames:
+                frames.append(frame.convert("RGBA").resize(size, Image.Resampling.LANCZOS))
+                durations.append(duration)
+                next_slot = clock + min_interval
+            else:
+                durations[-1] += duration
+            clock += duration
+
+    frames[0].save(
+        dest,
+        format="WEBP",
+        save_all=True,
+        append_images=frames[1:],
+        duration=durations,
+        loop=0,
+        quality=WEBP_QUALITY,
+        method=4
+    )
+    return {"width": size[0], "height": size[1], "frames": len(frames), "duration": round(sum(durations) / 1000, 3)}
+
+
+def to_video(source: Path, dest: Path, codec: str, max_width: int, max_fps: int,
+             source_fps: Optional[float] = None) -> Dict:
+    """
+    H.264 MP4 or VP9 WebM via ffmpeg; dimensions rounded to even for yuv420p.
+    The frame rate is only capped when the source (if known) exceeds max_fps,
+    so slower GIFs keep their frames instead of gaining duplicates.
+    """
+    video_args = {
+        "h264": ["-c:v", "libx264", "-preset", "slow", "-crf", str(MP4_CRF), "-movflags", "+faststart"],
+        "vp9": ["-c:v", "libvpx-vp9", "-b:v", "0", "-crf", str(WEBM_CRF), "-row-mt", "1"],
+    }[codec]
+
+    scale = f"scale='trunc(min({max_width},iw)/2)*2':-2:flags=lanczos"
+    if source_fps is None or source_fps > max_fps:
+        scale = f"fps={max_fps},{scale}"
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-v", "error", "-i", str(source),
+            "-vf", scale, "-pix_fmt", "yuv420p", "-an",
+            *video_args, str(dest),
+        ],
+        check=True, capture_output=True
+    )
+    return _probe_video(dest)
+
+
+def transcode_file(
+    source: str,
+    out_dir: str,
+    max_width: int = DEFAULT_MAX_WIDTH,
+    max_fps: int = DEFAULT_MAX_FPS
+) -> Dict:
+    """Every rendition for one animation, with a size/duration report"""
+    source = Path(source)
+    target_dir = Path(out_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    report = {"source": str(source), "bytes": source.stat().st_size, "outputs": [], "errors": []}
+
+    try:
+        report.update(probe_animation(source))
+    except Exception as e:
+        report["errors"].append(f"probe: {type(e).__name__}: {e}")
+        return report
+
+    jobs = [("webp", ".webp", lambda dest: to_webp(source, dest, max_width, max_fps))]
+    if shutil.which("ffmpeg"):
+        fps = report["fps"] or None
+        jobs.append(("mp4", ".mp4", lambda dest: to_video(source, dest, "h264", max_width, max_fps, fps)))
+        jobs.append(("webm", ".webm", lambda dest: to_video(source, dest, "vp9", max_width, max_fps, fps)))
+    else:
+        report["errors"].append("ffmpeg not found on PATH, skipped mp4/webm")
+
+    for fmt, ext, encode in jobs:
+        dest = target_dir / f"{source.stem}{ext}"
+        try:
+            info = encode(dest)
+            # Without ffprobe, videos keep the source clip's duration
+            info.setdefault("duration", report["duration"])
+            report["outputs"].append({"format": fmt, "path": str(dest), "bytes": dest.stat().st_size, **info})
+        except Exception as e:
+            report["errors"].append(f"{fmt}: {type(e).__name__}: {e}")
+
+    if report["outputs"]:
+        report["smallest"] = min(report["outputs"], key=lambda o: o["bytes"])["format"]
+
+    return report
+
+
+def _transcode_job(args) -> Dict:
+    return transcode_file(*args)
+
+
+def download_sources(urls: Iterable[str], source_dir: str) -> List[Dict]:
+    """Fetch each URL with TenorFetcher.download_gif, skipping files already present"""
+    fetcher = TenorFetcher(use_cache=False)
+    sources = []
+
+    for url in urls:
+        parsed = Path(urlparse(url).path)
+        # Tenor paths look like /<id>/<slug>.<ext>; the id keeps same-slug files apart
+        name = f"{parsed.parent.name}_{parsed.name}" if parsed.parent.name else parsed.name
+        path = Path(source_dir) / name
+
+        if path.exists() or fetcher.download_gif(url, str(path)):
+            sources.append({"url": url, "path": str(path)})
+        else:
+            print(f"❌ Download failed: {url}")
+
+    return sources
+
+
+def transcode_urls(
+    urls: Iterable[str],
+    out_dir: str = "transcoded",
+    max_width: int = DEFAULT_MAX_WIDTH,
+    max_fps: int = DEFAULT_MAX_FPS,
+    workers: Optional[int] = None
+) -> List[Dict]:
+    """Download, then transcode across a process pool; writes <out_dir>/transcode_report.json"""
+    sources = download_sources(urls, str(Path(out_dir) / "source"))
+    jobs = [(s["path"], out_dir, max_width, max_fps) for s in sources]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        reports = list(pool.map(_transcode_job, jobs))
+
+    for source, report in zip(sources, reports):
+        report["url"] = source["url"]
+
+    with open(Path(out_dir) / REPORT_FILE, "w") as f:
+        json.dump(reports, f, indent=2)
+
+    return reports
+
+
+def main(argv=None):
+    """Command-line interface: transcode GIFs and report rendition sizes"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Transcode Tenor GIFs to WebP/MP4/WebM")
+    parser.add_argument('urls', nargs='*', help='Media URLs (default: every PRESET_GIFS URL)')
+    parser.add_argument('--out-dir', default='transcoded', help='Output folder')
+    parser.add_argument('--max-width', type=int, default=DEFAULT_MAX_WIDTH, help='Cap output width')
+    parser.add_argument('--max-fps', type=int, default=DEFAULT_MAX_FPS, help='Cap output frame rate')
+    parser.add_argument('--workers', '-w', type=int, help='Worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    urls = args.urls or [url for gifs in PRESET_GIFS.values() for url in gifs]
+    reports = transcode_urls(urls, args.out_dir, args.max_width, args.max_fps, args.workers)
+
+    before = after = 0
+    for report in reports:
+        outputs = {o["format"]: o for o in report["outputs"]}
+        sizes = ", ".join(f"{fmt} {o['bytes'] / 1024:.0f} KB" for fmt, o in outputs.items())
+        print(f"{Path(report['source']).name}: {report['bytes'] / 1024:.0f} KB, {report.get('duration', 0)}s -> {sizes}")
+        for error in report["errors"]:
+            print(f"   ⚠️  {error}")
+        before += report["bytes"]
+        after += min((o["bytes"] for o in report["outputs"]), default=report["bytes"])
+
+    print(f"\n✅ {len(reports)} animations: {before / 1024:.0f} KB -> {after / 1024:.0f} KB using the smallest rendition")
+    print(f"📄 Report: {Path(args.out_dir) / REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,528 @@
+"""
+Generation Worker for DuBuBu.com
+A long-running process that keeps one warm DuBuBuImageGenerator (fal
+client, keep-alive download pool, rate limiter, prompt cache) and runs jobs
+from a persistent SQLite queue in N concurrent slots. Admin tooling submits
+and polls jobs over a small local HTTP API (TCP or Unix socket) instead of
+paying interpreter, .env.local and client startup on every request.
+
+Jobs are batch tasks ({"type": "product", "params": {...}, "tags": {...}}),
+as in the campaign manifests. Jobs left running by a crashed worker are
+queued again on the next start.
+
+Usage:
+    python -m media_tools worker --slots 4                        # serve on 127.0.0.1:8770
+    python -m media_tools worker --socket /tmp/dububu-worker.sock
+    python -m media_tools worker --submit '{"type": "banner", "params": {"banner_type": "seasonal"}}' --wait
+
+API:
+    POST   /jobs               task JSON (optional "priority") or {"tasks": [...]} (all or none) -> 202 job(s)
+    GET    /jobs?status=&limit=
+    GET    /jobs/<id>?wait=30  long-polls until the job finishes or 30 s pass
+    DELETE /jobs/<id>          cancels a queued job
+    GET    /health
+"""
+
+import inspect
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .batch_journal import task_id
+from .catalog_store import DEFAULT_STORE, CatalogStore
+from .scheduler import INTERACTIVE
+from .telemetry import get_telemetry
+
+
+DEFAULT_QUEUE = "generated_images/worker_jobs.sqlite"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8770
+DEFAULT_SLOTS = 4
+
+# Seconds between queue checks when idle; jobs submitted over the API wake a
+# slot immediately, this only matters for jobs written by other processes
+POLL_INTERVAL = 1.0
+MAX_WAIT = 300.0
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobQueue:
+    """
+    SQLite job queue, one row per job. Jobs are claimed lowest priority
+    first (scheduler.INTERACTIVE before BATCH), then in submission order.
+    Claiming is a single UPDATE ... RETURNING, so other processes may add
+    jobs to the file directly; run one worker per queue file, since a
+    starting worker requeues every job marked running.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+            id           TEXT NOT NULL UNIQUE,
+            task         TEXT NOT NULL,
+            priority     INTEGER NOT NULL,
+            status       TEXT NOT NULL,
+            submitted_at TEXT NOT NULL,
+            started_at   TEXT,
+            finished_at  TEXT,
+            images       TEXT,
+            error        TEXT
+        )
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(self.SCHEMA)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, seq)")
+
+    @staticmethod
+    def _job(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = {key: row[key] for key in row.keys() if key != "seq"}
+        job["task"] = json.loads(job["task"])
+        job["images"] = json.loads(job["images"]) if job["images"] else []
+        return job
+
+    def submit(self, task: Dict, priority: int = INTERACTIVE) -> Dict:
+        return self.submit_many([(task, priority)])[0]
+
+    def submit_many(self, tasks: List[Tuple[Dict, int]]) -> List[Dict]:
+        """Queue (task, priority) pairs in one transaction: all of them or none"""
+        now = datetime.now().isoformat()
+        rows = [(uuid.uuid4().hex, json.dumps(task, ensure_ascii=False), priority, QUEUED, now)
+                for task, priority in tasks]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO jobs (id, task, priority, status, submitted_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+        return [self.get(row[0]) for row in rows]
+
+    def claim(self) -> Optional[Dict]:
+        """Mark the next queued job running and return it, or None if the queue is empty"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE seq = ("
+                "  SELECT seq FROM jobs WHERE status = ? ORDER BY priority, seq LIMIT 1"
+                ") AND status = ? RETURNING *",
+                (RUNNING, datetime.now().isoformat(), QUEUED, QUEUED)
+            ).fetchone()
+        return self._job(row)
+
+    def finish(self, job_id: str, images: List[Dict], error: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, images = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED if error else DONE, json.dumps(images, ensure_ascii=False), error,
+                 datetime.now().isoformat(), job_id)
+            )
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, datetime.now().isoformat(), job_id, QUEUED)
+            )
+        return cursor.rowcount == 1
+
+    def requeue_running(self) -> int:
+        """Put jobs a dead worker left running back in the queue"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING)
+            )
+        return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row)
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Most recent jobs first"""
+        sql, params = "SELECT * FROM jobs", []
+        if status:
+            sql, params = sql + " WHERE status = ?", [status]
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY seq DESC LIMIT ?", params + [limit]).fetchall()
+        return [self._job(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class GenerationWorker:
+    """
+    Runs queued jobs on one shared generator in `slots` threads.
+
+        worker = GenerationWorker(DuBuBuImageGenerator(), JobQueue(), slots=4).start()
+        job = worker.submit({"type": "social", "params": {"theme": "couple_goals"}})
+        worker.wait(job["id"], timeout=60)
+        worker.stop()
+    """
+
+    def __init__(
+        self,
+        generator,
+        job_queue: JobQueue,
+        slots: int = DEFAULT_SLOTS,
+        store: Optional[str] = DEFAULT_STORE,
+        poll_interval: float = POLL_INTERVAL
+    ):
+        self.generator = generator
+        self.queue = job_queue
+        self.slots = max(1, slots)
+        self.catalog = CatalogStore(store) if store else None
+        self.poll_interval = poll_interval
+        self.telemetry = get_telemetry()
+        self.started = time.time()
+        self.running: Dict[str, Dict] = {}
+
+        # Signalled on submit (wakes an idle slot) and on finish (wakes waiters)
+        self._changed = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "GenerationWorker":
+        requeued = self.queue.requeue_running()
+        if requeued:
+            print(f"↩️  Requeued {requeued} jobs left running by a previous worker")
+        for slot in range(self.slots):
+            thread = threading.Thread(target=self._run_slot, name=f"worker-slot-{slot}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming jobs and let running ones finish; queued jobs stay queued"""
+        self._stopping.set()
+        with self._changed:
+            self._changed.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        if self.catalog:
+            self.catalog.close()
+
+    def validate(self, task: Dict) -> None:
+        """Raise ValueError unless task is a job the generator can run"""
+        if not isinstance(task, dict) or "type" not in task:
+            raise ValueError("A job needs a task type (product, social, banner, email, pattern or custom)")
+        try:
+            request = self.generator.task_request(task)
+            inspect.signature(self.generator.generate_image).bind(**request)
+            json.dumps(task)
+        except (TypeError, KeyError) as e:
+            raise ValueError(f"Invalid {task['type']} task: {e}")
+
+    def submit(self, task: Dict, priority: int = INTERACTIVE) -> Dict:
+        """
+        Validate a task against the generator's request builders and queue it.
+        Raises ValueError for unknown task types or parameters.
+        """
+        return self.submit_many([(task, priority)])[0]
+
+    def submit_many(self, tasks: List[Tuple[Dict, int]]) -> List[Dict]:
+        """
+        Validate every (task, priority) pair, then queue them all together.
+        Raises ValueError (naming the first bad task) without queueing any.
+        """
+        for n, (task, _) in enumerate(tasks):
+            try:
+                self.validate(task)
+            except ValueError as e:
+                raise ValueError(f"task {n}: {e}" if len(tasks) > 1 else str(e))
+
+        jobs = self.queue.submit_many(tasks)
+        with self._changed:
+            self._changed.notify_all()
+        return jobs
+
+    def wait(self, job_id: str, timeout: float = MAX_WAIT) -> Optional[Dict]:
+        """The job once it has finished, or as it stands when timeout runs out"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.queue.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(remaining, self.poll_interval))
+
+    def health(self) -> Dict:
+        return {
+            "slots": self.slots,
+            "running": sorted(self.running),
+            "jobs": self.queue.counts(),
+            "uptime": round(time.time() - self.started, 1),
+        }
+
+    def _run_slot(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.claim()
+            except sqlite3.Error as e:
+                print(f"⚠️  Could not claim a job: {e}")
+                job = None
+            if job is None:
+                with self._changed:
+                    self._changed.wait(self.poll_interval)
+                continue
+            self._run_job(job)
+
+    def _run_job(self, job: Dict) -> None:
+        task = job["task"]
+        self.running[job["id"]] = job
+        images: List[Dict] = []
+        error = None
+
+        try:
+            print(f"▶️  {job['id'][:8]} {task.get('type')} {task_id(task)}")
+            images, error = self.generator._run_task_safely(task)
+            if not images and not error:
+                error = "no images returned"
+
+            tags = task.get("tags", {})
+            images = [dict(img, **tags, task_id=task_id(task)) for img in images]
+            if self.catalog and images:
+                self.catalog.add_images(images, campaign=task.get("campaign"), task_id=job["id"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            self._finish_job(job, images, error)
+
+    def _finish_job(self, job: Dict, images: List[Dict], error: Optional[str]) -> None:
+        """Record a job's outcome; the slot keeps running whatever happens here"""
+        try:
+            self.queue.finish(job["id"], images, error)
+        except Exception as e:
+            # e.g. tags that are not JSON-serialisable: record the failure without them
+            error = f"could not record result: {type(e).__name__}: {e}"
+            try:
+                self.queue.finish(job["id"], [], error)
+            except Exception as e:
+                print(f"⚠️  {job['id'][:8]} left running, could not record its result: {e}")
+        finally:
+            self.running.pop(job["id"], None)
+            self.telemetry.count("worker.failed" if error else "worker.done")
+            print(f"{'❌' if error else '✅'} {job['id'][:8]} {error or f'{len(images)} images'}")
+            with self._changed:
+                self._changed.notify_all()
+
+
+# ==========================================
+# HTTP API
+# ==========================================
+
+def _handler(worker: GenerationWorker):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, data, status: int = 200):
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _job_id(self, parts: List[str]) -> Optional[str]:
+            return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+        def do_POST(self):
+            if urlparse(self.path).path.strip("/") != "jobs":
+                return self._json({"error": "not found"}, 404)
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                many = isinstance(body, dict) and "tasks" in body
+                tasks = body["tasks"] if many else [body]
+                if not isinstance(tasks, list):
+                    raise ValueError("tasks must be a list")
+                submissions = []
+                for task in tasks:
+                    task = dict(task) if isinstance(task, dict) else task
+                    priority = int(task.pop("priority", INTERACTIVE)) if isinstance(task, dict) else INTERACTIVE
+                    submissions.append((task, priority))
+                # Nothing is queued unless every task is valid
+                jobs = worker.submit_many(submissions)
+            except (ValueError, TypeError) as e:
+                return self._json({"error": str(e)}, 400)
+            self._json({"jobs": jobs} if many else jobs[0], 202)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            parts = parsed.path.strip("/").split("/")
+            query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+            if parts == ["health"]:
+                return self._json(worker.health())
+            try:
+                limit = int(query.get("limit", 50))
+                wait = float(query["wait"]) if "wait" in query else None
+            except ValueError as e:
+                return self._json({"error": f"invalid query parameter: {e}"}, 400)
+            if (wait is not None and not 0 <= wait < float("inf")) or limit < 0:
+                return self._json({"error": "wait and limit must be non-negative numbers"}, 400)
+
+            if parts == ["jobs"]:
+                return self._json({"jobs": worker.queue.list(query.get("status"), limit)})
+
+            job_id = self._job_id(parts)
+            if job_id is None:
+                return self._json({"error": "not found"}, 404)
+            if wait is not None:
+                job = worker.wait(job_id, min(wait, MAX_WAIT))
+            else:
+                job = worker.queue.get(job_id)
+            self._json(job if job else {"error": f"unknown job {job_id}"}, 200 if job else 404)
+
+        def do_DELETE(self):
+            job_id = self._job_id(urlparse(self.path).path.strip("/").split("/"))
+            job = worker.queue.get(job_id) if job_id else None
+            if job is None:
+                return self._json({"error": "not found"}, 404)
+            if not worker.queue.cancel(job_id):
+                return self._json({"error": f"job is {job['status']}, only queued jobs can be cancelled"}, 409)
+            self._json(worker.queue.get(job_id))
+
+    return Handler
+
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def make_server(worker: GenerationWorker, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                socket_path: Optional[str] = None):
+    """HTTP server for the worker's API, on a TCP port or a Unix socket"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return _UnixHTTPServer(socket_path, _handler(worker))
+    server = ThreadingHTTPServer((host, port), _handler(worker))
+    server.daemon_threads = True
+    return server
+
+
+# ==========================================
+# CLIENT
+# ==========================================
+
+def request_worker(method: str, path: str, body: Optional[Dict] = None, url: Optional[str] = None,
+                   socket_path: Optional[str] = None, timeout: float = MAX_WAIT + 10) -> Dict:
+    """Call a running worker's API and return the decoded JSON response"""
+    import http.client
+
+    if socket_path:
+        conn = http.client.HTTPConnection("localhost", timeout=timeout)
+        conn.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.sock.settimeout(timeout)
+        conn.sock.connect(socket_path)
+    else:
+        target = urlparse(url or f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=timeout)
+
+    payload = json.dumps(body).encode("utf-8") if body is not None else None
+    conn.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = json.loads(response.read() or b"{}")
+    conn.close()
+    if response.status >= 400:
+        raise RuntimeError(f"{method} {path}: {response.status} {data.get('error', '')}")
+    return data
+
+
+def main(argv=None):
+    """Command-line interface: run the worker, or submit to / query a running one"""
+    import argparse
+    import signal
+
+    parser = argparse.ArgumentParser(description="Long-running DuBuBu generation worker with a local job API")
+    parser.add_argument('--slots', '-n', type=int, default=DEFAULT_SLOTS, help='Jobs generated at once')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--socket', metavar='PATH', help='Listen on (or talk to) a Unix socket instead of TCP')
+    parser.add_argument('--queue', default=DEFAULT_QUEUE, help=f"Job queue (SQLite, default: {DEFAULT_QUEUE})")
+    parser.add_argument('--store', default=DEFAULT_STORE, metavar='SQLITE', help='Catalog store to add images to')
+    parser.add_argument('--no-store', action='store_true', help="Don't add generated images to the catalog store")
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the prompt result cache')
+    parser.add_argument('--submit', metavar='TASK_JSON', help='Submit a task to a running worker and print the job')
+    parser.add_argument('--status', metavar='JOB_ID', help='Print a job from a running worker')
+    parser.add_argument('--wait', action='store_true', help='With --submit/--status, wait until the job finishes')
+    args = parser.parse_args(argv)
+
+    if args.submit or args.status:
+        client = {"url": f"http://{args.host}:{args.port}", "socket_path": args.socket}
+        try:
+            job_id = args.status or request_worker("POST", "/jobs", json.loads(args.submit), **client)["id"]
+            job = request_worker("GET", f"/jobs/{job_id}" + (f"?wait={MAX_WAIT:g}" if args.wait else ""), **client)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(json.dumps(job, indent=2, ensure_ascii=False))
+        raise SystemExit(1 if job["status"] == FAILED else 0)
+
+    from .fal_generator import DuBuBuImageGenerator
+
+    generator = DuBuBuImageGenerator(use_cache=not args.no_cache, download_workers=max(4, args.slots))
+    worker = GenerationWorker(generator, JobQueue(args.queue), args.slots,
+                              store=None if args.no_store else args.store).start()
+    server = make_server(worker, args.host, args.port, args.socket)
+
+    # SIGTERM (e.g. from a process manager) shuts down like Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"🛠️  Worker ready on {where} ({worker.slots} slots, queue {args.queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("⏹️  Stopping: finishing running jobs, queued jobs stay queued...")
+        server.server_close()
+        worker.stop()
+        generator.downloader.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
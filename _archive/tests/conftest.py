@@ -0,0 +1,50 @@
+"""
+Shared fixtures for the media_tools tests. Everything runs against the
+offline stub server (media_tools/stub_server.py), so no FAL_KEY, Tenor key
+or network access is needed.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from media_tools.stub_server import StubFalClient, StubServer  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in its own directory (generated_images/, journals, ...)"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def stub():
+    with StubServer(latency=0.0, inference=0.02, image_bytes=2_000, gif_bytes=2_000) as server:
+        yield server
+
+
+@pytest.fixture
+def make_generator(stub):
+    """DuBuBuImageGenerator factory talking to the stub server"""
+    from media_tools.fal_generator import DuBuBuImageGenerator
+
+    def make(**kwargs):
+        kwargs.setdefault("use_cache", False)
+        return DuBuBuImageGenerator(client=StubFalClient(stub.url), **kwargs)
+
+    return make
+
+
+@pytest.fixture
+def generator(make_generator):
+    return make_generator()
+
+
+WELCOME = {"type": "email", "params": {"campaign_type": "welcome"}}
+HERO = {"type": "banner", "params": {"banner_type": "hero"}}
+# banner_request() has no 'headlin' argument
+TYPO = {"type": "banner", "params": {"banner_type": "hero", "headlin": "Hi"}}
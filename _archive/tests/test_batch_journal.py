@@ -0,0 +1,55 @@
+from media_tools import batch_media
+from media_tools.batch_journal import BatchJournal, assign_task_ids
+from media_tools.campaign import iter_tasks
+
+from conftest import HERO, TYPO, WELCOME
+
+
+def manifest(tasks):
+    return {"name": "test", "tasks": tasks}
+
+
+def run(make_generator, monkeypatch, tasks, journal):
+    """run_campaign on the stub server; returns (results, params of the tasks it generated)"""
+    sent = []
+
+    def generator(**kwargs):
+        gen = make_generator(**kwargs)
+        iter_batch = gen.iter_batch
+
+        def recording(tasks, **options):
+            tasks = list(tasks)
+            sent.extend(task["params"] for task in tasks)
+            return iter_batch(tasks, **options)
+
+        gen.iter_batch = recording
+        return gen
+
+    monkeypatch.setattr(batch_media, "DuBuBuImageGenerator", generator)
+    results = batch_media.run_campaign(manifest(tasks), workers=2, use_cache=False, resume=journal, store=None)
+    return results, sent
+
+
+def test_resume_skips_finished_tasks(make_generator, monkeypatch):
+    results, sent = run(make_generator, monkeypatch, [WELCOME, TYPO], "run.jsonl")
+    assert sent == [WELCOME["params"], TYPO["params"]]
+    assert len(results["images"]) == 1
+    welcome_id, typo_id, hero_id = assign_task_ids(list(iter_tasks(manifest([WELCOME, TYPO, HERO]))))
+    assert BatchJournal("run.jsonl").completed_ids() == {welcome_id}
+
+    results, sent = run(make_generator, monkeypatch, [WELCOME, TYPO, HERO], "run.jsonl")
+
+    # Only the failed and the new task run again; the finished one comes from the journal
+    assert sent == [TYPO["params"], HERO["params"]]
+    assert sorted(img["task_id"] for img in results["images"]) == sorted([welcome_id, hero_id])
+    records = BatchJournal("run.jsonl").load()
+    assert records[typo_id]["status"] == "failed"
+
+
+def test_nothing_left_to_resume(make_generator, monkeypatch):
+    run(make_generator, monkeypatch, [WELCOME], "run.jsonl")
+
+    results, sent = run(make_generator, monkeypatch, [WELCOME], "run.jsonl")
+
+    assert sent == []
+    assert len(results["images"]) == 1
@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+
+from media_tools.build_graph import BLOCKED, BUILT, FAILED, FRESH, STALE, BuildGraph, BuildState, Node
+from media_tools.pipeline import add_campaign
+
+from conftest import TYPO, WELCOME
+
+
+@pytest.fixture
+def state():
+    state = BuildState("state.sqlite")
+    yield state
+    state.close()
+
+
+def statuses(reports):
+    return {name: report["status"] for name, report in reports.items()}
+
+
+def chain(state, value="a", source="source.txt", fail=False):
+    """source -> derived -> summary, plus an unrelated sibling node"""
+    runs = []
+
+    def action(name, result):
+        def run(deps):
+            runs.append(name)
+            if fail and name == "source":
+                raise RuntimeError("source broke")
+            return result(deps)
+        return run
+
+    graph = BuildGraph(state)
+    graph.add(Node("source", action("source", lambda deps: {"text": Path(source).read_text()}),
+                   inputs={"value": value}, files=[source]))
+    graph.add(Node("derived", action("derived", lambda deps: deps["source"]["text"].upper()), deps=["source"]))
+    graph.add(Node("summary", action("summary", lambda deps: len(deps["derived"])), deps=["derived"]))
+    graph.add(Node("sibling", action("sibling", lambda deps: "ok")))
+    return graph, runs
+
+
+def test_second_run_is_fresh(state):
+    Path("source.txt").write_text("hello")
+    graph, runs = chain(state)
+    assert set(statuses(graph.run()).values()) == {BUILT}
+
+    graph, runs = chain(state)
+    reports = graph.run()
+
+    assert set(statuses(reports).values()) == {FRESH}
+    assert runs == []
+    assert reports["summary"]["result"] == 5
+
+
+def test_changed_input_rebuilds_dependents_only(state):
+    Path("source.txt").write_text("hello")
+    chain(state)[0].run()
+
+    graph, runs = chain(state, value="b")
+    reports = graph.run()
+
+    assert statuses(reports) == {"source": BUILT, "derived": FRESH, "summary": FRESH, "sibling": FRESH}
+    assert runs == ["source"], "an unchanged dep result must not invalidate its dependents"
+
+    Path("source.txt").write_text("hello world")
+    graph, runs = chain(state, value="b")
+    assert statuses(graph.run()) == {"source": BUILT, "derived": BUILT, "summary": BUILT, "sibling": FRESH}
+
+
+def test_dry_run_reports_stale_dependents(state):
+    Path("source.txt").write_text("hello")
+    chain(state)[0].run()
+    Path("source.txt").write_text("changed")
+
+    graph, runs = chain(state)
+    reports = graph.run(dry_run=True)
+
+    assert statuses(reports) == {"source": STALE, "derived": STALE, "summary": STALE, "sibling": FRESH}
+    assert runs == []
+
+
+def test_failure_blocks_dependents(state):
+    Path("source.txt").write_text("hello")
+    graph, runs = chain(state, fail=True)
+
+    reports = graph.run()
+
+    assert statuses(reports) == {"source": FAILED, "derived": BLOCKED, "summary": BLOCKED, "sibling": BUILT}
+    assert "source broke" in reports["source"]["error"]
+    assert sorted(runs) == ["sibling", "source"]
+
+
+def test_missing_output_rebuilds(state):
+    def write(deps):
+        Path("out.txt").write_text("x")
+        return {"outputs": ["out.txt"]}
+
+    graph = BuildGraph(state)
+    graph.add(Node("out", write))
+    graph.run()
+    assert statuses(graph.run()) == {"out": FRESH}
+
+    Path("out.txt").unlink()
+    assert statuses(graph.run()) == {"out": BUILT}
+
+
+def test_invalid_campaign_task_blocks_only_its_catalog(state, generator):
+    graph = BuildGraph(state)
+    catalog = add_campaign(graph, generator, {"name": "c", "tasks": [WELCOME, TYPO]}, store=None)
+
+    reports = graph.run()
+
+    failed = [name for name, report in reports.items() if report["status"] == FAILED]
+    assert len(failed) == 1 and "headlin" in reports[failed[0]]["error"]
+    assert sum(report["status"] == BUILT for report in reports.values()) == 1
+    assert reports[catalog]["status"] == BLOCKED
@@ -0,0 +1,69 @@
+from media_tools.fal_queue import FalQueueRunner
+from media_tools.stub_server import StubFalClient
+
+from conftest import HERO, WELCOME
+
+TABLE = "jobs.sqlite"
+
+
+def runner(generator, **kwargs):
+    return FalQueueRunner(generator, table_path=TABLE, poll_interval=0.01, **kwargs)
+
+
+def submit_and_quit(generator, *tasks):
+    """Submit tasks the way an interrupted run would, leaving them in flight"""
+    first = runner(generator)
+    keys = [first.submit(generator.prepare_request(**generator.task_request(task))) for task in tasks]
+    first.table.close()
+    return keys
+
+
+def test_reattach_collects_jobs_left_in_flight(generator, stub):
+    keys = submit_and_quit(generator, WELCOME, HERO)
+
+    second = runner(generator)
+    results = second.reattach()
+
+    assert sorted(key for key, _, _ in results) == sorted(keys)
+    for key, images, error in results:
+        assert error is None
+        assert len(images) == 1 and images[0]["local_path"]
+        assert second.table.get(key)["status"] == "collected"
+    assert second.table.in_flight() == []
+    assert len(stub.jobs) == 2, "reattaching must not submit the jobs again"
+
+
+def test_submit_reattaches_to_identical_job(generator, stub):
+    key, = submit_and_quit(generator, WELCOME)
+
+    results = list(runner(generator).run_tasks([WELCOME]))
+
+    assert len(stub.jobs) == 1
+    (index, task, images, error), = results
+    assert (index, error) == (0, None) and images
+    assert runner(generator).table.get(key)["status"] == "collected"
+
+
+def test_reattach_with_nothing_in_flight(generator):
+    assert runner(generator).reattach() == []
+
+
+class StatusDown(StubFalClient):
+    def status(self, model, request_id, with_logs=False):
+        raise RuntimeError("status endpoint unavailable")
+
+
+def test_job_that_keeps_erroring_stays_in_flight(generator, stub):
+    key, = submit_and_quit(generator, WELCOME)
+    generator.client = StatusDown(stub.url)
+
+    (found, images, error), = runner(generator, max_poll_errors=2).reattach()
+
+    assert (found, images) == (key, [])
+    assert "left in flight" in error
+    assert [job["job_key"] for job in runner(generator).table.in_flight()] == [key]
+
+    # Once fal answers again, the next run collects it
+    generator.client = StubFalClient(stub.url)
+    (found, images, error), = runner(generator).reattach()
+    assert error is None and images
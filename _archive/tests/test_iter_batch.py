@@ -0,0 +1,32 @@
+import pytest
+
+from conftest import HERO, TYPO, WELCOME
+
+
+@pytest.mark.parametrize("coalesce", [False, True])
+@pytest.mark.parametrize("workers", [1, 4])
+def test_invalid_task_fails_alone(generator, coalesce, workers):
+    tasks = [WELCOME, TYPO, HERO]
+
+    results = {i: (task, images, error) for i, task, images, error
+               in generator.iter_batch(tasks, max_workers=workers, coalesce=coalesce)}
+
+    assert sorted(results) == [0, 1, 2]
+    task, images, error = results[1]
+    assert task is TYPO
+    assert images == []
+    assert "TypeError" in error and "headlin" in error
+    for i in (0, 2):
+        task, images, error = results[i]
+        assert error is None
+        assert len(images) == 1
+        assert images[0]["local_path"]
+
+
+def test_coalesced_duplicates_share_one_request(generator, stub):
+    results = list(generator.iter_batch([WELCOME, dict(WELCOME), TYPO], coalesce=True))
+
+    by_index = {i: (images, error) for i, _, images, error in results}
+    assert by_index[0][1] is None and by_index[1][1] is None
+    assert by_index[0][0][0]["url"] == by_index[1][0][0]["url"]
+    assert by_index[2][1].startswith("invalid task")
@@ -0,0 +1,30 @@
+import os
+
+from conftest import WELCOME
+
+
+def test_cache_hit_returns_same_shape(make_generator, stub):
+    gen = make_generator(use_cache=True)
+    request = gen.task_request(WELCOME)
+
+    first = gen.generate_image(**request)
+    calls = stub.stats["requests"]
+    second = gen.generate_image(**request)
+
+    assert stub.stats["requests"] == calls, "a cache hit must not call fal"
+    assert len(first) == len(second) == 1
+    assert set(second[0]) == set(first[0])
+    for key in ("url", "prompt", "size", "model", "width", "height"):
+        assert second[0].get(key) == first[0].get(key)
+    assert os.path.exists(second[0]["local_path"])
+
+
+def test_cache_bypassed_per_call(make_generator, stub):
+    gen = make_generator(use_cache=True)
+    request = gen.task_request(WELCOME)
+
+    gen.generate_image(**request)
+    calls = stub.stats["requests"]
+    gen.generate_image(**request, use_cache=False)
+
+    assert stub.stats["requests"] > calls
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from media_tools.scheduler import INTERACTIVE, RequestScheduler
+
+
+class Response:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+
+
+class HTTPError(Exception):
+    """Shaped like fal_client's errors"""
+
+    def __init__(self, status_code, retry_after):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response_headers = {"Retry-After": retry_after}
+
+
+def scripted(*outcomes):
+    """fn returning (or raising) each outcome in turn"""
+    calls = []
+
+    def fn():
+        outcome = outcomes[len(calls)]
+        calls.append(time.monotonic())
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return fn, calls
+
+
+def scheduler(**kwargs):
+    # A backoff this long would time the test out, so only Retry-After can explain a quick retry
+    sched = RequestScheduler(base_delay=30.0, max_delay=60.0, **kwargs)
+    sched.configure("test", rate=1000.0, burst=1000)
+    return sched
+
+
+def test_retry_after_is_honoured():
+    sched = scheduler()
+    fn, calls = scripted(Response(429, "0.2"), Response(429, "0.2"), Response(200))
+
+    result = sched.call("test", fn, priority=INTERACTIVE)
+
+    assert result.status_code == 200
+    assert len(calls) == 3
+    assert all(0.19 <= later - earlier < 5 for earlier, later in zip(calls, calls[1:]))
+    assert sched.stats["test"] == {"calls": 3, "retries": 2, "throttled": 2}
+
+
+def test_retry_after_on_raised_errors():
+    sched = scheduler()
+    fn, calls = scripted(HTTPError(503, "0.1"), Response(200))
+
+    assert sched.call("test", fn).status_code == 200
+    assert calls[1] - calls[0] >= 0.09
+    assert sched.stats["test"]["throttled"] == 0
+
+
+def test_gives_up_after_max_retries():
+    sched = scheduler(max_retries=2)
+    fn, calls = scripted(*[Response(429, "0")] * 3)
+
+    assert sched.call("test", fn).status_code == 429
+    assert len(calls) == 3
+
+
+def test_non_retryable_status_returned_at_once():
+    sched = scheduler()
+    fn, calls = scripted(Response(404, "0"))
+
+    assert sched.call("test", fn).status_code == 404
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("rate", ["0", "-1", "abc", "inf"])
+def test_invalid_rate_from_environment(monkeypatch, rate):
+    monkeypatch.setenv("DUBUBU_FAL_RPS", rate)
+
+    with pytest.raises(ValueError, match="DUBUBU_FAL_RPS"):
+        RequestScheduler()
+
+
+def test_invalid_configured_rate():
+    with pytest.raises(ValueError, match="rate for test"):
+        RequestScheduler().configure("test", 0)
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from media_tools.worker import GenerationWorker, JobQueue, make_server, request_worker
+
+from conftest import HERO, TYPO, WELCOME
+
+
+@pytest.fixture
+def worker(generator):
+    worker = GenerationWorker(generator, JobQueue("queue.sqlite"), slots=2, store=None, poll_interval=0.05)
+    yield worker
+    worker.stop(timeout=10)
+
+
+@pytest.fixture
+def api(worker):
+    """call(method, path, body) against the worker's HTTP API"""
+    server = make_server(worker, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = "http://{}:{}".format(*server.server_address[:2])
+    yield lambda method, path, body=None: request_worker(method, path, body, url=url, timeout=30)
+    server.shutdown()
+    server.server_close()
+
+
+def test_submit_and_wait(worker, api):
+    worker.start()
+    job = api("POST", "/jobs", WELCOME)
+    assert job["status"] == "queued"
+
+    done = api("GET", f"/jobs/{job['id']}?wait=20")
+
+    assert done["status"] == "done", done
+    assert len(done["images"]) == 1
+
+
+@pytest.mark.parametrize("body, message", [
+    (TYPO, "headlin"),
+    ({"params": {"campaign_type": "welcome"}}, "task type"),
+    ({"type": "email", "params": {"campaign_type": "welcome"}, "priority": "high"}, ""),
+    ({"tasks": WELCOME}, "tasks must be a list"),
+])
+def test_invalid_task_rejected(worker, api, body, message):
+    with pytest.raises(RuntimeError, match=f"400 .*{message}"):
+        api("POST", "/jobs", body)
+    assert worker.queue.counts() == {}
+
+
+def test_multi_task_post_is_all_or_none(worker, api):
+    with pytest.raises(RuntimeError, match="400 task 2: .*headlin"):
+        api("POST", "/jobs", {"tasks": [WELCOME, HERO, TYPO]})
+    assert worker.queue.counts() == {}
+
+    accepted = api("POST", "/jobs", {"tasks": [WELCOME, HERO]})
+    assert len(accepted["jobs"]) == 2
+    assert worker.queue.counts() == {"queued": 2}
+
+
+@pytest.mark.parametrize("query", ["limit=-1", "limit=x", "wait=-5", "wait=inf"])
+def test_invalid_query_rejected(api, query):
+    with pytest.raises(RuntimeError, match="400"):
+        api("GET", f"/jobs?{query}")